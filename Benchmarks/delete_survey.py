@@ -0,0 +1,74 @@
+"""
+    Benchmark of removing import data: a whole survey (its lines and stations cascade), the empty lines of a survey
+    and a selection of stations (delete_many).
+
+        python -m Benchmarks.delete_survey --lines 2000 --stations 100
+
+    Every tenth line of a survey is left empty. The database is a temporary file, written with the sqlite3 backend.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+
+from PySide6.QtCore import QLoggingCategory
+
+from Models.TableModels import SqlManager, ImportSurvey, ImportLine, ImportStation
+
+
+def fill(sql_manager: SqlManager, lines: int, stations: int) -> int:
+    survey_id = sql_manager.factor(ImportSurvey).insert('benchmark')
+    line_model = sql_manager.factor(ImportLine)
+    station_model = sql_manager.factor(ImportStation)
+    for line_reference_id in range(0, lines):
+        line_id = line_model.insert(survey_id, line_reference_id, 'In', {})
+        if line_reference_id % 10 == 0:
+            continue
+        station_model.db_insert_bulk('import_stations', [{
+            'survey_id': survey_id, 'line_id': line_id, 'station_reference_id': index, 'length_out': 1.0
+        } for index in range(0, stations)])
+    return survey_id
+
+
+def timed(method, *args) -> tuple:
+    start = time.perf_counter()
+    rows = method(*args)
+    return rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark removing surveys, lines and stations.')
+    parser.add_argument('--lines', type=int, default=2000)
+    parser.add_argument('--stations', type=int, default=100)
+    parser.add_argument('--selection', type=int, default=5000, help='the amount of stations removed at once')
+    arguments = parser.parse_args()
+    # the models are not shown, their QSqlTableModel part has no QCoreApplication.
+    QLoggingCategory.setFilterRules('qt.sql.qsqldatabase.warning=false')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sql_manager = SqlManager.sqlite3(f'{tmp_dir}/benchmark.sqlite', track_changes=False)
+        sql_manager.create_tables()
+        kept_id = fill(sql_manager, arguments.lines, arguments.stations)
+        removed_id = fill(sql_manager, arguments.lines, arguments.stations)
+
+        station_model = sql_manager.factor(ImportStation)
+        station_ids = [row[0] for row in station_model.db_fetch(
+            'SELECT station_id FROM import_stations WHERE survey_id=?', [kept_id], row_type=ImportStation.ROW_TUPLE
+        )]
+        selection = random.sample(station_ids, min(arguments.selection, len(station_ids)))
+
+        print(f'{"operation":<24} {"rows":>8} {"time":>8}')
+        for name, method, args in [
+            ('flush empty lines', sql_manager.factor(ImportLine).flush_empty, [kept_id]),
+            ('delete stations', station_model.delete_many, [selection]),
+            ('delete survey', sql_manager.factor(ImportSurvey).delete, [removed_id]),
+        ]:
+            rows, seconds = timed(method, *args)
+            print(f'{name:<24} {rows:>8} {seconds:>7.3f}s')
+        sql_manager.close_connection()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
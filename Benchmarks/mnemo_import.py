@@ -0,0 +1,86 @@
+"""
+    End-to-end benchmark of the Mnemo import, against the MnemoEmulator instead of a device.
+
+    For every dump-file it reports the serial throughput (first to last byte) and the import latency:
+    from opening the port until the survey is stored, which includes the inactivity timeout that ends the transfer.
+
+        python -m Benchmarks.mnemo_import --baudrate 9600 --jitter 0.01 data_files/tux.dmp
+
+    Without files all of data_files/*.dmp is used. Nothing is written to the application database or settings.
+"""
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+
+from PySide6.QtCore import QCoreApplication, QSettings
+
+from Config.Constants import MNEMO_BAUDRATE
+from Importers.Mnemo import MnemoImporter, MnemoDmpReader
+from Importers.MnemoEmulator import MnemoEmulator
+from Models.TableModels import SqlManager, ImportLine, ImportStation
+
+DATA_FILES = pathlib.Path(__file__).parent.parent / 'data_files'
+
+
+def benchmark(dump_file: pathlib.Path, sql_manager: SqlManager, baudrate: int, jitter: float, inactivity_timeout: float) -> dict:
+    timing = {}
+
+    def on_data(values: list):
+        now = time.perf_counter()
+        timing.setdefault('first_byte', now)
+        timing['last_byte'] = now
+        reader.feed(values)
+
+    with MnemoEmulator(dump_file, baudrate=baudrate, jitter=jitter) as emulator:
+        importer = MnemoImporter(device=emulator.device, baudrate=baudrate, inactivity_timeout=inactivity_timeout)
+        reader = MnemoDmpReader(sql_manager=sql_manager)
+        start = time.perf_counter()
+        importer.read_from_device(on_data=on_data)
+        survey_id = reader.close()
+        end = time.perf_counter()
+
+    lines = sql_manager.factor(ImportLine).get_all(survey_id)
+    transfer = max(timing['last_byte'] - timing['first_byte'], 1e-9)
+    return {
+        'file': dump_file.name,
+        'bytes': len(importer.import_list),
+        'lines': len(lines),
+        'stations': sum(len(sql_manager.factor(ImportStation).get_all(line['line_id'])) for line in lines),
+        'bytes_per_second': len(importer.import_list) / transfer,
+        'latency': end - start,
+        # what is left after the last byte: the inactivity timeout plus the parsing that did not keep up.
+        'tail': end - timing['last_byte'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Mnemo import against the emulator.')
+    parser.add_argument('dump_files', nargs='*')
+    parser.add_argument('--baudrate', type=int, default=MNEMO_BAUDRATE)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--inactivity-timeout', type=float, default=1.0)
+    arguments = parser.parse_args()
+
+    files = [pathlib.Path(f) for f in arguments.dump_files] or sorted(DATA_FILES.glob('*.dmp'))
+
+    application = QCoreApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # the models flag every write in the QSettings, keep the users settings out of it.
+        QSettings.setDefaultFormat(QSettings.IniFormat)
+        QSettings.setPath(QSettings.IniFormat, QSettings.UserScope, tmp_dir)
+        sql_manager = SqlManager('benchmark', db_location=f'{tmp_dir}/benchmark.sqlite')
+        sql_manager.create_tables()
+
+        print(f'{"file":<36} {"bytes":>7} {"lines":>6} {"stations":>8} {"bytes/s":>9} {"latency":>8} {"tail":>7}')
+        for dump_file in files:
+            result = benchmark(dump_file, sql_manager, arguments.baudrate, arguments.jitter, arguments.inactivity_timeout)
+            print(f'{result["file"]:<36} {result["bytes"]:>7} {result["lines"]:>6} {result["stations"]:>8} '
+                  f'{result["bytes_per_second"]:>9.0f} {result["latency"]:>7.2f}s {result["tail"]:>6.2f}s')
+        sql_manager.close_connection()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,8 +2,6 @@ import logging
 import os
 import pathlib
 
-from Utils import Logging
-
 DEBUG = True
 DS = os.sep
 
@@ -22,6 +20,7 @@ APPLICATION_DATA_DIR = f'{str(pathlib.Path.home())}{DS}.stickmaps'
 
 APPLICATION_CACHE_DIR = f'{APPLICATION_DATA_DIR}{DS}cache'
 APPLICATION_CACHE_MAX_SIZE = 100  # mb
+APPLICATION_STARTUP_BUDGET = 1.5  # seconds, from the first import till the main window is usable
 
 APPLICATION_DEFAULT_PROJECT_NAME = "Untitled project"
 APPLICATION_DEFAULT_FILE_NAME = f"Untitled.{APPLICATION_FILE_EXTENSION}"
@@ -47,7 +46,16 @@ MNEMO_DEVICE_NAME = "Mnemo"
 MNEMO_DEVICE_DESCRIPTION = "MCP2221 USB-I2C/UART Combo"
 MNEMO_BAUDRATE = 9600
 MNEMO_TIMEOUT = 1
-MNEMO_CYCLE_COUNT = 50
+MNEMO_INACTIVITY_TIMEOUT = 5  # seconds without data before we consider the dump complete
+MNEMO_DEVICE_ENV = "STICKMAPS_MNEMO_DEVICE"  # overrides the usb scan, ea. to point at the MnemoEmulator
+MNEMO_DUMP_BINARY = False  # write raw binary dump-files instead of the (Ariane compatible) text format
+MNEMO_SKIP_DUPLICATES = True  # lines already in the project (the same bytes of an earlier dump) are not imported again
+MNEMO_BATCH_MAX_WORKERS = None  # processes used to decode dump-files in a batch import, None is one per cpu
+
+# Background jobs (see Workers.Scheduler), jobs beyond this amount wait in the queue.
+JOB_SCHEDULER_MAX_WORKERS = 3
+MNEMO_BINARY_DUMP_MAGIC = b'STKMNEMO\x01'  # header of a binary dump-file, the last byte is the format version
+MNEMO_EXPORT_CHUNK_SIZE = 4096  # values written to a dump-file at once while exporting
 
 SURVEY_DIRECTION_IN = "In"
 SURVEY_DIRECTION_OUT = "Out"
@@ -55,6 +63,17 @@ SURVEY_DIRECTION_OUT = "Out"
 #SQL_DB_LOCATION = ":memory:"
 SQL_DB_LOCATION = f"{APPLICATION_DATA_DIR}{DS}stickmaps.sqlite"
 SQL_CONNECTION_NAME = "qt_sql_default_connection"
+SQL_STATEMENT_CACHE_SIZE = 64  # prepared statements kept per connection
+SURVEY_STORE_FLUSH_DELAY = 500  # ms an edited station is kept in memory before it is written to the database
+STATION_TABLE_FETCH_SIZE = 500  # rows the station editor hands to its view at a time
+STATION_TABLE_WIDTH_SAMPLE = 200  # rows measured to size a column of the station editor
+STATION_TABLE_MAX_COLUMN_WIDTH = 300
+SQL_CONNECTION_PRAGMAS = [
+    'PRAGMA journal_mode=WAL', 'PRAGMA synchronous=NORMAL', 'PRAGMA temp_store=MEMORY', 'PRAGMA foreign_keys=ON'
+]
+SQL_MAX_VARIABLES = 500  # ids bound to one "IN (?, ...)", sqlite allows 999 on older versions
+# the device properties of an import station that are stored as columns, the rest stays json in device_properties.
+SQL_STATION_DEVICE_COLUMNS = ('depth_in', 'pitch_in', 'pitch_out', 'status_byte', 'byte_start', 'byte_end')
 
 SQL_TABLE_PROJECT_SETTINGS = "project_settings"
 SQL_TABLE_IMPORT_SURVEYS = "import_surveys"
@@ -66,6 +85,14 @@ SQL_TABLE_CONTACTS = "contacts"
 SQL_TABLE_EXPLORERS = "explorers"
 SQL_TABLE_SURVEYORS = "surveyors"
 
+# the tables the undo/redo journal follows, and how much of their history it keeps (see Models.Journal).
+JOURNAL_TABLES = (
+    SQL_TABLE_IMPORT_SURVEYS, SQL_TABLE_IMPORT_LINES, SQL_TABLE_IMPORT_STATIONS, SQL_TABLE_MAP_LINES, SQL_TABLE_MAP_STATIONS
+)
+JOURNAL_MAX_STEPS = 100
+JOURNAL_MAX_ENTRIES = 500000  # changed rows kept in memory, the oldest steps are dropped beyond it
+JOURNAL_COALESCE_INTERVAL = 2.0  # seconds within which repeated edits of the same kind become one undo step
+
 QML_MAPVIEW = 'data_files/map_view.qml'
 
 logging.getLogger(__name__).warning('Using "STOLEN" google-api key, DO NOT RELEASE LIKE THIS')
@@ -76,6 +103,15 @@ GOOGLE_STATIC_MAPS_CACHE_DIR = f'{DS}google_static'
 
 GOOGLE_MAPS_SCALING = 2
 
+# Offline tile bundles (MBTiles compatible sqlite files)
+TILE_BUNDLE_EXTENSION = 'mbtiles'
+TILE_BUNDLE_CONNECTION_NAME = 'tile_bundle'
+TILE_BUNDLE_ZOOM_MIN = 14
+TILE_BUNDLE_ZOOM_MAX = 19
+TILE_BUNDLE_RADIUS = 1000  # meters around the project location (or around the station extent)
+TILE_BUNDLE_MAX_TILES = 20000
+TILE_BUNDLE_MMAP_SIZE = 268435456  # 256mb, sqlite will memory-map the bundle up to this size
+
 
 # Scene constants
 
@@ -85,6 +121,12 @@ SCENE_DEFAULT_LONGITUDE = -87.25863770346321
 SCENE_MAP_TILE_SIZE = 256
 SCENE_DEFAULT_ZOOM = 20
 
+# Level of detail, below these (MapView) zoom-levels the survey lines are drawn without stations/labels.
+SCENE_LOD_STATION_ZOOM = 17
+SCENE_LOD_LABEL_ZOOM = 19
+# max deviation (in screen pixels) allowed when simplifying survey lines.
+SCENE_LOD_TOLERANCE = 1.0
+
 DEGREES_N = 0
 DEGREES_NE = 45
 DEGREES_E = 90
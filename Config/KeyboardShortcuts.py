@@ -8,10 +8,15 @@ KEY_OPEN = QKeySequence("Ctrl+O")
 KEY_NEW = QKeySequence("Ctrl+N")
 KEY_PREFERENCES = QKeySequence("Ctrl+,")
 
+KEY_UNDO = QKeySequence("Ctrl+Z")
+KEY_REDO = QKeySequence("Ctrl+Shift+Z")
+
 KEY_IMPORT_MNEMO_CONNECT = QKeySequence("Ctrl+Shift+M")
 KEY_IMPORT_MNEMO_DUMP_FILE = QKeySequence("Ctrl+Alt+M")
 KEY_IMPORT_MNEMO_DUMP = QKeySequence("Ctrl+Meta+M")
+KEY_IMPORT_MNEMO_BATCH = QKeySequence("Ctrl+Alt+Shift+M")
 
 KEY_TOGGLE_SATELLITE = QKeySequence("Ctrl+M")
+KEY_TOGGLE_PROFILER = QKeySequence("Ctrl+Shift+P")
 KEY_ZOOM_IN = QKeySequence('Ctrl+-')  # QKeySequence.ZoomIn <= doesn't seem to work either ;(
 KEY_ZOOM_OUT = QKeySequence('Ctrl+=')  # QKeySequence.ZoomIn <= doesn't allow the = so it becomes Ctrl+Shift++
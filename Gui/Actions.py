@@ -2,21 +2,26 @@ import logging
 import os
 import pathlib
 
-from PySide6.QtCore import QSettings
+from PySide6.QtCore import QSettings, QPointF
 from PySide6.QtGui import QAction, QIcon
 
 from PySide6.QtWidgets import QFileDialog, QTreeView, QMenu, QMessageBox, QDialog, QToolBar
 
 from Config.Constants import MAIN_WINDOW_STATUSBAR_TIMEOUT, APPLICATION_NAME, APPLICATION_FILE_EXTENSION, \
-    MAIN_WINDOW_TITLE, MNEMO_BAUDRATE, MNEMO_TIMEOUT
+    MAIN_WINDOW_TITLE, MNEMO_BAUDRATE, MNEMO_TIMEOUT, TILE_BUNDLE_EXTENSION, TILE_BUNDLE_ZOOM_MIN, TILE_BUNDLE_ZOOM_MAX, \
+    TILE_BUNDLE_RADIUS
 from Config.Icons import ICON_TOGGLE_SATELLITE, ICON_ZOOM_IN, ICON_ZOOM_OUT
 from Config.KeyboardShortcuts import KEY_IMPORT_MNEMO_CONNECT, KEY_IMPORT_MNEMO_DUMP_FILE, KEY_QUIT_APPLICATION, \
-    KEY_SAVE, KEY_SAVE_AS, KEY_OPEN, KEY_NEW, KEY_IMPORT_MNEMO_DUMP, KEY_PREFERENCES, KEY_TOGGLE_SATELLITE, KEY_ZOOM_IN, \
-    KEY_ZOOM_OUT
+    KEY_SAVE, KEY_SAVE_AS, KEY_OPEN, KEY_NEW, KEY_UNDO, KEY_REDO, KEY_IMPORT_MNEMO_DUMP, KEY_PREFERENCES, KEY_TOGGLE_SATELLITE, KEY_ZOOM_IN, \
+    KEY_ZOOM_OUT, KEY_TOGGLE_PROFILER, KEY_IMPORT_MNEMO_BATCH
 from Gui.Dialogs import ErrorDialog, EditSurveyDialog, EditLinesDialog, EditLineDialog, EditStationsDialog, \
     EditStationDialog, PreferencesDialog, NewProjectDialog, OpenProjectDialog, DocumentationDialog
 from Gui.Dialogs import EditSurveysDialog
-from Importers.Mnemo import MnemoImporter, MnemoDumpWriter
+from Gui.Scene.Providers.Bundle import TileBundleBuilder
+from Importers.Mnemo import MnemoImporter, MnemoDumpWriter, MnemoBatchImporter
+from Models.Journal import Journal
+from Models.SurveyStore import SurveyStore
+from Models.TableModels import SqlManager, ProjectSettings, ImportStation
 from Utils.Settings import Preferences
 from Utils.Storage import SaveFile
 from Workers.Mixins import ThreadWithProgressBar
@@ -25,6 +30,7 @@ from Workers.Mixins import ThreadWithProgressBar
 class GlobalActions(ThreadWithProgressBar):
 
     THREAD_MNEMO_CONNECTION = 'mnemo_connection'
+    THREAD_TILE_BUNDLE = 'tile_bundle'
 
     def __init__(self, parent_window):
         super().__init__(parent_window)
@@ -107,6 +113,58 @@ class GlobalActions(ThreadWithProgressBar):
         else:
             self.parent.statusBar().showMessage('File NOT saved.', MAIN_WINDOW_STATUSBAR_TIMEOUT)
 
+    def export_tile_bundle(self):
+        action = QAction('Export offline map tiles', self.parent)
+        action.triggered.connect(lambda: self.export_tile_bundle_callback())
+        return action
+
+    def export_tile_bundle_callback(self):
+        sql_manager = SqlManager()
+        extent = sql_manager.factor(ImportStation).get_extent()
+        radius = Preferences.get('tile_bundle_radius', TILE_BUNDLE_RADIUS, int)
+        if extent is not None:
+            # pad the station extent with the radius, caves tend to go beyond the last located station.
+            north_west = TileBundleBuilder.extent_around(QPointF(extent['north'], extent['west']), radius)[0]
+            south_east = TileBundleBuilder.extent_around(QPointF(extent['south'], extent['east']), radius)[1]
+        else:
+            project = sql_manager.factor(ProjectSettings).get()
+            if project is None or project['latitude'] in ('', None) or project['longitude'] in ('', None):
+                ErrorDialog.show_error_key(self.parent, 'NO_PROJECT_LOCATION')
+                return
+            north_west, south_east = TileBundleBuilder.extent_around(
+                QPointF(float(project['latitude']), float(project['longitude'])),
+                radius
+            )
+
+        settings = QSettings()
+        file_regex = f'(*.{TILE_BUNDLE_EXTENSION})'
+        dialog = QFileDialog()
+        dialog.setWindowTitle('Export offline map tiles')
+        dialog.setFilter(dialog.filter())
+        dialog.setDefaultSuffix(TILE_BUNDLE_EXTENSION)
+        dialog.setAcceptMode(QFileDialog.AcceptSave)
+        dialog.setNameFilters([f'Offline map {file_regex}'])
+        dialog.setDirectory(settings.value('SaveFile/last_path', str(pathlib.Path.home())))
+        dialog.setOption(QFileDialog.DontUseNativeDialog)
+        if dialog.exec_() == QDialog.Accepted:
+            file_name = dialog.selectedFiles()[0]
+            if not file_name.endswith(f'.{TILE_BUNDLE_EXTENSION}'):
+                file_name = f'{file_name}.{TILE_BUNDLE_EXTENSION}'
+            self.parent.statusBar().showMessage('Exporting offline map tiles', MAIN_WINDOW_STATUSBAR_TIMEOUT)
+
+            builder = TileBundleBuilder(
+                out_file=file_name,
+                north_west=north_west,
+                south_east=south_east,
+                zoom_min=Preferences.get('tile_bundle_zoom_min', TILE_BUNDLE_ZOOM_MIN, int),
+                zoom_max=Preferences.get('tile_bundle_zoom_max', TILE_BUNDLE_ZOOM_MAX, int)
+            )
+            self.worker_create_thread(
+                thread_object=builder,
+                progress_params={"title": "Export offline map tiles", "max_value": 100}
+            )
+            self.worker_start(self.THREAD_TILE_BUNDLE)
+
     def preferences(self):
         action = QAction('Preferences', self.parent)
         action.setMenuRole(QAction.PreferencesRole)
@@ -126,6 +184,48 @@ class GlobalActions(ThreadWithProgressBar):
         action.triggered.connect(self.parent.close)
         return action
 
+### Edit menu
+    def undo(self):
+        action = QAction('Undo', self.parent)
+        action.setShortcut(KEY_UNDO)
+        action.triggered.connect(lambda: self.undo_callback())
+        journal = Journal.instance()
+        journal.s_changed.connect(lambda: self._update_journal_action(action, 'Undo', journal.undo_label()))
+        self._update_journal_action(action, 'Undo', journal.undo_label())
+        return action
+
+    def undo_callback(self):
+        # the edits the store did not write yet are the last step.
+        SurveyStore.instance().flush()
+        self._apply_journal(Journal.instance().undo, 'Undone')
+
+    def redo(self):
+        action = QAction('Redo', self.parent)
+        action.setShortcut(KEY_REDO)
+        action.triggered.connect(lambda: self.redo_callback())
+        journal = Journal.instance()
+        journal.s_changed.connect(lambda: self._update_journal_action(action, 'Redo', journal.redo_label()))
+        self._update_journal_action(action, 'Redo', journal.redo_label())
+        return action
+
+    def redo_callback(self):
+        SurveyStore.instance().flush()
+        self._apply_journal(Journal.instance().redo, 'Redone')
+
+    def _apply_journal(self, method, done: str):
+        try:
+            label = method()
+        except Exception as err_mesg:
+            ErrorDialog.show_error_key(self.parent, str(err_mesg))
+            return
+        if label is not None:
+            self.parent.statusBar().showMessage(f'{done}: {label}', MAIN_WINDOW_STATUSBAR_TIMEOUT)
+
+    @staticmethod
+    def _update_journal_action(action: QAction, text: str, label: str):
+        action.setEnabled(label is not None)
+        action.setText(text if label is None else f'{text} {label.lower()}')
+
 ### Import menu
     def mnemo_connect_to(self):
         action = QAction('Import from Mnemo', self.parent)
@@ -220,6 +320,30 @@ class GlobalActions(ThreadWithProgressBar):
         except Exception as err_mesg:
             ErrorDialog.show_error_key(self.parent, str(err_mesg))
 
+    def mnemo_batch_import(self):
+        action = QAction('Load directory of Mnemo *.dmp files', self.parent)
+        action.setShortcut(KEY_IMPORT_MNEMO_BATCH)
+        action.triggered.connect(lambda: self.mnemo_batch_import_callback())
+        return action
+
+    def mnemo_batch_import_callback(self):
+        settings = QSettings()
+        directory = QFileDialog.getExistingDirectory(
+            self.parent,
+            'Select a directory with Mnemo .dmp files',
+            settings.value('SaveFile/last_path_mnemo_import', str(pathlib.Path.home())),
+            QFileDialog.ShowDirsOnly | QFileDialog.DontUseNativeDialog
+        )
+        if not directory:
+            return
+        settings.setValue('SaveFile/last_path_mnemo_import', directory)
+        self.parent.statusBar().showMessage('Loading Mnemo *.dmp files.', MAIN_WINDOW_STATUSBAR_TIMEOUT)
+        self.worker_create_thread(
+            thread_object=MnemoBatchImporter(directory),
+            progress_params={"title": "Mnemo load *.dmp files", "max_value": len(MnemoBatchImporter.dump_files(directory))}
+        )
+        self.worker_start(self.THREAD_MNEMO_CONNECTION)
+
     def _disable_mnemo_actions(self):
         menubar = self.parent.menuBar()
         menubar.actions()[2].setEnabled(False)
@@ -282,9 +406,13 @@ class TreeActions:
         self.remove_alert = msg
         if msg.exec_() == QMessageBox.Ok:
             item = self.get_selected_item()
-            num_rows = item.model().flush()
-            item.delete_children()
-            self.tree_view.parent().parent().statusBar().showMessage(f'Removed surveys, deleted {num_rows} rows from database.', MAIN_WINDOW_STATUSBAR_TIMEOUT)
+            try:
+                with Journal.instance().action('Delete surveys'):
+                    num_rows = item.model().flush()
+                item.delete_children()
+                self.tree_view.parent().parent().statusBar().showMessage(f'Removed surveys, deleted {num_rows} rows from database.', MAIN_WINDOW_STATUSBAR_TIMEOUT)
+            except Exception as err_mesg:
+                ErrorDialog.show_error_key(self.tree_view.main_window, str(err_mesg))
 
         self.remove_alert.close()
 
@@ -322,6 +450,7 @@ class TreeActions:
                 file_name = f'{file_name}.dmp'
             survey_id = self.get_selected_item().survey_id()
 
+            SurveyStore.instance().flush()
             writer = MnemoDumpWriter()
             writer.save_survey_to_dmp(survey_id, file_name)
 
@@ -340,9 +469,14 @@ class TreeActions:
         self.remove_alert = msg
         if msg.exec_() == QMessageBox.Ok:
             item = self.get_selected_item()
-            num_rows = item.model().delete(item.survey_id())
-            item.remove()
-            self.tree_view.parent().parent().statusBar().showMessage(f'Removed survey, deleted {num_rows} rows from database.', MAIN_WINDOW_STATUSBAR_TIMEOUT)
+            try:
+                with Journal.instance().action('Delete survey'):
+                    num_rows = item.model().delete(item.survey_id())
+                SurveyStore.instance().forget_survey(item.survey_id())
+                item.remove()
+                self.tree_view.parent().parent().statusBar().showMessage(f'Removed survey, deleted {num_rows} rows from database.', MAIN_WINDOW_STATUSBAR_TIMEOUT)
+            except Exception as err_mesg:
+                ErrorDialog.show_error_key(self.tree_view.main_window, str(err_mesg))
 
         self.remove_alert.close()
 
@@ -362,7 +496,12 @@ class TreeActions:
 
     def remove_empty_lines_callback(self):
         item = self.get_selected_item()
-        c = item.child_model().flush_empty(item.survey_id())
+        try:
+            with Journal.instance().action('Remove empty lines'):
+                c = item.child_model().flush_empty(item.survey_id())
+        except Exception as err_mesg:
+            ErrorDialog.show_error_key(self.tree_view.main_window, str(err_mesg))
+            return
         item.update_children()
         self.tree_view.setCurrentIndex(item.index())
         self.tree_view.main_window.statusBar().showMessage(f'Removed {c} empty lines from survey', MAIN_WINDOW_STATUSBAR_TIMEOUT)
@@ -392,9 +531,14 @@ class TreeActions:
         self.remove_alert = msg
         if msg.exec_() == QMessageBox.Ok:
             item = self.get_selected_item()
-            num_rows = item.model().delete(item.line_id())
-            item.remove()
-            self.tree_view.parent().parent().statusBar().showMessage(f'Removed line, deleted {num_rows} rows from database.', MAIN_WINDOW_STATUSBAR_TIMEOUT)
+            try:
+                with Journal.instance().action('Delete line'):
+                    num_rows = item.model().delete(item.line_id())
+                SurveyStore.instance().forget_line(item.line_id())
+                item.remove()
+                self.tree_view.parent().parent().statusBar().showMessage(f'Removed line, deleted {num_rows} rows from database.', MAIN_WINDOW_STATUSBAR_TIMEOUT)
+            except Exception as err_mesg:
+                ErrorDialog.show_error_key(self.tree_view.main_window, str(err_mesg))
 
         self.remove_alert.close()
 
@@ -434,9 +578,9 @@ class TreeActions:
         self.remove_alert = msg
         if msg.exec_() == QMessageBox.Ok:
             item = self.get_selected_item()
-            num_rows = item.model().delete(item.station_id())
-            item.remove()
-            self.tree_view.parent().parent().statusBar().showMessage(f'Removed station, deleted {num_rows} rows from database.', MAIN_WINDOW_STATUSBAR_TIMEOUT)
+            # the tree item is removed when the store tells it to.
+            SurveyStore.instance().remove_station(item.station_id())
+            self.tree_view.parent().parent().statusBar().showMessage('Removed station.', MAIN_WINDOW_STATUSBAR_TIMEOUT)
 
         self.remove_alert.close()
 
@@ -474,3 +618,12 @@ class MapToolbarActions:
 
     def zoom_out_callback(self):
         self.map_view.s_change_zoom.emit(False, -1.0)
+
+    def toggle_profiler(self):
+        action = QAction('Render profiler', self.toolbar)
+        action.setShortcut(KEY_TOGGLE_PROFILER)
+        action.triggered.connect(lambda: self.toggle_profiler_callback())
+        return action
+
+    def toggle_profiler_callback(self):
+        self.map_view.s_toggle_profiler.emit()
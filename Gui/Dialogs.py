@@ -7,15 +7,19 @@ from PySide6.QtGui import Qt, QPixmap
 from PySide6.QtSql import QSqlTableModel
 from PySide6.QtWidgets import QErrorMessage, QDialog, QTableView, QHBoxLayout, QMessageBox, QApplication, QFormLayout, \
     QLineEdit, QDateTimeEdit, QTextEdit, QDialogButtonBox, QVBoxLayout, QDoubleSpinBox, QListWidget, QComboBox, QLabel, \
-    QPushButton, QFileDialog, QSizePolicy, QTextBrowser
+    QPushButton, QFileDialog, QSizePolicy, QTextBrowser, QHeaderView
 
 from Config.Constants import MAIN_WINDOW_STATUSBAR_TIMEOUT, APPLICATION_NAME, MNEMO_DEVICE_DESCRIPTION, DEBUG, \
-    MNEMO_DEVICE_NAME, MNEMO_BAUDRATE, MNEMO_TIMEOUT, MNEMO_CYCLE_COUNT, SURVEY_DIRECTION_IN, SURVEY_DIRECTION_OUT, \
+    MNEMO_DEVICE_NAME, MNEMO_BAUDRATE, MNEMO_TIMEOUT, MNEMO_INACTIVITY_TIMEOUT, MNEMO_DUMP_BINARY, \
+    MNEMO_SKIP_DUPLICATES, SURVEY_DIRECTION_IN, SURVEY_DIRECTION_OUT, \
     SQL_DB_LOCATION, GOOGLE_MAPS_SCALING, APPLICATION_CACHE_DIR, APPLICATION_CACHE_MAX_SIZE, APPLICATION_DATA_DIR, \
     APPLICATION_DEFAULT_PROJECT_NAME, APPLICATION_DEFAULT_FILE_NAME, APPLICATION_VERSION, APPLICATION_FILE_EXTENSION, \
-    APPLICATION_STARTUP_DIALOG_IMAGE, DOCS_SEARCH_PATHS
+    APPLICATION_STARTUP_DIALOG_IMAGE, DOCS_SEARCH_PATHS, TILE_BUNDLE_ZOOM_MIN, TILE_BUNDLE_ZOOM_MAX, TILE_BUNDLE_RADIUS
 from Gui.Delegates.FormElements import DropDown
 from Gui.Mixins import FormMixin
+from Models.Journal import Journal
+from Models.StationTableModel import StationTableModel
+from Models.SurveyStore import SurveyStore
 from Models.TableModels import SqlManager, ProjectSettings
 from Utils.Settings import Preferences
 
@@ -68,6 +72,14 @@ class ErrorDialog:
                         </dl>
                     """
         },
+        'IMPORT_CANCELLED': {
+            'title': "Import cancelled",
+            'body': """
+                <h3>The import was cancelled</h3>
+                <p>Restart your Mnemo before trying again, it will otherwise continue somewhere in the middle of the stream.</p>
+            """,
+            'status': "Import cancelled."
+        },
         'NO_DATA_TO_BE_WRITTEN': {
             'title': "No data to write",
             'body': """
@@ -83,6 +95,59 @@ class ErrorDialog:
                     <li>Restart the sync in Stickmaps</li>
                 </ol>
             """
+        },
+        'NO_PROJECT_LOCATION': {
+            'title': "Project has no location",
+            'body': """
+                <h3>We don't know where to fetch map tiles for</h3>
+                <p>Set the latitude and longitude of your project, or import stations with a location first.</p>
+            """
+        },
+        'TILE_BUNDLE_TOO_LARGE': {
+            'title': "Too many map tiles",
+            'body': """
+                <h3>The requested area contains too many map tiles</h3>
+                <p>Lower the maximum zoom-level or the radius in the preferences and try again.</p>
+            """,
+            'status': "Offline map export failed."
+        },
+        'NO_DUMP_FILES': {
+            'title': "No dump files found",
+            'body': """
+                <h3>The selected directory does not contain any *.dmp files</h3>
+            """
+        },
+        'BATCH_IMPORT_ERRORS': {
+            'title': "Some dump files were not imported",
+            'body': """
+                <h3>The following files could not be read</h3>
+                <p>All other files are imported.</p>
+            """,
+            'status': "Batch import finished with errors."
+        },
+        'BATCH_IMPORT_FAILED': {
+            'title': "Batch import failed",
+            'body': """
+                <h3>The surveys could not be stored</h3>
+                <p>None of the files are imported.</p>
+            """,
+            'status': "Batch import failed."
+        },
+        'JOURNAL_APPLY_FAILED': {
+            'title': "Could not undo",
+            'body': """
+                <h3>The change could not be undone (or redone)</h3>
+                <p>The data is left as it was.</p>
+            """,
+            'status': "Undo failed."
+        },
+        'SQL_DELETE_FAILED': {
+            'title': "Could not delete",
+            'body': """
+                <h3>The rows could not be deleted</h3>
+                <p>The data is left as it was.</p>
+            """,
+            'status': "Delete failed."
         }
     }
 
@@ -163,6 +228,40 @@ class PreferencesDialog(QDialog, FormMixin):
                     ],
                     "settings_key": "google_maps_scaling",
                     "default_value": GOOGLE_MAPS_SCALING
+                },
+                "tile_bundle_zoom_min": {
+                    "label": "Offline map min zoom",
+                    "info": "The lowest zoom-level exported to an offline map file.",
+                    "form_field": "spinner",
+                    "min": 1,
+                    "max": 21,
+                    "settings_key": "tile_bundle_zoom_min",
+                    "default_value": TILE_BUNDLE_ZOOM_MIN
+                },
+                "tile_bundle_zoom_max": {
+                    "label": "Offline map max zoom",
+                    "info": "The highest zoom-level exported to an offline map file, every level up quadruples the amount of tiles.",
+                    "form_field": "spinner",
+                    "min": 1,
+                    "max": 21,
+                    "settings_key": "tile_bundle_zoom_max",
+                    "default_value": TILE_BUNDLE_ZOOM_MAX
+                },
+                "tile_bundle_radius": {
+                    "label": "Offline map radius in meters",
+                    "info": "Used around the project location when none of the stations have a location.",
+                    "form_field": "spinner",
+                    "min": 100,
+                    "max": 20000,
+                    "settings_key": "tile_bundle_radius",
+                    "default_value": TILE_BUNDLE_RADIUS
+                },
+                "tile_bundle_path": {
+                    "label": "Offline map file",
+                    "info": "When set, the satellite overlay reads its tiles from this file instead of the network.",
+                    "form_field": "text_line",
+                    "settings_key": "tile_bundle_path",
+                    "default_value": ""
                 }
             }
         },
@@ -175,14 +274,28 @@ class PreferencesDialog(QDialog, FormMixin):
                     "settings_key": "mnemo_device_name",
                     "default_value": MNEMO_DEVICE_NAME
                 },
-                "read_cycles": {
-                  "label": "Read cycles",
-                  "info": "The amount of tries we will try to fetch more data from the Mnemo serial connection.",
+                "inactivity_timeout": {
+                    "label": "Inactivity timeout",
+                    "info": "Seconds without receiving data from the Mnemo before we consider the transfer complete.",
                     "form_field": "spinner",
-                    "min": 10,
-                    "max": 100,
-                    "settings_key": "mnemo_cycle_count",
-                    "default_value": MNEMO_CYCLE_COUNT,
+                    "min": 1,
+                    "max": 30,
+                    "settings_key": "mnemo_inactivity_timeout",
+                    "default_value": MNEMO_INACTIVITY_TIMEOUT,
+                },
+                "dump_binary": {
+                    "label": "Binary backups",
+                    "info": "Write Mnemo backups as compact binary files, these can not be opened by Ariane.",
+                    "form_field": "check_box",
+                    "settings_key": "mnemo_dump_binary",
+                    "default_value": MNEMO_DUMP_BINARY
+                },
+                "skip_duplicates": {
+                    "label": "Skip imported lines",
+                    "info": "Lines that are already in the project, read from the same dump before, are not imported again.",
+                    "form_field": "check_box",
+                    "settings_key": "mnemo_skip_duplicates",
+                    "default_value": MNEMO_SKIP_DUPLICATES
                 },
                 "device_ident": {
                     "label": "Device ",
@@ -685,7 +798,8 @@ class EditSurveysDialog(QDialog):
     def save(self):
         table = self.table_view
         model = table.model()
-        model.submitAll()
+        with Journal.instance().action('Edit surveys'):
+            model.submitAll()
         self.item.update_children()
         self.close()
 
@@ -744,7 +858,8 @@ class EditSurveyDialog(QDialog):
         survey_dict['device_name'] = self.device_field.text()
         time = self.datetime_field.dateTime().toPython()
         survey_dict['survey_datetime'] = time.timestamp()
-        self.item.model().update(survey_dict, survey_dict['survey_id'])
+        with Journal.instance().action('Edit survey'):
+            self.item.model().update(survey_dict, survey_dict['survey_id'])
         self.item.update(survey_dict['survey_name'])
         self.close()
 
@@ -802,7 +917,8 @@ class EditLinesDialog(QDialog):
     def save(self):
         table = self.table_view
         model = table.model()
-        model.submitAll()
+        with Journal.instance().action('Edit lines'):
+            model.submitAll()
         self.item.update_children()
         self.close()
 
@@ -861,7 +977,8 @@ class EditLineDialog(QDialog):
         line_dict['direction'] = self.direction_field.currentText()
 
         tree = self.parentWidget()
-        self.item.model().update(line_dict, line_dict['line_id'])
+        with Journal.instance().action('Edit line'):
+            self.item.model().update(line_dict, line_dict['line_id'])
         self.item.update(line_dict['line_name'])
         self.close()
 
@@ -884,24 +1001,20 @@ class EditStationsDialog(QDialog):
         self.setWindowTitle('Edit stations')
         self.resize(800, 400)
 
-
-
-        model = item.child_model()
-        model.select()
-        model.setEditStrategy(QSqlTableModel.OnManualSubmit)
-        model.setFilter(f'line_id={self.line_id}')
-
+        # the stations in memory (see SurveyStore), the edits are handed to the store on save.
+        model = StationTableModel(self.line_id, parent=self)
 
         view = QTableView(self)
         view.setModel(model)
         view.setAlternatingRowColors(True)
+        # the order of the store, so enabling the sorting does not sort again.
+        view.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
         view.setSortingEnabled(True)
-        view.sortByColumn(0, Qt.AscendingOrder)
         view.setSelectionMode(QTableView.NoSelection)
+        # every row has the same height, the view does not ask every row for its size.
+        view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         model.set_column_widths(view)
 
-
-
         layout = QVBoxLayout()
         layout.addWidget(view)
 
@@ -912,25 +1025,16 @@ class EditStationsDialog(QDialog):
         buttons.rejected.connect(self.cancel)
         buttons.button(QDialogButtonBox.Reset).clicked.connect(self.reset)
 
-        view.horizontalHeader().setStretchLastSection(True)
-
-        view.resizeColumnsToContents()
-
         self.table_view = view
         self.setLayout(layout)
 
     def save(self):
-        table = self.table_view
-        model = table.model()
-        model.submitAll()
-        self.item.update_children()
+        # the tree (and the scene) follow the store, only the stations that changed are updated.
+        self.table_view.model().submit_all()
         self.close()
 
     def reset(self):
-        table = self.table_view
-        model = table.model()
-
-        model.revertAll()
+        self.table_view.model().revert_all()
 
     def cancel(self):
         self.close()
@@ -940,7 +1044,7 @@ class EditStationDialog(QDialog):
 
     def __init__(self, parent, item):
         super().__init__(parent)
-        self.station = item.model().get(item.station_id())
+        self.station = SurveyStore.instance().station(item.station_id()).as_dict()
         self.item = item
 
         layout = QFormLayout()
@@ -1010,8 +1114,10 @@ class EditStationDialog(QDialog):
         station_dict['azimuth_out'] = self.azimuth_out.value()
         station_dict['length_out'] = self.length_out.value()
 
-        self.item.model().update(station_dict, station_dict['station_id'])
-        self.item.update(station_dict['station_name'])
+        values = {name: station_dict[name] for name in (
+            'station_name', 'station_comment', 'length_in', 'azimuth_in', 'depth', 'azimuth_out', 'length_out'
+        )}
+        SurveyStore.instance().update_station(station_dict['station_id'], values)
         self.close()
 
     def reset(self):
@@ -25,6 +25,8 @@ class MainMenu:
         fm.addAction(actions.save())
         fm.addAction(actions.save_as())
         fm.addAction(self._separator())
+        fm.addAction(actions.export_tile_bundle())
+        fm.addAction(self._separator())
         fm.addAction(actions.preferences())
         fm.addAction(self._separator())
         fm.addAction(actions.exit_application())
@@ -34,6 +36,9 @@ class MainMenu:
         mb = self.parent_window.menuBar()
         fm = mb.addMenu('Edit')
 
+        fm.addAction(actions.undo())
+        fm.addAction(actions.redo())
+
     def set_help_menu(self):
         actions = GlobalActions(self.parent_window)
         mb = self.parent_window.menuBar()
@@ -48,6 +53,7 @@ class MainMenu:
         fm = mb.addMenu('Import')
         fm.addAction(actions.mnemo_connect_to())
         fm.addAction(actions.mnemo_load_dump_file())
+        fm.addAction(actions.mnemo_batch_import())
         fm.addAction(self._separator())
         fm.addAction(actions.mnemo_dump())
 
@@ -67,6 +73,7 @@ class MapsToolBar(QToolBar):
 
         self.addAction(actions.zoom_in())
         self.addAction(actions.zoom_out())
+        self.addAction(actions.toggle_profiler())
 
 class ContextMenuImports(QMenu):
     def __init__(self, parent):
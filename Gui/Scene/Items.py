@@ -0,0 +1,263 @@
+import logging
+import math
+
+import numpy
+from PySide6.QtCore import QPointF, QRectF, Qt
+from PySide6.QtGui import QPen, QPolygonF
+from PySide6.QtWidgets import QGraphicsItem
+
+from Config.Constants import SCENE_LOD_STATION_ZOOM, SCENE_LOD_LABEL_ZOOM, SCENE_LOD_TOLERANCE, SCENE_DEFAULT_ZOOM, \
+    SURVEY_DIRECTION_IN
+from Gui.Scene.CoordSystem import TranslateCoordinates
+from Utils.Logging import RenderProfiler
+from Utils.Rendering import simplify_path
+
+
+class LevelOfDetail:
+    """
+        Decides what is drawn for a (MapView) zoom-level.
+
+        The scene coordinates are pixels at SCENE_DEFAULT_ZOOM, so one pixel on screen covers
+        2^(SCENE_DEFAULT_ZOOM - zoom_level) scene units, the simplification tolerance scales along with it.
+    """
+
+    def __init__(self, zoom_level: float):
+        self.zoom_level = zoom_level
+
+    @property
+    def show_stations(self) -> bool:
+        return self.zoom_level >= SCENE_LOD_STATION_ZOOM
+
+    @property
+    def show_labels(self) -> bool:
+        return self.zoom_level >= SCENE_LOD_LABEL_ZOOM
+
+    @property
+    def scene_units_per_pixel(self) -> float:
+        return math.pow(2, SCENE_DEFAULT_ZOOM - math.floor(self.zoom_level))
+
+    @property
+    def tolerance(self) -> float:
+        if self.show_stations:
+            return 0
+        return SCENE_LOD_TOLERANCE * self.scene_units_per_pixel
+
+    def __eq__(self, other) -> bool:
+        return self.show_stations == other.show_stations \
+            and self.show_labels == other.show_labels \
+            and self.tolerance == other.tolerance
+
+
+class SurveyLineItem(QGraphicsItem):
+    """
+        A survey line on the map, as one single QGraphicsItem.
+
+        The solved station coordinates are kept in one numpy array (N+1 x 2, the last row is the end of the
+        last leg). Painting is batched: one drawPolyline for the legs and one drawPoints for all stations,
+        labels are only drawn for the stations within the exposed rect.
+        Hit-testing of stations is done in here as well (see station_at), so the scene only has to index one
+        item per line instead of several per station.
+
+        Zoomed out the line is one (Douglas-Peucker simplified) polyline without stations or labels,
+        past SCENE_LOD_STATION_ZOOM the stations are drawn and past SCENE_LOD_LABEL_ZOOM the labels are shown.
+    """
+
+    LINE_WIDTH = 2
+    LINE_COLOR = Qt.gray
+    STATION_DOT = 6
+    MARKER_DOT = 12
+    MARKER_COLOR = Qt.red
+    SELECTED_COLOR = Qt.blue
+    # space (in screen pixels) reserved around the line for the labels.
+    LABEL_MARGIN = 120
+    HIT_RADIUS = 6
+
+    _disabled_profiler = RenderProfiler()
+
+    def __init__(self, line: dict, stations: list, start_at: QPointF):
+        super().__init__()
+        self.setAcceptHoverEvents(True)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+        self.log = logging.getLogger(__name__)
+        self.line = line
+        self.stations = stations
+        self.coordinates = TranslateCoordinates()
+        self.points = self.solve_points(stations, start_at)
+
+        self.selected_station = None
+
+        self._simplified = {}
+        self._polygon = None
+        self._station_polygon = None
+        self._lod = None
+        self._line_rect = self._points_rect(self.points)
+        self._bounding_rect = QRectF(self._line_rect)
+
+        self._pen = QPen(self.LINE_COLOR, self.LINE_WIDTH)
+        self._pen.setCosmetic(True)
+        self._station_pen = QPen(self.LINE_COLOR, self.STATION_DOT, Qt.SolidLine, Qt.RoundCap)
+        self._station_pen.setCosmetic(True)
+        self._marker_pen = QPen(self.MARKER_COLOR, self.MARKER_DOT, Qt.SolidLine, Qt.RoundCap)
+        self._marker_pen.setCosmetic(True)
+
+        is_in = line.get('direction', SURVEY_DIRECTION_IN) == SURVEY_DIRECTION_IN
+        self.marker_index = 0 if is_in or len(stations) == 0 else len(stations) - 1
+
+    def solve_points(self, stations, start_at: QPointF) -> numpy.ndarray:
+        """
+            Returns the scene coordinates for all stations, starting at start_at.
+            The last point is the end of the last leg (there is no station for it).
+
+            stations is a list of station rows or the structured array of ImportStation.get_all_array().
+        """
+        if isinstance(stations, numpy.ndarray):
+            length = numpy.nan_to_num(stations['length_out']) * self.coordinates.xy_per_m
+            azimuth = numpy.radians(numpy.nan_to_num(stations['azimuth_out_avg']))
+        else:
+            length = numpy.array([float(s['length_out'] or 0) for s in stations], dtype=numpy.float64) * self.coordinates.xy_per_m
+            azimuth = numpy.radians(numpy.array([float(s['azimuth_out_avg'] or 0) for s in stations], dtype=numpy.float64))
+
+        points = numpy.zeros((len(stations) + 1, 2), dtype=numpy.float64)
+        # scene y grows towards the south.
+        points[1:, 0] = numpy.cumsum(length * numpy.sin(azimuth))
+        points[1:, 1] = numpy.cumsum(-length * numpy.cos(azimuth))
+        points[:, 0] += start_at.x()
+        points[:, 1] += start_at.y()
+        return points
+
+    def boundingRect(self) -> QRectF:
+        return self._bounding_rect
+
+    def get_polygon(self, tolerance: float = 0) -> QPolygonF:
+        if tolerance <= 0:
+            if self._polygon is None:
+                self._polygon = self._to_polygon(self.points)
+            return self._polygon
+        if tolerance not in self._simplified:
+            self._simplified[tolerance] = QPolygonF(simplify_path(list(self.get_polygon()), tolerance))
+        return self._simplified[tolerance]
+
+    def get_station_polygon(self) -> QPolygonF:
+        """
+            The points of the stations, without the end of the last leg.
+        """
+        if self._station_polygon is None:
+            self._station_polygon = self._to_polygon(self.points[:-1])
+        return self._station_polygon
+
+    def set_level_of_detail(self, lod: LevelOfDetail):
+        if self._lod is not None and lod == self._lod:
+            return
+        self._lod = lod
+
+        margin = self.LABEL_MARGIN if lod.show_labels else self.MARKER_DOT
+        margin = margin * lod.scene_units_per_pixel
+        self.prepareGeometryChange()
+        self._bounding_rect = self._line_rect.adjusted(-margin, -margin, margin, margin)
+        self.update()
+
+    def station_at(self, pos: QPointF, radius: float = None) -> int:
+        """
+            Returns the index (within self.stations) of the station closest to pos, when within the radius.
+
+        :param pos: QPointF in item coordinates
+        :param radius: float in scene units, defaults to HIT_RADIUS screen pixels at the current level of detail
+        :return: int|None
+        """
+        if len(self.stations) == 0:
+            return None
+        if radius is None:
+            radius = self.HIT_RADIUS * (self._lod.scene_units_per_pixel if self._lod is not None else 1)
+        distances = numpy.square(self.points[:-1, 0] - pos.x()) + numpy.square(self.points[:-1, 1] - pos.y())
+        index = int(numpy.argmin(distances))
+        if distances[index] > radius * radius:
+            return None
+        return index
+
+    def paint(self, painter, option, widget=None):
+        if self._lod is None:
+            return
+        with self.profiler().measure('SurveyLineItem'):
+            self._paint_line(painter, option)
+
+    def profiler(self) -> RenderProfiler:
+        scene = self.scene()
+        if scene is not None and hasattr(scene, 'profiler'):
+            return scene.profiler()
+        return self._disabled_profiler
+
+    def _paint_line(self, painter, option):
+        painter.setPen(self._pen)
+        painter.drawPolyline(self.get_polygon(self._lod.tolerance))
+
+        if self._lod.show_stations is False:
+            return
+
+        painter.setPen(self._station_pen)
+        painter.drawPoints(self.get_station_polygon())
+        if len(self.stations) > 0:
+            painter.setPen(self._marker_pen)
+            painter.drawPoint(QPointF(*self.points[self.marker_index]))
+        if self.selected_station is not None:
+            pen = QPen(self._marker_pen)
+            pen.setColor(self.SELECTED_COLOR)
+            painter.setPen(pen)
+            painter.drawPoint(QPointF(*self.points[self.selected_station]))
+
+        if self._lod.show_labels:
+            self.paint_labels(painter, option.exposedRect)
+
+    def paint_labels(self, painter, exposed_rect: QRectF):
+        """
+            Labels are drawn in device coordinates (so they don't scale with the view),
+            only for the stations within the exposed rect.
+        """
+        stations = self.points[:-1]
+        visible = numpy.nonzero(
+            (stations[:, 0] >= exposed_rect.left()) & (stations[:, 0] <= exposed_rect.right()) &
+            (stations[:, 1] >= exposed_rect.top()) & (stations[:, 1] <= exposed_rect.bottom())
+        )[0]
+        if len(visible) == 0:
+            return
+
+        transform = painter.worldTransform()
+        painter.save()
+        painter.resetTransform()
+        painter.setPen(Qt.black)
+        for index in visible:
+            station = self.stations[index]
+            position = transform.map(QPointF(*stations[index]))
+            painter.drawText(position + QPointF(6, -6), str(station.get('station_name') or station.get('station_reference_id', '')))
+            if station.get('depth') not in (None, ''):
+                painter.drawText(position + QPointF(6, 10), f"{float(station['depth']):.1f}m")
+            if station.get('length_out') not in (None, ''):
+                middle = transform.map(QPointF(*((self.points[index] + self.points[index + 1]) / 2)))
+                painter.drawText(middle, f"{float(station['length_out']):.1f}m")
+        painter.restore()
+
+    def mousePressEvent(self, event):
+        index = self.station_at(event.pos())
+        if index is None:
+            event.ignore()
+            return
+        self.selected_station = index
+        self.update()
+        event.accept()
+
+    def hoverMoveEvent(self, event):
+        index = self.station_at(event.pos())
+        if index is None:
+            self.setToolTip('')
+        else:
+            station = self.stations[index]
+            self.setToolTip(f"{station.get('station_name') or station.get('station_reference_id', '')}")
+
+    @staticmethod
+    def _to_polygon(points: numpy.ndarray) -> QPolygonF:
+        return QPolygonF([QPointF(x, y) for x, y in points.tolist()])
+
+    @staticmethod
+    def _points_rect(points: numpy.ndarray) -> QRectF:
+        minimum = points.min(axis=0)
+        maximum = points.max(axis=0)
+        return QRectF(QPointF(minimum[0], minimum[1]), QPointF(maximum[0], maximum[1]))
@@ -7,7 +7,9 @@ from PySide6.QtWidgets import QGraphicsScene, QGraphicsItem
 
 from Config.Constants import DEGREES_NW
 from Gui.Scene.CoordSystem import TranslateCoordinates
+from Gui.Scene.Items import SurveyLineItem, LevelOfDetail
 from Gui.Scene.Overlays import SatelliteOverlay, GridOverlay
+from Models.SurveyStore import SurveyStore
 from Models.TableModels import SqlManager, ImportSurvey, ImportLine, ImportStation, ProjectSettings
 
 """
@@ -120,6 +122,16 @@ class MainScene(QGraphicsScene):
         """ Add default overlays """
         #self.add_overlay(object=SatelliteOverlay(self), position=10)  # Used for rendering satelite images as a background.
         self.add_overlay(object=GridOverlay(self), position=20)
+
+        # survey lines added to the map, keyed by line_id
+        self._lines = {}
+        self._sql_manager = None
+        self.parent().s_zoom_changed.connect(self.c_zoom_changed)
+
+        store = SurveyStore.instance()
+        store.s_station_changed.connect(self.c_line_changed)
+        store.s_station_removed.connect(self.c_line_changed)
+        store.s_line_loaded.connect(lambda line_id: self.c_line_changed(line_id))
         #
         # self.parent().s_move_viewport.connect(self.c_move_viewport)
 
@@ -156,6 +168,65 @@ class MainScene(QGraphicsScene):
 
         self.addItem(object)
 
+    def sql_manager(self) -> SqlManager:
+        if self._sql_manager is None:
+            self._sql_manager = SqlManager()
+        return self._sql_manager
+
+    def profiler(self):
+        return self.parent().profiler
+
+    def tile_queue_depth(self) -> int:
+        depth = 0
+        for overlay in self._overlays.values():
+            if hasattr(overlay['object'], 'tile_queue_depth'):
+                depth += overlay['object'].tile_queue_depth()
+        return depth
+
+    def level_of_detail(self) -> LevelOfDetail:
+        return LevelOfDetail(self.parent().get_current_zoom())
+
+    def append_import_line(self, line_row: dict, survey_row: dict, position: QPointF):
+        """
+            Called on the dropEvent, a new line from the import tree is added to the map.
+            The line starts at the location of its first station when it has one, otherwise at the drop position.
+        """
+        stations = SurveyStore.instance().stations(line_row['line_id'])
+        start_at = position
+        if len(stations) > 0 and stations[0]['latitude'] not in (None, '') and stations[0]['longitude'] not in (None, ''):
+            start_at = TranslateCoordinates().latlng_2_xy(QPointF(stations[0]['latitude'], stations[0]['longitude']))
+
+        item = self._place_line(line_row, stations, start_at)
+        self.log.debug(f'Added line {line_row["line_id"]} of survey {survey_row["survey_id"]} with {len(stations)} stations')
+        return item
+
+    def _place_line(self, line_row: dict, stations: list, start_at: QPointF) -> SurveyLineItem:
+        if line_row['line_id'] in self._lines:
+            self.removeItem(self._lines[line_row['line_id']])
+
+        item = SurveyLineItem(line_row, stations, start_at)
+        item.set_level_of_detail(self.level_of_detail())
+        self.addItem(item)
+        self._lines[line_row['line_id']] = item
+        return item
+
+    @Slot(int, int)
+    def c_line_changed(self, line_id: int, station_id: int = None):
+        """
+            A station of a line on the map was edited, the line is solved again from where it starts now.
+        """
+        if line_id not in self._lines:
+            return
+        item = self._lines[line_id]
+        start_at = QPointF(*item.points[0])
+        self._place_line(item.line, SurveyStore.instance().stations(line_id), start_at)
+
+    @Slot(float, float)
+    def c_zoom_changed(self, new_zoom: float, old_zoom: float):
+        lod = self.level_of_detail()
+        for item in self._lines.values():
+            item.set_level_of_detail(lod)
+
     def get_overlay(self, name: str):
         return self._overlays[name]
 
@@ -216,62 +287,22 @@ class MainScene(QGraphicsScene):
     # events
 
 
- #
- #    def reload(self):
- #        self.overlay.reload()
- #
- #    def load_map_from_database(self):
- #        """
- #        Called from the __init__ and called when an file is openend.
- #        """
- #        return True
- # #
- #    def append_import_line(self, line_row: dict, survey_row: dict, cursor_position: QPoint):
- #        """
- #        Called on the dropEvent, a new line from the import tree is added to the map.
- #        """
- #        year = datetime.fromtimestamp(survey_row).year
- #
- #        stations = self.import_station.get_all(line_row['line_id'])
- #        start_at = QPointF(xpos=Preferences.get('default_latitude', DEFAULT_LATITUDE),
- #                           ypos=Preferences.get('default_longitude', DEFAULT_LONGITUDE))
- #        for station, index in enumerate(stations):
- #            if index == 0:
- #                if station['latitude'] is not None and station['longitude'] is not None:
- #                    start_at = QPointF(xpos=station['latitude'], ypos=station['longitude'])
- #
- #            item = StationItem(start_at, station, year)
- #            item.render_station()
- #            item.render_line()
- #
- #            item.render_markers()
- #            item.render_name()
- #            item.render_depth()
- #            item.render_length()
- #
- # # Drag & drop event
- #    def dragEnterEvent(self, event) -> None:
- #        event.accept()
- #        return None
- #
- #    def dragLeaveEvent(self, event) -> None:
- #        event.accept()
- #        return None
- #
- #    def dragMoveEvent(self, event) -> None:
- #        event.accept()
- #        return None
- #
- #    def dropEvent(self, event):
- #        super().dropEvent(event)
- #        mime = event.mimeData()
- #        if mime.property('survey_id') is None:
- #            event.ignore()  # when we drop a random document from outside the application the screen (by accident)
- #            return
- #        survey = self.import_survey.get(int(mime.property('survey_id')))
- #        line = self.import_line.get(int(mime.property('line_id')))
- #        mousePosition = event.pos()
- #        self.append_import_line(line, survey, mousePosition)
- #        # event.accept()
- #        return None
- #
+    # Drag & drop events
+    def dragEnterEvent(self, event) -> None:
+        event.accept()
+
+    def dragLeaveEvent(self, event) -> None:
+        event.accept()
+
+    def dragMoveEvent(self, event) -> None:
+        event.accept()
+
+    def dropEvent(self, event):
+        mime = event.mimeData()
+        if mime.property('survey_id') is None:
+            event.ignore()  # when we drop a random document from outside the application the screen (by accident)
+            return
+        survey = self.sql_manager().factor(ImportSurvey).get(int(mime.property('survey_id')))
+        line = self.sql_manager().factor(ImportLine).get(int(mime.property('line_id')))
+        self.append_import_line(line, survey, event.scenePos())
+        event.accept()
@@ -1,18 +1,35 @@
 import logging
 import math
+import pathlib
 
-from PySide6.QtCore import QPointF, Slot, QSize, QRect, QPoint, QThreadPool, Qt
-from PySide6.QtGui import QPixmap
-from PySide6.QtWidgets import QGraphicsItemGroup, QGraphicsScene, QGraphicsItem
+from PySide6.QtCore import QPointF, Slot, QSize, QRect, QPoint, QThreadPool, Qt, QRectF, QLineF
+from PySide6.QtGui import QPixmap, QPainter
+from PySide6.QtWidgets import QGraphicsItemGroup, QGraphicsScene, QGraphicsItem, QGraphicsPixmapItem
 
-from Gui.Scene.Providers.DataObject import GridTileObject
+from Config.Constants import SCENE_MAP_TILE_SIZE
+from Gui.Scene.Providers.Bundle import TileBundleProvider
+from Gui.Scene.Providers.DataObject import GridTileObject, TileRequests
 from Gui.Scene.Providers.Mixins import TileGridMixin, GeoMixin
 from Gui.Scene.Providers.Satellite import GoogleMapsProvider
 from Models.TableModels import SqlManager
+from Utils.Settings import Preferences
 
 
 
 class GridOverlay(QGraphicsItem):
+    """
+        Draws a grid over the visible part of the scene.
+
+        Painting is kept cheap:
+            - the boundingRect is the visible scene rect (and not the hole scene), so only changes within the
+              view will trigger a repaint.
+            - only the exposed part of the item is painted.
+            - per grid-size a tile with the lines is rendered once and drawn with drawTiledPixmap,
+              when the painter is scaled we fall back to a single drawLines() call with all lines.
+
+        QGraphicsItem.ItemCoordinateCache is not used, our boundingRect moves along with the view which would
+        invalidate that cache on every scroll.
+    """
 
     def parent(self) -> QGraphicsScene:
         return self._parent
@@ -24,98 +41,103 @@ class GridOverlay(QGraphicsItem):
         return self.parent().parent()
 
     def boundingRect(self):
-        return self.scene_rect
-    #
-    # @Slot(dict)
-    # def c_load_project(self, project: dict):
-    #     self.update()
-    #
-    # @Slot(QRect, QRect)
-    # def c_scene_resize(self, old_size: QRect, new_size: QRect):
-    #     pass
-    #     # self.update()
+        return self.view_rect
 
     @Slot(float, float)
     def c_zoom_changed(self, new_zoom: float, old_zoom: float):
         self.update()
 
+    @Slot(QRectF)
+    def c_viewport_changed(self, view_rect: QRectF):
+        if view_rect == self.view_rect:
+            return
+        self.prepareGeometryChange()
+        self.view_rect = QRectF(view_rect)
 
     def __init__(self, parent):
         super().__init__()
         self._parent = parent
-        #self.setCacheMode(QGraphicsItem.ItemCoordinateCache)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
         self.log = logging.getLogger(__name__)
 
         self.is_visible = True
         self.is_enabled = True
 
-        self.scene_rect = self.parent().sceneRect()
+        self.view_rect = QRectF()
+        # rendered grid tiles, keyed by grid-size
+        self._tile_cache = {}
 
-        # self.main_window().s_load_project.connect(self.c_load_project)
         self.map_view().s_zoom_changed.connect(self.c_zoom_changed)
-
-
-        # self.parent().parent().s_zoom_viewp.connect(self.c_zoom_viewport)
-
-        # this will be multiplied by 10 when the grid gets to big
-        # self.tile_size =  # 50 as meters in block 20.4
-
+        self.map_view().s_viewport_changed.connect(self.c_viewport_changed)
 
     def show(self):
         self.log.debug(f'Showing GridOverlay')
         self.is_visible = True
         self.setVisible(True)  # call on parent
-        self.render()
+        self.update()
 
     def hide(self):
         self.log.info(f'Hidding GridOverlay')
         self.is_visible = False
         self.setVisible(False)  # call on parent
 
-    #def update(self):
-
-
     def paint(self, painter, option, widget, PySide6_QtWidgets_QWidget=None, NoneType=None, *args, **kwargs):
         if self.is_enabled is not True or self.is_visible is not True:
-            self.log.debug("Grid overlay not visible")
             return
-        self.log.debug('Grid overlay is rendered')
-
-        self.scene_rect = self.parent().sceneRect()
-        tile_size = self.get_grid_size(self.map_view().get_current_zoom())
-
-        y_append = QPointF(0, tile_size)
-        x_append = QPointF(tile_size, 0)
-
-        view_rect = self.parent().view_rect()
-
-        y_left = view_rect.topLeft()
-        y_right = view_rect.topRight()
-        x_top = view_rect.topLeft()
-        x_bottom = view_rect.bottomLeft()
-        painter.setPen(Qt.red)
-        painter.drawRect(self.parent().sceneRect())
-        painter.setPen(Qt.black)
-        while True:
-            break_loop = 0
-            y_left += y_append
-            y_right += y_append
-            x_top += x_append
-            x_bottom += x_append
-            if y_left.y() > view_rect.bottomLeft().y():
-                break_loop += 1
-            else:
-                painter.drawLine(y_left, y_right)
-            if x_top.x() > view_rect.topRight().x():
-                break_loop += 1
-            else:
-                painter.drawLine(x_top, x_bottom)
-            if break_loop > 1:
-                break
+        with self.map_view().profiler.measure('GridOverlay'):
+            self._paint_grid(painter, option)
+
+    def _paint_grid(self, painter, option):
+
+        grid_size = self.get_grid_size(self.map_view().get_current_zoom())
+        if grid_size < 1:
+            return
+        exposed_rect = option.exposedRect
+
+        if painter.worldTransform().isScaling():
+            # a scaled pixmap would blur the lines, draw them instead.
+            painter.setPen(Qt.black)
+            painter.drawLines(self.grid_lines(exposed_rect, grid_size))
+            return
+
+        tile = self.get_grid_tile(grid_size)
+        # the tiles are aligned on the scene origin, so the offset is the position of the rect within a tile.
+        offset = QPointF(exposed_rect.left() % tile.width(), exposed_rect.top() % tile.height())
+        painter.drawTiledPixmap(exposed_rect, tile, offset)
 
     def get_grid_size(self, zoom_level: float) -> int:
         return int(zoom_level)
 
+    def get_grid_tile(self, grid_size: int) -> QPixmap:
+        if grid_size not in self._tile_cache:
+            cells = max(1, math.ceil(SCENE_MAP_TILE_SIZE / grid_size))
+            size = cells * grid_size
+            tile = QPixmap(size, size)
+            tile.fill(Qt.transparent)
+            painter = QPainter(tile)
+            painter.setPen(Qt.black)
+            painter.drawLines(self.grid_lines(QRectF(0, 0, size, size), grid_size))
+            painter.end()
+            self._tile_cache[grid_size] = tile
+        return self._tile_cache[grid_size]
+
+    @staticmethod
+    def grid_lines(rect: QRectF, grid_size: int) -> list:
+        """
+            Returns the lines of a grid (aligned on the scene origin) which are within the rect.
+            Lines are placed on every multiple of the grid_size, the right/bottom edges of the rect are excluded.
+        """
+        lines = []
+        x = math.ceil(rect.left() / grid_size) * grid_size
+        while x < rect.right():
+            lines.append(QLineF(x, rect.top(), x, rect.bottom()))
+            x += grid_size
+        y = math.ceil(rect.top() / grid_size) * grid_size
+        while y < rect.bottom():
+            lines.append(QLineF(rect.left(), y, rect.right(), y))
+            y += grid_size
+        return lines
+
 
 class SatelliteOverlay(QGraphicsItemGroup, TileGridMixin, GeoMixin):
 
@@ -126,6 +148,7 @@ class SatelliteOverlay(QGraphicsItemGroup, TileGridMixin, GeoMixin):
         self.map_view = self.parent().parent()
         self.sql_manager = SqlManager()
         self.thread_pool = QThreadPool()
+        self.tile_requests = TileRequests(self.thread_pool)
         self.log = logging.getLogger(__name__)
         self._provider = None
 
@@ -166,7 +189,11 @@ class SatelliteOverlay(QGraphicsItemGroup, TileGridMixin, GeoMixin):
 
     def get_provider(self):
         if self._provider is None:
-            self._provider = GoogleMapsProvider(self)
+            bundle_path = Preferences.get('tile_bundle_path', '', str)
+            if bundle_path != '' and pathlib.Path(bundle_path).exists():
+                self._provider = TileBundleProvider(self, bundle_path)
+            else:
+                self._provider = GoogleMapsProvider(self)
             self.tile_size = self._provider.TILE_SIZE
         return self._provider
 
@@ -197,6 +224,10 @@ class SatelliteOverlay(QGraphicsItemGroup, TileGridMixin, GeoMixin):
 
 
     def render(self):
+        with self.map_view.profiler.measure('SatelliteOverlay'):
+            self._render()
+
+    def _render(self):
         tile_colors = [
             #Qt.white,
             Qt.green,
@@ -219,25 +250,38 @@ class SatelliteOverlay(QGraphicsItemGroup, TileGridMixin, GeoMixin):
             return
 
         grid = self._generate_grid()
-        self.log.warning(f'Grid-Size: {grid["tile_count"]}, tile_count {len(grid["tiles"])}')
+        self.log.debug(f'Grid-Size: {grid["tile_count"]}, tile_count {len(grid["tiles"])}')
         self.flush()
-        self.log.error(f'Bounding-box before: {self.boundingRect()}')
-        for tile in grid['tiles']:
-            worker = tile.thread_object()  # this sets the x/y.. ;p
+        self.log.debug(f'Bounding-box before: {self.boundingRect()}')
+        if self.get_provider().IS_OFFLINE is True:
+            # reading from the bundle is a memory-mapped lookup, no need for the thread-pool.
+            # its tiles are on the XYZ boundaries, not on those of the grid.
+            for rect, tile_pixmap in self.get_provider().get_grid_tiles(self.map_center_latlng, grid['tile_count'], self.zoom_level):
+                if tile_pixmap.isNull():
+                    tile_pixmap = pxmap.copy(0, 0, rect.width(), rect.height())
+                item = QGraphicsPixmapItem(tile_pixmap)
+                item.setPos(rect.topLeft())
+                self.addToGroup(item)
+        else:
+            for tile in grid['tiles']:
+                worker = tile.thread_object()  # this sets the x/y.. ;p
 
-            item = tile.graphics_item
-            item.setPixmap(pxmap)
+                item = tile.graphics_item
+                item.setPixmap(pxmap)
 
-            self.addToGroup(item)
-            #
-            #worker.set_url(self.get_provider())
-            #self.thread_pool.start(worker)
+                self.addToGroup(item)
+                #
+                #worker.set_url(self.get_provider())
+                #self.tile_requests.start(worker)
 
         self.center_on_view()
-        self.log.error(f'Bounding-box after: {self.boundingRect()}')
+        self.log.debug(f'Bounding-box after: {self.boundingRect()}')
         self.render_count += 1
 
 
+    def tile_queue_depth(self) -> int:
+        return self.tile_requests.pending()
+
     def flush(self):
         children = self.childItems()
         if len(children) > 0:
@@ -0,0 +1,276 @@
+import logging
+import math
+import pathlib
+
+from PySide6.QtCore import QPointF, QSize, QByteArray, QRect
+from PySide6.QtGui import QPixmap
+from PySide6.QtSql import QSqlDatabase, QSqlQuery
+
+from Config.Constants import TILE_BUNDLE_CONNECTION_NAME, TILE_BUNDLE_MMAP_SIZE, TILE_BUNDLE_MAX_TILES, \
+    TILE_BUNDLE_ZOOM_MIN, TILE_BUNDLE_ZOOM_MAX, DEGREES_N, DEGREES_E, DEGREES_S, DEGREES_W
+from Gui.Scene.CoordSystem import TranslateCoordinates
+from Gui.Scene.Providers.Mixins import TileGridMixin
+from Gui.Scene.Providers.Satellite import GoogleMapsProvider
+from Utils import Request
+from Utils.Settings import Preferences
+from Workers.Mixins import WorkerMixin
+
+
+class TileBundle:
+    """
+        A single file containing all map-tiles for a project, so we can show the satellite overlay without a network.
+
+        The layout is MBTiles (https://github.com/mapbox/mbtiles-spec), which is just a sqlite file with a
+        "metadata" and a "tiles" table. MBTiles stores rows as TMS (y flipped), the rest of our code uses the
+        google-style XYZ numbering, so the flipping is done in here and nowhere else.
+
+        When opened read-only the file is memory-mapped by sqlite (PRAGMA mmap_size),
+        so reading a tile is a page lookup in the mapped file instead of a read() call.
+    """
+
+    def __init__(self, file_path: str, read_only: bool = True, connection_name: str = TILE_BUNDLE_CONNECTION_NAME):
+        self.log = logging.getLogger(__name__)
+        self.file_path = str(file_path)
+        self.read_only = read_only
+        self.connection_name = connection_name
+        self._get_query = None
+
+        if QSqlDatabase.contains(connection_name):
+            QSqlDatabase.removeDatabase(connection_name)
+        self.db = QSqlDatabase.addDatabase('QSQLITE', connection_name)
+        self.db.setDatabaseName(self.file_path)
+        if read_only is True:
+            self.db.setConnectOptions('QSQLITE_OPEN_READONLY')
+
+        if not self.db.open():
+            raise ConnectionError(f"Tile bundle error: {self.db.lastError()}")
+
+        self._exec(f'PRAGMA mmap_size={TILE_BUNDLE_MMAP_SIZE}')
+        if read_only is False:
+            self.create_tables()
+
+    def create_tables(self):
+        self._exec('CREATE TABLE IF NOT EXISTS metadata (name TEXT, value TEXT)')
+        self._exec('CREATE UNIQUE INDEX IF NOT EXISTS metadata_name ON metadata (name)')
+        self._exec("""
+            CREATE TABLE IF NOT EXISTS tiles (
+                zoom_level INTEGER,
+                tile_column INTEGER,
+                tile_row INTEGER,
+                tile_data BLOB
+            )
+        """)
+        self._exec('CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row)')
+
+    def close(self):
+        if self._get_query is not None:
+            self._get_query.finish()
+            self._get_query = None
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+            QSqlDatabase.removeDatabase(self.connection_name)
+
+    def begin(self):
+        self.db.transaction()
+
+    def commit(self):
+        self.db.commit()
+
+    @staticmethod
+    def tms_row(zoom: int, y: int) -> int:
+        return int(math.pow(2, zoom)) - 1 - y
+
+    def put_tile(self, zoom: int, x: int, y: int, data: bytes):
+        self._exec(
+            'INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)',
+            [zoom, x, self.tms_row(zoom, y), QByteArray(data)]
+        )
+
+    def get_tile(self, zoom: int, x: int, y: int) -> bytes:
+        # this one is called for every tile on screen, so we keep the prepared statement around.
+        if self._get_query is None:
+            self._get_query = QSqlQuery(self.db)
+            self._get_query.prepare('SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?')
+
+        query = self._get_query
+        query.bindValue(0, zoom)
+        query.bindValue(1, x)
+        query.bindValue(2, self.tms_row(zoom, y))
+        query.exec_()
+        data = None
+        if query.next():
+            data = bytes(query.value(0))
+        query.finish()
+        return data
+
+    def tile_count(self) -> int:
+        query = self._exec('SELECT COUNT(*) FROM tiles')
+        if query.next():
+            return int(query.value(0))
+        return 0
+
+    def set_metadata(self, values: dict):
+        for name, value in values.items():
+            self._exec('INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)', [name, str(value)])
+
+    def get_metadata(self) -> dict:
+        query = self._exec('SELECT name, value FROM metadata')
+        metadata = {}
+        while query.next():
+            metadata[query.value(0)] = query.value(1)
+        return metadata
+
+    def _exec(self, sql: str, params: list = None) -> QSqlQuery:
+        query = QSqlQuery(self.db)
+        query.prepare(sql)
+        for value in params or []:
+            query.addBindValue(value)
+        if query.exec_() is False:
+            self.log.error(f'Tile bundle query failed: {query.lastError().text()} for sql: {sql}')
+        return query
+
+
+class TileBundleProvider(TileGridMixin):
+    """
+        Drop-in for the GoogleMapsProvider which reads its tiles from a TileBundle instead of the network.
+    """
+
+    TILE_SIZE = QSize(256, 256)
+    IS_OFFLINE = True
+
+    def __init__(self, parent, file_path: str):
+        self._parent = parent
+        self.log = logging.getLogger(__name__)
+        self.bundle = TileBundle(file_path, read_only=True)
+
+    def get_grid_tiles(self, map_center: QPointF, tile_count: QSize, zoom_level: float) -> list:
+        """
+            Returns (QRect, QPixmap) for every bundle tile on the grid of get_tiles_for_grid(), in grid pixels.
+
+            The grid is laid out around the map center (the middle of its center tile), the XYZ tiles of the bundle
+            are not. Every tile is placed at its own origin, the same tile boundaries as get_xyz_tile_url(), and is
+            cut off at the border of the grid. The pixmap is null when the bundle has no such tile.
+        """
+        zoom = math.floor(zoom_level)
+        size = self.WORLD_TILE_SIZE
+        center = self.latlng_2_xy(map_center, zoom)
+        grid = QRect(0, 0, tile_count.width() * size, tile_count.height() * size)
+        # the XYZ coordinate at the top-left of the grid.
+        left = center.x() - (math.ceil(tile_count.width() / 2) - 0.5)
+        top = center.y() - (math.ceil(tile_count.height() / 2) - 0.5)
+        # whole pixels, so the tiles next to each other have no seams.
+        offset_x = round((math.floor(left) - left) * size)
+        offset_y = round((math.floor(top) - top) * size)
+        max_tile = int(math.pow(2, zoom)) - 1
+
+        tiles = []
+        for column in range(0, math.ceil(grid.width() / size) + 1):
+            x = math.floor(left) + column
+            for row in range(0, math.ceil(grid.height() / size) + 1):
+                y = math.floor(top) + row
+                rect = QRect(offset_x + column * size, offset_y + row * size, size, size)
+                visible = rect.intersected(grid)
+                if visible.isEmpty() or not (0 <= x <= max_tile and 0 <= y <= max_tile):
+                    continue
+                pixmap = QPixmap()
+                data = self.bundle.get_tile(zoom, x, y)
+                if data is not None and pixmap.loadFromData(data):
+                    pixmap = pixmap.copy(visible.translated(-rect.topLeft()))
+                tiles.append((visible, pixmap))
+        return tiles
+
+    def close(self):
+        self.bundle.close()
+
+
+class TileBundleBuilder(WorkerMixin, TileGridMixin):
+    """
+        Fetches every tile within the extent for every zoom-level and packs it into a TileBundle.
+
+        Tiles are fetched through Request.cached_image, so anything already seen in the application is not
+        downloaded again.
+        On success the bundle is set as the "tile_bundle_path" preference, which makes the SatelliteOverlay use it.
+    """
+
+    def __init__(self,
+                 out_file: str,
+                 north_west: QPointF,
+                 south_east: QPointF,
+                 zoom_min: int = TILE_BUNDLE_ZOOM_MIN,
+                 zoom_max: int = TILE_BUNDLE_ZOOM_MAX):
+        super().__init__()
+        self.log = logging.getLogger(__name__)
+        self.out_file = out_file
+        self.north_west = north_west
+        self.south_east = south_east
+        self.zoom_min = zoom_min
+        self.zoom_max = zoom_max
+        self.provider = GoogleMapsProvider(self)
+
+    @classmethod
+    def extent_around(cls, center: QPointF, radius: float) -> tuple:
+        """
+            Returns the north_west / south_east lat/lng of the square with the center and a "radius" in meters.
+        """
+        coords = TranslateCoordinates()
+        north = coords.latlng_at_distance(center, radius, DEGREES_N).x()
+        south = coords.latlng_at_distance(center, radius, DEGREES_S).x()
+        east = coords.latlng_at_distance(center, radius, DEGREES_E).y()
+        west = coords.latlng_at_distance(center, radius, DEGREES_W).y()
+        return QPointF(north, west), QPointF(south, east)
+
+    def run(self):
+        tiles = self.get_tiles_for_extent(self.north_west, self.south_east, self.zoom_min, self.zoom_max)
+        if len(tiles) > Preferences.get('tile_bundle_max_tiles', TILE_BUNDLE_MAX_TILES, int):
+            self.s_error.emit('TILE_BUNDLE_TOO_LARGE', Exception(f'{len(tiles)} tiles requested'))
+            self.finished()
+            return
+
+        if pathlib.Path(self.out_file).exists():
+            pathlib.Path(self.out_file).unlink()
+
+        bundle = TileBundle(self.out_file, read_only=False, connection_name=f'{TILE_BUNDLE_CONNECTION_NAME}_builder')
+        bundle.set_metadata({
+            'name': pathlib.Path(self.out_file).stem,
+            'type': 'baselayer',
+            'version': '1.1',
+            'format': GoogleMapsProvider.IMAGE_EXTENSION,
+            'bounds': f'{self.north_west.y()},{self.south_east.x()},{self.south_east.y()},{self.north_west.x()}',
+            'minzoom': self.zoom_min,
+            'maxzoom': self.zoom_max,
+        })
+
+        missing = 0
+        progress = -1
+        bundle.begin()
+        for index, (zoom, x, y) in enumerate(tiles):
+            if self.is_cancelled():
+                break
+            file = pathlib.Path(Request.cached_image(
+                self.provider.get_xyz_tile_url(zoom, x, y),
+                self.provider.get_xyz_tile_cache_name(zoom, x, y)
+            ))
+            if file.exists():
+                bundle.put_tile(zoom, x, y, file.read_bytes())
+            else:
+                missing += 1
+
+            percentage = math.floor((index + 1) / len(tiles) * 100)
+            if percentage != progress:
+                progress = percentage
+                self.s_task_label.emit(f'Fetching tile {index + 1} of {len(tiles)} (zoom {zoom})')
+                self.s_progress.emit(progress)
+        bundle.commit()
+        bundle.close()
+
+        if self.is_cancelled():
+            pathlib.Path(self.out_file).unlink()
+            self.finished()
+            return
+
+        if missing > 0:
+            self.log.warning(f'{missing} of {len(tiles)} tiles could not be fetched for {self.out_file}')
+
+        Preferences.set('tile_bundle_path', self.out_file)
+        self.finished()
@@ -1,6 +1,7 @@
 import logging
+import threading
 
-from PySide6.QtCore import QObject, Signal, Qt, QPointF, QPoint, QRunnable, Slot, QSize
+from PySide6.QtCore import QObject, Signal, Qt, QPointF, QPoint, QRunnable, Slot, QSize, QThreadPool
 from PySide6.QtGui import QPixmap
 from PySide6.QtWidgets import QGraphicsPixmapItem, QGraphicsTextItem
 
@@ -96,13 +97,43 @@ class GridTileWorkerObject(QRunnable):
         self.tile = tile
         self.url = None
         self.cache_file = None
+        # called from the pool thread once the tile is done, also when it failed.
+        self.on_done = None
 
     def set_url(self, provider):
         self.url = provider.get_tile_url(self.tile.lat_lng, self.tile.zoom_level)
         self.cache_file = provider.get_tile_cache_name(self.tile.lat_lng, self.tile.zoom_level)
 
     def run(self):
-        file = Request.cached_image(self.url, self.cache_file)
-        # @todo I can probably do without the scaling...?
-        pixmap = QPixmap.fromImage(file).scaled(self.tile.tile_size.width(), self.tile.tile_size.height(), Qt.KeepAspectRatioByExpanding)
-        self.tile.s_pixmap_ready.emit(pixmap, self.tile)
+        try:
+            file = Request.cached_image(self.url, self.cache_file)
+            # @todo I can probably do without the scaling...?
+            pixmap = QPixmap.fromImage(file).scaled(self.tile.tile_size.width(), self.tile.tile_size.height(), Qt.KeepAspectRatioByExpanding)
+            self.tile.s_pixmap_ready.emit(pixmap, self.tile)
+        finally:
+            if self.on_done is not None:
+                self.on_done()
+
+
+class TileRequests:
+    """
+        Starts the tile workers on the thread-pool and counts the requests that are not done yet,
+        the ones waiting for a thread as well as the running ones.
+    """
+    def __init__(self, thread_pool: QThreadPool):
+        self.thread_pool = thread_pool
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def start(self, worker: GridTileWorkerObject):
+        with self._lock:
+            self._pending += 1
+        worker.on_done = self._done
+        self.thread_pool.start(worker)
+
+    def pending(self) -> int:
+        return self._pending
+
+    def _done(self):
+        with self._lock:
+            self._pending -= 1
@@ -1,5 +1,4 @@
 import math
-import pyIGRF
 from PySide6.QtCore import QPointF, QPoint, QSize
 
 from Gui.Scene.Providers.DataObject import GridTileObject
@@ -123,6 +122,7 @@ class GeoMixin:
             :param year:
             :return:
         """
+        import pyIGRF  # loads the IGRF coefficient tables, only done when it is used.
         result = pyIGRF.igrf_value(lat_lng.getX(), lat_lng.getY(), alt=depth, year=float(year))
         # @todo Do something with the result and the azimuth...
         # https://pypi.org/project/pyIGRF/
@@ -310,6 +310,33 @@ class TileGridMixin(GeoMixin):
             zoom_level=zoom_level
         )
 
+    def get_tiles_for_extent(self, north_west: QPointF, south_east: QPointF, zoom_min: int, zoom_max: int) -> list:
+        """
+            Returns the (zoom, x, y) of every google-style (XYZ) tile covering the lat/lng rectangle,
+            for every zoom-level between zoom_min and zoom_max (both included).
+
+        :param north_west: QPointF lat/lng of the top-left corner
+        :param south_east: QPointF lat/lng of the bottom-right corner
+        :param zoom_min: int
+        :param zoom_max: int
+        :return: list
+        """
+        tiles = []
+        for zoom in range(zoom_min, zoom_max + 1):
+            top_left = self.latlng_2_xy(north_west, zoom)
+            bottom_right = self.latlng_2_xy(south_east, zoom)
+            max_tile = int(math.pow(2, zoom)) - 1
+
+            x_from = max(0, math.floor(min(top_left.x(), bottom_right.x())))
+            x_to = min(max_tile, math.floor(max(top_left.x(), bottom_right.x())))
+            y_from = max(0, math.floor(min(top_left.y(), bottom_right.y())))
+            y_to = min(max_tile, math.floor(max(top_left.y(), bottom_right.y())))
+
+            for x in range(x_from, x_to + 1):
+                for y in range(y_from, y_to + 1):
+                    tiles.append((zoom, x, y))
+        return tiles
+
     def get_latlng_for_tile(self, tile_coord: QPointF, from_tile: GridTileObject) -> QPointF:
         x_direction = self.HEADING_EAST
         y_direction = self.HEADING_NORTH
@@ -13,6 +13,7 @@ class GoogleMapsProvider(TileGridMixin):
     TILE_SIZE = QSize(640, 640)
     MAP_TYPE = 'satellite'
     IMAGE_EXTENSION = 'jpg'
+    IS_OFFLINE = False
 
     def __init__(self, parent):
         self._parent = parent
@@ -30,3 +31,20 @@ class GoogleMapsProvider(TileGridMixin):
 
     def get_tile_cache_name(self, lat_lng: QPointF, zoom_level: int):
         return f'gsm_zoom-{math.floor(zoom_level)}_lat-{lat_lng.x()}_lng-{lat_lng.y()}.{self.IMAGE_EXTENSION}'
+
+    def get_xyz_tile_url(self, zoom: int, x: int, y: int):
+        """
+            The static maps api has no notion of tiles, yet a 256x256 image centered on the middle of a XYZ tile
+            at the same zoom-level (without scaling) is exactly that tile.
+        """
+        center = self.xy_2_latlng(QPointF(x + 0.5, y + 0.5), zoom)
+        return f'{GOOGLE_STATIC_MAPS_URL}' \
+               f'?key={GOOGLE_STATIC_MAPS_API_KEY}' \
+               f'&center={center.x()},{center.y()}' \
+               f'&zoom={zoom}' \
+               f'&maptype={self.MAP_TYPE}' \
+               f'&size={self.WORLD_TILE_SIZE}x{self.WORLD_TILE_SIZE}' \
+               f'&format={self.IMAGE_EXTENSION}'
+
+    def get_xyz_tile_cache_name(self, zoom: int, x: int, y: int):
+        return f'gsm_xyz_{zoom}-{x}-{y}.{self.IMAGE_EXTENSION}'
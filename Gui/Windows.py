@@ -1,22 +1,22 @@
 import logging
 import os
 
-from PySide6.QtCore import QSettings, QSize, QPoint, QMimeData, Signal, QPointF, Slot
-from PySide6.QtGui import QIcon, Qt, QCloseEvent, QDrag, QPixmap, QColor, QResizeEvent, QMouseEvent
+from PySide6.QtCore import QSettings, QSize, QPoint, QMimeData, Signal, QPointF, Slot, QRectF, QTimer
+from PySide6.QtGui import QIcon, Qt, QCloseEvent, QDrag, QPixmap, QColor, QResizeEvent, QMouseEvent, QPainter
 from PySide6.QtOpenGLWidgets import QOpenGLWidget
 
 from PySide6.QtWidgets import QMainWindow, QWidget, QTreeView, QDockWidget, QMessageBox, \
     QAbstractItemView, QVBoxLayout, QTextBrowser, QPushButton, QComboBox, QHBoxLayout, QGraphicsView, QSplashScreen
 
 from Config.Constants import MAIN_WINDOW_TITLE, MAIN_WINDOW_STATUSBAR_TIMEOUT, TREE_MIN_WIDTH, TREE_START_WIDTH, \
-    MAIN_WINDOW_ICON, DEBUG, APPLICATION_SPLASH_IMAGE
+    MAIN_WINDOW_ICON, DEBUG, APPLICATION_SPLASH_IMAGE, APPLICATION_STARTUP_BUDGET
 from Gui.Actions import GlobalActions
-from Gui.Dialogs import StartupWidget
-from Gui.Scene.MainScene import MainScene
+from Gui.Dialogs import StartupWidget, ErrorDialog
 from Gui.Menus import MainMenu, ContextMenuSurvey, ContextMenuLine, ContextMenuStation, ContextMenuImports, MapsToolBar
 from Models.ItemModels import ProxyModel
+from Models.SurveyStore import SurveyStore
 from Models.TableModels import SqlManager
-from Utils.Logging import LogStream
+from Utils.Logging import LogStream, RenderProfiler, Track
 from Utils.Rendering import DragImage
 from Utils.Settings import Preferences
 from Utils.Storage import SaveFile
@@ -83,8 +83,6 @@ class MainApplicationWindow(QMainWindow):
         tree_dock.setWidget(self.tree_view)
         self.addDockWidget(Qt.LeftDockWidgetArea, tree_dock)
 
-        self.s_load_project.connect(self.tree_view.model().c_load_project)
-
         self.map_view = MapView(self)
         self.setCentralWidget(self.map_view)
 
@@ -100,7 +98,25 @@ class MainApplicationWindow(QMainWindow):
 
         self.show()
         self.setFocus()
+        # the window is on screen first, the scene and survey tree are build once the event loop runs.
+        QTimer.singleShot(0, self.deferred_init)
+
+    def deferred_init(self):
+        with Track.startup_phase('scene and survey tree'):
+            self.tree_view.init_model()
+            self.s_load_project.connect(self.tree_view.model().c_load_project)
+            SurveyStore.instance().s_error.connect(self.c_store_error)
+            self.map_view.init_scene()
+
+        with Track.startup_phase('project'):
+            self.open_last_project()
+        Track.startup_report(APPLICATION_STARTUP_BUDGET)
+
+    @Slot(str)
+    def c_store_error(self, error_key: str):
+        ErrorDialog.show_error_key(self, error_key)
 
+    def open_last_project(self):
         settings = QSettings()
         file_name = settings.value('SaveFile/current_file_name', None)
         if file_name is not None and os.path.exists(file_name):
@@ -175,12 +191,15 @@ class SurveyOverview(QTreeView):
         self.setContextMenuPolicy(Qt.CustomContextMenu)
         self.customContextMenuRequested.connect(self.build_contextmenu)
 
-        model = ProxyModel(self.main_window.sql_manager)
-        self.setModel(model)
-
         self.setMinimumWidth(TREE_START_WIDTH)
         self.setMinimumWidth(TREE_MIN_WIDTH)
 
+    def init_model(self):
+        model = ProxyModel(self.main_window.sql_manager)
+        self.setModel(model)
+        self.expanded.connect(model.c_expanded)
+        self.collapsed.connect(model.c_collapsed)
+
     def get_selected_item(self):
         if len(self.selectedIndexes()) == 0:
             return None
@@ -255,22 +274,37 @@ class MapView(QGraphicsView):
         @param float old_zoom
     """
     s_zoom_changed = Signal(float, float)
+    """
+        will be emitted when the visible part of the scene changed (resize or scroll).
+        @param QRectF the visible scene rect
+    """
+    s_viewport_changed = Signal(QRectF)
+    """
+        Show/hide the render profiler overlay.
+    """
+    s_toggle_profiler = Signal()
 
     def __init__(self, parent):
         super().__init__(parent)
         self.zoom_level = self.ZOOM_LEVEL_DEFAULT
-
-        open_gl = QOpenGLWidget()
-        self.setViewport(open_gl)
+        self.profiler = RenderProfiler()
         self.log = logging.getLogger(__name__)
+        # set by init_scene(), after the main window is shown.
+        self.map_scene = None
 
+        self.s_change_zoom.connect(self.c_change_zoom)
+        self.s_zoom_changed.connect(self.c_zoom_changed)
+        self.s_toggle_profiler.connect(self.c_toggle_profiler)
 
+    def init_scene(self):
+        from Gui.Scene.MainScene import MainScene
 
-
+        open_gl = QOpenGLWidget()
+        self.setViewport(open_gl)
         self.map_scene = MainScene(self)
         self.setScene(self.map_scene)
-        self.s_change_zoom.connect(self.c_change_zoom)
-        self.s_zoom_changed.connect(self.c_zoom_changed)
+        # the overlays missed the resize of the (already shown) view.
+        self.s_viewport_changed.emit(self.map_scene.view_rect())
 
     def get_current_zoom(self) -> float:
         return self.zoom_level
@@ -294,6 +328,50 @@ class MapView(QGraphicsView):
     def c_zoom_changed(self, new_zoom: float, old_zoom: float):
         self.log.info(f'Zoom level changed from {old_zoom} too: {new_zoom}')
 
+    @Slot()
+    def c_toggle_profiler(self):
+        if self.profiler.is_enabled:
+            # leave the numbers in the DebugConsole before they are gone.
+            for line in self.profiler.summary_lines():
+                self.log.info(f'Render profile: {line}')
+        self.profiler.enable(not self.profiler.is_enabled)
+        self.viewport().update()
+
+    def paintEvent(self, event) -> None:
+        if self.profiler.is_enabled is False or self.map_scene is None:
+            super().paintEvent(event)
+            return
+        self.profiler.frame_start()
+        super().paintEvent(event)
+        self.profiler.frame_end(
+            item_count=len(self.map_scene.items()),
+            tile_queue=self.map_scene.tile_queue_depth()
+        )
+
+    def drawForeground(self, painter: QPainter, rect: QRectF) -> None:
+        super().drawForeground(painter, rect)
+        if self.profiler.is_enabled is False:
+            return
+        lines = self.profiler.summary_lines()
+        painter.save()
+        painter.resetTransform()
+        line_height = painter.fontMetrics().height()
+        painter.fillRect(QRectF(5, 5, 320, line_height * len(lines) + 10), QColor(255, 255, 255, 200))
+        painter.setPen(Qt.black)
+        for index, line in enumerate(lines):
+            painter.drawText(QPointF(10, 5 + line_height * (index + 1)), line)
+        painter.restore()
+
+    def resizeEvent(self, event: QResizeEvent) -> None:
+        super().resizeEvent(event)
+        if self.map_scene is not None:
+            self.s_viewport_changed.emit(self.map_scene.view_rect())
+
+    def scrollContentsBy(self, dx: int, dy: int) -> None:
+        super().scrollContentsBy(dx, dy)
+        if self.map_scene is not None:
+            self.s_viewport_changed.emit(self.map_scene.view_rect())
+
     # # ZOOM_DEFAULT_LEVEL = 20
     # # ZOOM_MAX_LEVEL = 20.75
     # # ZOOM_MIN_LEVEL = 0
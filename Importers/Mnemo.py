@@ -1,19 +1,47 @@
+import array
+import hashlib
+import itertools
 import json
 import logging
+import mmap
+import multiprocessing
 import os
+import pathlib
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
-import serial
-from serial.tools import list_ports
-
-from Config.Constants import MNEMO_DEVICE_NAME, MNEMO_DEVICE_DESCRIPTION, MNEMO_CYCLE_COUNT, SURVEY_DIRECTION_IN, \
-    SURVEY_DIRECTION_OUT
+from Config.Constants import MNEMO_DEVICE_NAME, MNEMO_DEVICE_DESCRIPTION, MNEMO_INACTIVITY_TIMEOUT, SURVEY_DIRECTION_IN, \
+    SURVEY_DIRECTION_OUT, MNEMO_DEVICE_ENV, MNEMO_DUMP_BINARY, MNEMO_BINARY_DUMP_MAGIC, \
+    MNEMO_BATCH_MAX_WORKERS, MNEMO_EXPORT_CHUNK_SIZE, MNEMO_SKIP_DUPLICATES
 from Models.TableModels import ImportSurvey, ImportLine, ImportStation, SqlManager
 from Utils.Settings import Preferences
 from Workers.Mixins import WorkerMixin
 
 
+def parse_dump_file(path):
+    """
+        Returns the (signed int8) values of a dump-file, the format is detected by its header.
+
+        Text dump-files (";" separated, as written by Ariane) are returned as list.
+        Binary dump-files (MNEMO_BINARY_DUMP_MAGIC followed by the raw bytes) are memory-mapped and returned as a
+        signed memoryview on the map, nothing is copied or converted until the decoder indexes it.
+    """
+    with open(path, "rb") as dmp_file:
+        if dmp_file.read(len(MNEMO_BINARY_DUMP_MAGIC)) == MNEMO_BINARY_DUMP_MAGIC:
+            if os.fstat(dmp_file.fileno()).st_size == len(MNEMO_BINARY_DUMP_MAGIC):
+                return []
+            # the map stays open for as long as the memoryview is referenced.
+            mapped = mmap.mmap(dmp_file.fileno(), 0, access=mmap.ACCESS_READ)
+            return memoryview(mapped)[len(MNEMO_BINARY_DUMP_MAGIC):].cast('b')
+
+    with open(path, "r") as dmp_file:
+        lines = dmp_file.readlines()
+        values = lines[0].split(';')
+        if values[-1] == '' or values[-1] == "\n":
+            values.pop()
+        return [int(i) for i in values]
 
 
 class MnemoImporter(WorkerMixin):
@@ -30,13 +58,17 @@ class MnemoImporter(WorkerMixin):
             timeout=1,
 
             in_file=None,
-            out_file=None
+            out_file=None,
+            inactivity_timeout: float = None
 
     ):
         super().__init__()
         self.device = device
         self.baudrate = baudrate
         self.timeout = timeout
+        if inactivity_timeout is None:
+            inactivity_timeout = Preferences.get('mnemo_inactivity_timeout', MNEMO_INACTIVITY_TIMEOUT, float)
+        self.inactivity_timeout = inactivity_timeout
 
         self.import_list = None
         self.survey = None
@@ -47,7 +79,7 @@ class MnemoImporter(WorkerMixin):
         self.last_error = None
 
     def run(self):
-        self.set_sql_manager('MNEMO_WORKER_THREAD')
+        self.set_sql_manager()
         if self.tread_action == self.ACTION_WRITE_DUMP:
             try:
                 self.read_from_device()
@@ -55,19 +87,22 @@ class MnemoImporter(WorkerMixin):
                 self.s_task_label.emit('Done')
                 self.finished()
             except Exception as error:
-                self.s_error.emit(str(error), error if self.last_error is None else self.last_error)
+                self._emit_error(error)
                 self.finished()
             return
 
         if self.tread_action == self.ACTION_READ_DEVICE:
+            reader = None
             try:
-                self.read_from_device()
-                survey_id = self.parse_bytelist()
-                self.s_task_label.emit('Done')
-                self.s_reload_treeview.emit(survey_id)
+                reader = MnemoDmpReader(sql_manager=self.sql_manager(), on_line=self.s_line_added.emit)
+                self.read_from_device(on_data=reader.feed)
+                survey_id = reader.close()
+                self._imported(survey_id)
                 self.finished()
             except Exception as error:
-                self.s_error.emit(str(error), error if self.last_error is None else self.last_error)
+                if reader is not None:
+                    self._discard(reader.survey_id)
+                self._emit_error(error)
                 self.finished()
             return
 
@@ -75,11 +110,10 @@ class MnemoImporter(WorkerMixin):
             try:
                 self.read_dump_file(self.in_file)
                 survey_id = self.parse_bytelist()
-                self.s_reload_treeview.emit(survey_id)
-                self.s_task_label.emit('Done')
+                self._imported(survey_id)
                 self.finished()
             except Exception as error:
-                self.s_error.emit(str(error), error if self.last_error is None else self.last_error)
+                self._emit_error(error)
                 self.finished()
                 raise error
             return
@@ -87,7 +121,41 @@ class MnemoImporter(WorkerMixin):
         self.s_error.emit(f'Unknown threadAction: {self.tread_action}')
         self.finished()
 
-    def read_from_device(self):
+    def _imported(self, survey_id: int):
+        if survey_id is None:
+            # every line was imported before (see MnemoDmpReader.skip_duplicates).
+            self.s_task_label.emit('Done, all lines were imported before')
+            return
+        self.s_reload_treeview.emit(survey_id)
+        self.s_task_label.emit('Done')
+
+    def _discard(self, survey_id: int):
+        """
+            Removes the survey of a read that did not finish, the lines reported so far are taken out of the tree.
+        """
+        if survey_id is None:
+            return
+        try:
+            self.sql_manager().factor(ImportSurvey).delete(survey_id)
+        except Exception as error:
+            logging.getLogger(__name__).error(f'Could not remove the incomplete survey {survey_id}: {error}')
+            return
+        self.s_reload_treeview.emit(survey_id)
+
+    def _emit_error(self, error: Exception):
+        if self.is_cancelled():
+            # the user pressed cancel, there is nothing to report.
+            self.s_task_label.emit('Cancelled')
+            return
+        self.s_error.emit(str(error), error if self.last_error is None else self.last_error)
+
+    def read_from_device(self, on_data=None):
+        """
+            Reads the complete dump into self.import_list,
+            on_data(int8_list) is called with every chunk as it comes in (see MnemoDmpReader.feed()).
+        """
+        import serial
+
         try:
             self.s_task_label.emit('Connecting to device')
             self.device = self.get_device_location(self.device)
@@ -123,58 +191,42 @@ class MnemoImporter(WorkerMixin):
             ]
             for d in dt:
                 ser.write(d)
-            dump_file = []
-            c = 0
-            x = 0
-            # Within ariane a harcoded / non-resettable cycle-count of 100 is used
-            # Yet when debugging,.. I haven't seen it use more then 3 ever...
-            cycle_count = Preferences.get('mnemo_cycle_count', MNEMO_CYCLE_COUNT, int)
-            while True:
-                if c > cycle_count:
-                    # time.sleep(0.5)  # @todo why is this here?
-                    self.s_task_label.emit('Finished reading data')
-                    if len(dump_file) == 0:
-                        raise Exception('NO_DATA_FOUND')
-                    else:
-                        self.import_list = dump_file
+            reader = MnemoSerialReader(
+                ser,
+                inactivity_timeout=self.inactivity_timeout,
+                cancel_event=self.cancel_event,
+                on_progress=self._read_progress,
+                on_data=on_data
+            )
+            try:
+                dump_file = reader.read()
+            finally:
+                if ser.is_open:
                     ser.close()
-                    break
-                c = c + 1
-                time.sleep(0.1)
-                self.s_task_label.emit(f'Searching for entries {c} tries left')
-                while ser.in_waiting > 0:
-                    x = x + 1
-                    self.s_task_label.emit(f'Reading byte {x}')
-                    dump_file.append(self._setbit_to_uint8(ser.read(1)))
-                    self.s_progress.emit(x)
-                    # reset the cycle count here, should allow us to use a even lower cycle count.
-                    c = 0
 
+            self.s_task_label.emit('Finished reading data')
+            if len(dump_file) == 0:
+                raise Exception('NO_DATA_FOUND')
             self.import_list = dump_file
-            if ser.is_open:
-                ser.close()
 
         except KeyboardInterrupt:
-            if ser.is_open:
-                ser.close()
             print('Keyboard interupt... RESTART THE MNEMO before rereading as you will end up somewhere in the middle of the stream.')
 
+    def _read_progress(self, byte_count: int):
+        self.s_task_label.emit(f'Read {self._readable_size(byte_count)}')
+        self.s_progress.emit(byte_count)
+
     def read_dump_file(self, path):
         f_size = self._readable_size(os.stat(path).st_size)
         self.s_task_label.emit(f'Reading file {f_size}')
-        with open(path, "r") as dmp_file:
-            lines = dmp_file.readlines()
-            list = lines[0].split(';')
-            if list[-1] == '' or list[-1] == "\n":
-                list.pop()
-            self.import_list = [int(i) for i in list]
+        self.import_list = parse_dump_file(path)
 
     def write_dumpfile(self, path):
         if not self.import_list:
             raise Exception('NO_DATA_FOUND')
         self.s_task_label.emit('Writing data to file.')
         writer = MnemoDumpWriter(self.import_list)
-        writer.write_file(path)
+        writer.write_file(path, binary=Preferences.get('mnemo_dump_binary', MNEMO_DUMP_BINARY, bool))
 
     def parse_bytelist(self) -> int:
         if not self.import_list:
@@ -186,6 +238,10 @@ class MnemoImporter(WorkerMixin):
 
     def get_device_location(self, device=None):
         if device is None:
+            # set when running against the MnemoEmulator (or any other serial device that is not the MCP2221)
+            device = os.environ.get(MNEMO_DEVICE_ENV)
+        if device is None:
+            from serial.tools import list_ports
             ports = list_ports.comports()
             for port in ports:
                 if port.description == Preferences.get('mnemo_device_description', MNEMO_DEVICE_DESCRIPTION):
@@ -227,6 +283,235 @@ class MnemoImporter(WorkerMixin):
         return self._readable_size(byte_length / 1000, index + 1)
 
 
+class MnemoBatchImporter(WorkerMixin):
+    """
+        Imports every dump-file in a directory.
+
+        The files are decoded in parallel by a pool of processes (see decode_dump_file), without touching the database.
+        The decoded surveys are then stored in a single transaction, so either all readable files end up in the
+        project or none. Lines that are in the project already (or in an earlier file) are left out when
+        skip_duplicates is set, a survey of only such lines is not stored at all.
+        Files that could not be decoded are skipped and reported together at the end.
+    """
+
+    def __init__(self, in_dir, max_workers: int = MNEMO_BATCH_MAX_WORKERS, db_location: str = None,
+                 skip_duplicates: bool = None):
+        super().__init__()
+        self.in_dir = pathlib.Path(in_dir)
+        self.max_workers = max_workers
+        self.db_location = db_location
+        if skip_duplicates is None:
+            skip_duplicates = Preferences.get('mnemo_skip_duplicates', MNEMO_SKIP_DUPLICATES, bool)
+        self.skip_duplicates = skip_duplicates
+        self.errors = {}
+
+    @staticmethod
+    def dump_files(in_dir) -> list:
+        return sorted(path for path in pathlib.Path(in_dir).glob('*.dmp') if path.is_file())
+
+    def run(self):
+        files = self.dump_files(self.in_dir)
+        if len(files) == 0:
+            self.s_error.emit('NO_DUMP_FILES', Exception(str(self.in_dir)))
+            self.finished()
+            return
+
+        decoded = self.decode(files)
+        if self.is_cancelled():
+            self.s_task_label.emit('Cancelled')
+            self.finished()
+            return
+
+        self.s_task_label.emit(f'Storing {len(decoded)} surveys')
+        self.set_sql_manager(db_location=self.db_location)
+        db = self.sql_manager().db
+        db.transaction()
+        try:
+            survey_ids = [survey.store(self.sql_manager(), self.skip_duplicates) for survey in decoded]
+            db.commit()
+        except Exception as error:
+            db.rollback()
+            self.s_error.emit('BATCH_IMPORT_FAILED', error)
+            self.finished()
+            return
+
+        for survey_id in survey_ids:
+            if survey_id is not None:
+                self.s_reload_treeview.emit(survey_id)
+        if len(self.errors) > 0:
+            self.s_error.emit(
+                'BATCH_IMPORT_ERRORS',
+                Exception('<br />'.join(f'{name}: {error}' for name, error in self.errors.items()))
+            )
+        self.s_task_label.emit('Done')
+        self.finished()
+
+    def decode(self, files: list) -> list:
+        """
+            Returns the DecodedSurvey for every file that could be decoded, in the order of files.
+        """
+        device_name = Preferences.get("mnemo_device_name", MNEMO_DEVICE_NAME, str)
+        results = {}
+        errors = {}
+        # spawn instead of fork, forking a process with a running Qt application is asking for trouble.
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as executor:
+            futures = {executor.submit(decode_dump_file, str(path), device_name): index for index, path in enumerate(files)}
+            for done, future in enumerate(as_completed(futures)):
+                if self.is_cancelled():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    return []
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as error:
+                    errors[index] = str(error)
+                self.s_task_label.emit(f'Decoded {done + 1} of {len(files)} files')
+                self.s_progress.emit(done + 1)
+        for index in sorted(errors):
+            self.errors[files[index].name] = errors[index]
+        return [results[index] for index in sorted(results)]
+
+
+def decode_dump_file(path: str, device_name: str = MNEMO_DEVICE_NAME):
+    """
+        Decodes a dump-file without a database, runs in the worker processes of the MnemoBatchImporter.
+    """
+    values = parse_dump_file(path)
+    if len(values) == 0:
+        raise Exception('NO_DATA_FOUND')
+    survey = DecodedSurvey(pathlib.Path(path).name)
+    # the duplicates are left out while storing, there is no database to compare with here.
+    MnemoDmpReader(values, survey, device_name=device_name, skip_duplicates=False).read()
+    return survey
+
+
+class DecodedRows:
+    """
+        Takes the place of the ImportSurvey, ImportLine and ImportStation models within a DecodedSurvey,
+        the rows are the keyword arguments of insert() and the (1 based) position is the id.
+    """
+
+    def __init__(self):
+        self.rows = []
+
+    def insert(self, **values) -> int:
+        self.rows.append(values)
+        return len(self.rows)
+
+    def update(self, values: dict, row_id: int) -> int:
+        self.rows[row_id - 1].update(values)
+        return 1
+
+
+class DecodedSurvey:
+    """
+        A survey decoded by the MnemoDmpReader, without a database.
+
+        It has the factor() method of the SqlManager, so the reader can use it instead.
+        store() inserts everything through the real models and returns the new survey_id.
+    """
+
+    def __init__(self, file_name: str = None):
+        self.file_name = file_name
+        self.tables = {
+            ImportSurvey.__name__: DecodedRows(),
+            ImportLine.__name__: DecodedRows(),
+            ImportStation.__name__: DecodedRows(),
+        }
+
+    def factor(self, model) -> DecodedRows:
+        return self.tables[model.__name__]
+
+    def store(self, sql_manager: SqlManager, skip_duplicates: bool = False) -> int:
+        """
+            Returns None when skip_duplicates left out every line, nothing is stored then.
+        """
+        line_model = sql_manager.factor(ImportLine)
+        lines = self.factor(ImportLine).rows
+        duplicates = set()
+        if skip_duplicates:
+            duplicates = {
+                index + 1 for index, line in enumerate(lines)
+                if line.get('fingerprint') is not None and line_model.has_fingerprint(line['fingerprint'])
+            }
+            if len(lines) > 0 and len(duplicates) == len(lines):
+                return None
+
+        survey = dict(self.factor(ImportSurvey).rows[0])
+        survey['device_properties'] = {**survey['device_properties'], 'file_name': self.file_name}
+        survey_id = sql_manager.factor(ImportSurvey).insert(**survey)
+
+        line_ids = {}
+        for index, line in enumerate(lines):
+            if index + 1 not in duplicates:
+                line_ids[index + 1] = line_model.insert(**{**line, 'survey_id': survey_id})
+
+        station_model = sql_manager.factor(ImportStation)
+        for station in self.factor(ImportStation).rows:
+            if station['line_id'] not in duplicates:
+                station_model.insert(**{**station, 'survey_id': survey_id, 'line_id': line_ids[station['line_id']]})
+        return survey_id
+
+
+class MnemoSerialReader:
+    """
+        Reads the dump from a (handshaked) Mnemo serial connection.
+
+        Reads whatever the device has sent so far in one call (instead of byte per byte),
+        calls on_progress at most once per progress_interval seconds and stops when nothing was received
+        for inactivity_timeout seconds (after the first byte or from the start when nothing ever arrives).
+        on_data is called with every chunk (as int8 list) straight after it was read.
+        Setting the cancel_event stops the read within one poll_interval and raises Exception('IMPORT_CANCELLED').
+
+        The bytes are returned as signed int8 values, just like JAVA (and thus the dump-files) have them.
+    """
+
+    def __init__(self,
+                 ser,
+                 inactivity_timeout: float = MNEMO_INACTIVITY_TIMEOUT,
+                 cancel_event: threading.Event = None,
+                 on_progress=None,
+                 progress_interval: float = 0.2,
+                 poll_interval: float = 0.05,
+                 on_data=None):
+        self.ser = ser
+        self.inactivity_timeout = inactivity_timeout
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.poll_interval = poll_interval
+        self.on_data = on_data
+
+    def read(self) -> list:
+        # a blocking read() returns as soon as there is data, or after the poll_interval without data.
+        self.ser.timeout = self.poll_interval
+        data = []
+        last_data_at = time.monotonic()
+        last_progress_at = 0
+        while True:
+            if self.cancel_event.is_set():
+                raise Exception('IMPORT_CANCELLED')
+
+            chunk = self.ser.read(max(1, self.ser.in_waiting))
+            now = time.monotonic()
+            if len(chunk) > 0:
+                values = array.array('b', chunk).tolist()
+                data.extend(values)
+                last_data_at = now
+                if self.on_data is not None:
+                    self.on_data(values)
+                if self.on_progress is not None and now - last_progress_at >= self.progress_interval:
+                    last_progress_at = now
+                    self.on_progress(len(data))
+            elif now - last_data_at >= self.inactivity_timeout:
+                break
+
+        if self.on_progress is not None and len(data) > 0:
+            self.on_progress(len(data))
+        return data
+
+
 class MnemoDmpReader:
 
     LINE_LENGTH_LINE = 10
@@ -241,124 +526,273 @@ class MnemoDmpReader:
     STATUS_INPROGRESS = 2
     STATUS_END_LINE = 3
 
-    def __init__(self, byte_list: list, sql_manager: SqlManager):
-        self._bytes = byte_list
+    STATE_LINE = 1
+    STATE_STATION = 2
+    STATE_DONE = 3
+
+    def __init__(self, byte_list: list = None, sql_manager: SqlManager = None, on_line=None, device_name: str = None,
+                 skip_duplicates: bool = None):
+        """
+            Either give the complete byte_list and call read(), or feed() the bytes while they arrive and close()
+            when the device is done sending.
+            The byte_list can be anything indexable with signed int8 values, a (memory-mapped) memoryview is used
+            as-is, only lists are copied.
+
+            Fed bytes are parsed as soon as a complete line is available, so the lines end up in the
+            database while the device is still transmitting.
+            on_line(survey_id, line_id) is called for every line as soon as all its stations are stored.
+            Instead of a SqlManager a DecodedSurvey can be given, which keeps everything in memory.
+
+            Every line is stored with the fingerprint of its bytes (see line_fingerprint). With skip_duplicates
+            the lines of which the fingerprint is in the database already are jumped over without being parsed,
+            when that are all lines the survey is removed again and read() returns None.
+        """
+        if byte_list is None:
+            byte_list = []
+        self._bytes = list(byte_list) if isinstance(byte_list, list) else byte_list
         self.sql_manager = sql_manager
+        self.on_line = on_line
+        if device_name is None:
+            device_name = Preferences.get("mnemo_device_name", MNEMO_DEVICE_NAME, str)
+        self.device_name = device_name
+        if skip_duplicates is None:
+            skip_duplicates = Preferences.get('mnemo_skip_duplicates', MNEMO_SKIP_DUPLICATES, bool)
+        self.skip_duplicates = skip_duplicates
+        self.line_count = 0
+        self.skipped_lines = 0
 
         self.survey = self.sql_manager.factor(ImportSurvey)
         self.line = self.sql_manager.factor(ImportLine)
         self.station = self.sql_manager.factor(ImportStation)
 
         self._index = -1
+        self._state = self.STATE_LINE
+        # (index, start, position) where _line_span stopped in a line that is still coming, it goes on from there.
+        self._span_scan = None
+
+        self.survey_id = None
+        self._survey_byte_count = 0
+        self._line_id = -1
+        self._station_id = -1
+        self._line_reference_id = 0
+        self._station_reference_id = 0
+        self._azimuth_in = 0
+        self._azimuth_avg = 0
+        self._length_in = 0
+        self._last_depth = 0
 
         self.logger = logging.getLogger(__name__)
 
-    def read(self) -> list:
-        line_id = -1
-        station_id = -1
-        survey_id = self.survey.insert(
-                device_name=Preferences.get("mnemo_device_name", MNEMO_DEVICE_NAME, str),
+    def read(self) -> int:
+        return self.close()
+
+    def feed(self, byte_list: list):
+        self._bytes.extend(byte_list)
+        self._parse(final=False)
+
+    def close(self) -> int:
+        """
+            No more bytes are coming, whatever is left is parsed like the end of a dump-file.
+        """
+        self._parse(final=True)
+        return self.survey_id
+
+    def _parse(self, final: bool):
+        if self._state == self.STATE_DONE:
+            return
+        if self.survey_id is None:
+            self._survey_byte_count = len(self._bytes)
+            self.survey_id = self.survey.insert(
+                device_name=self.device_name,
                 device_properties={
-                    "bytes_in_dumpfile": len(self._bytes)
+                    "bytes_in_dumpfile": self._survey_byte_count
                 }
             )
-        self.logger.info(f"Created new survey, survey_id={survey_id}")
-        line_reference_id = 0
-        while True:
-            if self.end_of_bytes(self.LINE_LENGTH_LINE):
+            self.logger.info(f"Created new survey, survey_id={self.survey_id}")
+
+        while self._state != self.STATE_DONE:
+            if self._state == self.STATE_LINE:
+                progressed = self._parse_line(final)
+            else:
+                progressed = self._parse_station(final)
+            if progressed is False:
+                return
+
+    def _parse_line(self, final: bool) -> bool:
+        if self.end_of_bytes(self.LINE_LENGTH_LINE):
+            if final is True:
                 # empty line / incomplete line
-                self.logger.info(
-                    f"ln 257: End import at station_id={station_id} line_id={line_id} survey_id={survey_id} (at index {self._index} of {len(self._bytes)}")
-                return survey_id
-
-            # Loop through every line on the device
-            #  2;21;3;7;13;4;66;65;83;0
-            line_reference_id += 1
-            line_props = self.parse_line_part()
-            line_id = self.line.insert(
-                    survey_id=survey_id,
-                    line_reference_id=line_reference_id,
-                    direction=line_props['direction'],
-                    device_properties=line_props
-                )
-            self.logger.info(f"Created new line, line_id={line_id} survey_id={survey_id} (at index {self._index} of {len(self._bytes)}")
-            station_reference_id = 0
-            azimuth_in = 0
-            azimuth_avg = 0
-            length_in = 0
-            while True:
-                if self.end_of_bytes(self.LINE_LENGTH_STATION):
-                    # Here we have LESS than a full station-line.
-                    #   1.) The line is the last entry of the dump, no end-line line exists
-                    #   2.) The next line is incomplete and is smaller then 16 bytes.
-                    if len(self._bytes) - self._jump(self.LINE_LENGTH_STATION+1, False) > 0:
-                        logging.getLogger(__name__).error(f'Found incomplete station with {len(self._bytes) - self._jump(0, False)} bytes, starting at byte: {self._jump(0, False)}, total bytes {len(self._bytes)}')
-                    self.logger.info(
-                        f"ln 281: End import at station_id={station_id} line_id={line_id} survey_id={survey_id} (at index {self._index} of {len(self._bytes)}")
-                    return survey_id
-
-                # Loop through every station for these stations
-                station_reference_id += 1
-                if self.end_of_line():
-                    if station_reference_id == 1:
-                        self.logger.info(f"Empty line, line_id={line_id} survey_id={survey_id} (at index {self._index} of {len(self._bytes)}")
-                        # this is an empty line, don't insert this station
-                        break
-
-                    props = {
-                        "status": True,
-                        "skipped_bytes": 0,
-                        "status_byte": 3,
-                        "comment": "Last station is generated"
-
-                    }
-                    station_id = self.station.insert(
-                        survey_id=survey_id,
-                        line_id=line_id,
-                        line_reference_id=line_reference_id,
-                        station_reference_id=station_reference_id,
-                        length_in=length_in,
-                        length_out=0,
-                        #  we need to reverse the azimuth as we are storing a station and not a line.
-                        #  as the line starts at a point, the azimuth in of a line.. is the azimuth out of a station.
-                        #  the azimuth out of a line..is the azimuth in of a station.
-                        azimuth_in=azimuth_in,
-                        azimuth_out=0,
-                        azimuth_out_avg=azimuth_avg,
-                        depth=last_depth,
-                        station_properties=props,
-                        station_name=f"Station {station_reference_id}"
-                    )
-                    break
-
-                station_props = self.parse_station_part()
-                station_id = self.station.insert(
-                    survey_id=survey_id,
-                    line_id=line_id,
-                    line_reference_id=line_reference_id,
-                    station_reference_id=station_reference_id,
-                    length_in=length_in,
-                    length_out=station_props['length'],
-                    #  we need to reverse the azimuth as we are storing a station and not a line.
-                    #  as the line starts at a point, the azimuth in of a line.. is the azimuth out of a station.
-                    #  the azimuth out of a line..is the azimuth in to a station.
-                    azimuth_in=azimuth_in,
-                    azimuth_out=station_props['azimuth_in'],
-                    #  @todo OneGo mode most probably breaks this.
-                    azimuth_out_avg=(station_props['azimuth_in'] + station_props['azimuth_out']) / 2,
-                    depth=station_props['depth_out'],
-                    station_properties=station_props,
-                    station_name= f"Station {station_reference_id}"
-                )
-                length_in = station_props['length']
-                azimuth_in = station_props['azimuth_out']
-                #  @todo OneGo mode most probably breaks this.
-                azimuth_avg = (station_props['azimuth_in'] + station_props['azimuth_out']) / 2
-                last_depth = station_props['depth_in']
+                self._finish()
+            return False
+        if final is False and self._line_available() is False:
+            return False
+        span = self._line_span(final)
+        if span is not None and span[1] is None:
+            # the rest of the line is still coming, it is fingerprinted as a whole.
+            return False
+        fingerprint = None if span is None else self.line_fingerprint(self._bytes[span[0]:span[1]])
+        self._line_reference_id += 1
+        if fingerprint is not None and self.skip_duplicates and self.line.has_fingerprint(fingerprint):
+            self.skipped_lines += 1
+            self.logger.info(f"Skipped imported line {self._line_reference_id} (at index {span[0]} of {len(self._bytes)})")
+            self._index = span[1] - 1
+            return True
+
+        # Loop through every line on the device
+        #  2;21;3;7;13;4;66;65;83;0
+        line_props = self.parse_line_part()
+        self._line_id = self.line.insert(
+                survey_id=self.survey_id,
+                line_reference_id=self._line_reference_id,
+                direction=line_props['direction'],
+                device_properties=line_props,
+                fingerprint=fingerprint
+            )
+        self.line_count += 1
+        self.logger.info(f"Created new line, line_id={self._line_id} survey_id={self.survey_id} (at index {self._index} of {len(self._bytes)}")
+        self._station_reference_id = 0
+        self._azimuth_in = 0
+        self._azimuth_avg = 0
+        self._length_in = 0
+        self._state = self.STATE_STATION
+        return True
+
+    def _line_available(self) -> bool:
+        """
+            While streaming, a line is only parsed when its header and the status byte of the station after it
+            are received. (parse_line_part looks one byte past the header.)
+        """
+        try:
+            start = self._bytes.index(2, self._jump(1, False))
+        except ValueError:
+            return False
+        return start + self.LINE_LENGTH_LINE + 1 < len(self._bytes)
+
+    def _line_span(self, final: bool):
+        """
+            (start, end) of the bytes of the next line: its header and its stations, up to and including the
+            end-of-line station. The end is None while streaming and the line is not complete yet.
+            None when the stations do not follow the header, the parser works its way through such bytes.
+        """
+        count = len(self._bytes)
+        if self._span_scan is not None and self._span_scan[0] == self._index:
+            start, position = self._span_scan[1:]
+        else:
+            start = self._jump(1, False)
+            while start < count and self._bytes[start] != 2:
+                start += 1
+            position = start + self.LINE_LENGTH_LINE
+            if position >= count:
+                return None if final else (start, None)
+            if self._bytes[position - 1] not in (self.DIRECTION_IN, self.DIRECTION_OUT) \
+                    or self._bytes[position] not in (self.STATUS_INPROGRESS, self.STATUS_END_LINE):
+                return None
+
+        self._span_scan = None
+        while position + self.LINE_LENGTH_STATION <= count:
+            position += self.LINE_LENGTH_STATION
+            if tuple(self._bytes[position - self.LINE_LENGTH_STATION:position]) == self.END_OF_LINE_LIST:
+                return start, position
+        # the last line of a dump can end without an end-of-line station.
+        if final:
+            return start, count
+        self._span_scan = (self._index, start, position)
+        return start, None
+
+    @staticmethod
+    def line_fingerprint(values) -> str:
+        """
+            The blake2b hash of the (signed int8) values of a line, the same for a text and a binary dump-file.
+        """
+        data = values.tobytes() if isinstance(values, memoryview) else array.array('b', values).tobytes()
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def _parse_station(self, final: bool) -> bool:
+        if self.end_of_bytes(self.LINE_LENGTH_STATION):
+            if final is False:
+                return False
+            # Here we have LESS than a full station-line.
+            #   1.) The line is the last entry of the dump, no end-line line exists
+            #   2.) The next line is incomplete and is smaller then 16 bytes.
+            if len(self._bytes) - self._jump(self.LINE_LENGTH_STATION+1, False) > 0:
+                self.logger.error(f'Found incomplete station with {len(self._bytes) - self._jump(0, False)} bytes, starting at byte: {self._jump(0, False)}, total bytes {len(self._bytes)}')
+            self._line_finished()
+            self._finish()
+            return False
+
+        # Loop through every station for these stations
+        self._station_reference_id += 1
+        if self.end_of_line():
+            if self._station_reference_id == 1:
+                self.logger.info(f"Empty line, line_id={self._line_id} survey_id={self.survey_id} (at index {self._index} of {len(self._bytes)}")
+                # this is an empty line, don't insert this station
+                self._line_finished()
+                return True
+
+            self._station_id = self.station.insert(
+                survey_id=self.survey_id,
+                line_id=self._line_id,
+                line_reference_id=self._line_reference_id,
+                station_reference_id=self._station_reference_id,
+                length_in=self._length_in,
+                length_out=0,
+                #  we need to reverse the azimuth as we are storing a station and not a line.
+                #  as the line starts at a point, the azimuth in of a line.. is the azimuth out of a station.
+                #  the azimuth out of a line..is the azimuth in of a station.
+                azimuth_in=self._azimuth_in,
+                azimuth_out=0,
+                azimuth_out_avg=self._azimuth_avg,
+                depth=self._last_depth,
+                station_properties={"status_byte": self.STATUS_END_LINE},
+                station_name=f"Station {self._station_reference_id}",
+                is_generated=True
+            )
+            self._line_finished()
+            return True
+
+        station_props = self.parse_station_part()
+        self._station_id = self.station.insert(
+            survey_id=self.survey_id,
+            line_id=self._line_id,
+            line_reference_id=self._line_reference_id,
+            station_reference_id=self._station_reference_id,
+            length_in=self._length_in,
+            length_out=station_props['length'],
+            #  we need to reverse the azimuth as we are storing a station and not a line.
+            #  as the line starts at a point, the azimuth in of a line.. is the azimuth out of a station.
+            #  the azimuth out of a line..is the azimuth in to a station.
+            azimuth_in=self._azimuth_in,
+            azimuth_out=station_props['azimuth_in'],
+            #  @todo OneGo mode most probably breaks this.
+            azimuth_out_avg=(station_props['azimuth_in'] + station_props['azimuth_out']) / 2,
+            depth=station_props['depth_out'],
+            station_properties=station_props,
+            station_name= f"Station {self._station_reference_id}"
+        )
+        self._length_in = station_props['length']
+        self._azimuth_in = station_props['azimuth_out']
+        #  @todo OneGo mode most probably breaks this.
+        self._azimuth_avg = (station_props['azimuth_in'] + station_props['azimuth_out']) / 2
+        self._last_depth = station_props['depth_in']
+        return True
 
+    def _line_finished(self):
+        self._state = self.STATE_LINE
+        if self.on_line is not None:
+            self.on_line(self.survey_id, self._line_id)
+
+    def _finish(self):
+        self._state = self.STATE_DONE
+        if self.line_count == 0 and self.skipped_lines > 0:
+            self.logger.info(f"All {self.skipped_lines} lines were imported before, removed survey_id={self.survey_id}")
+            self.survey.delete(self.survey_id)
+            self.survey_id = None
+            return
+        if self._survey_byte_count != len(self._bytes):
+            # when streaming the size was unknown at the time the survey was created.
+            self.survey.update({'device_properties': json.dumps({"bytes_in_dumpfile": len(self._bytes)})}, self.survey_id)
         self.logger.info(
-            f"ln 346: End import at station_id={station_id} line_id={line_id} survey_id={survey_id} (at index {self._index} of {len(self._bytes)}")
-        return survey_id
+            f"End import at station_id={self._station_id} line_id={self._line_id} survey_id={self.survey_id} (at index {self._index} of {len(self._bytes)}")
 
     def parse_line_part(self):
         #  2;21;3;7;13;4;66;65;83;0
@@ -379,7 +813,7 @@ class MnemoDmpReader:
 
         if self.end_of_bytes(self.LINE_LENGTH_LINE):
             # empty survey
-            return False, properties
+            return properties
 
         if self.byte_at_has_value(self.LINE_LENGTH_LINE - 1, [self.DIRECTION_IN, self.DIRECTION_OUT]) is False \
                 or self.byte_at_has_value(self.LINE_LENGTH_LINE, [self.STATUS_INPROGRESS, self.STATUS_END_LINE]) is False:
@@ -391,7 +825,7 @@ class MnemoDmpReader:
                 "next_direction_byte_index": self._jump(self.LINE_LENGTH_LINE - 1, False),
                 "next_direction_byte_value": self.read_int8(self.LINE_LENGTH_LINE - 1, False),
             }
-            return False, properties
+            return properties
 
         properties['version'] = self.read_int8(0, False)
 
@@ -547,21 +981,39 @@ class MnemoDumpWriter:
     STATUS_INPROGRESS = 2
     STATUS_END_LINE = 3
 
-    LAST_STATION_GENERATED = 'Last station is generated'
 
-    def __init__(self, import_list: list = None):
+    def __init__(self, import_list: list = None, sql_manager: SqlManager = None):
         self.import_list = import_list
+        self.sql_manager = sql_manager
 
-    def save_survey_to_dmp(self, survey_id, file_name):
-        self._ariane_dmp_dump(survey_id)
-        self.write_file(file_name)
+    def save_survey_to_dmp(self, survey_id, file_name, binary: bool = False):
+        """
+            Streams the survey from the database into the file, see _ariane_dmp_rows().
+        """
+        self.write_file(file_name, binary, self._ariane_dmp_rows(survey_id))
 
+    def _manager(self) -> SqlManager:
+        if self.sql_manager is None:
+            self.sql_manager = SqlManager()
+        return self.sql_manager
+
+    def _survey_lines(self, survey_id: int):
+        """
+            Yields (line, stations) for every line of the survey, the stations are read while they are iterated.
+        """
+        rows = self._manager().factor(ImportStation).iter_survey(survey_id)
+        for line_id, stations in itertools.groupby(rows, key=lambda row: row['line_id']):
+            first = next(stations)
+            if first['station_id'] in (None, ''):
+                yield first, iter(())
+            else:
+                yield first, itertools.chain((first,), stations)
 
     def _csv_dump(self, survey_id: int):
-        manager = SqlManager()
-        lines = manager.factor(ImportLine).get_all(survey_id, True)
-        station_obj = manager.factor(ImportStation)
-        rows = [
+        self.import_list = list(itertools.chain.from_iterable(self._csv_rows(survey_id)))
+
+    def _csv_rows(self, survey_id: int):
+        yield [
             ';line_nr',
             'line_name',
             'direction',
@@ -575,39 +1027,36 @@ class MnemoDumpWriter:
             '\n'
         ]
 
-        l = -1
-        for line in lines:
-            l += 1
-            s = -1
-            stations = station_obj.get_all(line['line_id'])
-            for station in stations:
-                s+=1
-                rows.append(f'{l}')
-                rows.append(line['line_name'])
-                rows.append(line['direction'])
-                rows.append(s)
-                rows.append(station['length_in'])
-                rows.append(station['azimuth_in'])
-                rows.append(station['depth']),
-                rows.append(station['azimuth_out'])
-                rows.append(station['azimuth_out_avg'])
-                rows.append("\n")
-
-        self.import_list = rows
+        for l, (line, stations) in enumerate(self._survey_lines(survey_id)):
+            for s, station in enumerate(stations):
+                yield [
+                    f'{l}',
+                    line['line_name'],
+                    line['direction'],
+                    s,
+                    station['length_in'],
+                    station['azimuth_in'],
+                    station['depth'],
+                    station['azimuth_out'],
+                    station['azimuth_out_avg'],
+                    "\n"
+                ]
 
     def _ariane_dmp_dump(self, survey_id: int):
-        manager = SqlManager()
-        lines = manager.factor(ImportLine).get_all(survey_id, True)
-        station_obj = manager.factor(ImportStation)
-        rows = []
+        self.import_list = list(itertools.chain.from_iterable(self._ariane_dmp_rows(survey_id)))
+
+    def _ariane_dmp_rows(self, survey_id: int):
+        """
+            Yields the values of the dump-file a line header or station at a time, from one query over the survey.
+            Only the station after the current one is held, for its azimuth_in.
+        """
         # version and DateTime
         # now = datetime.now()
         now = datetime(2021, 3, 7, 13, 4)
-        l = -1
-
 
-        for line in lines:
-            rows.extend([
+        for line, stations in self._survey_lines(survey_id):
+            direction = self.DIRECTION_IN if line['direction'] == 'In' else self.DIRECTION_OUT
+            yield [
                 2,
                 # https: // stackoverflow.com / questions / 34009653 / convert - bytes - to - int
                 int(now.strftime("%y")),
@@ -618,35 +1067,37 @@ class MnemoDumpWriter:
                 int.from_bytes(b'B', 'big'),
                 int.from_bytes(b'A', 'big'),
                 int.from_bytes(b'S', 'big'),
-                self.DIRECTION_IN if line['direction'] == 'In' else self.DIRECTION_OUT
-            ])
-
-            l += 1
-            s = -1
-            stations = station_obj.get_all(line['line_id'])
-            for index, station in enumerate(stations):
-                orig_props = json.loads(station['device_properties'])
-                try:
-                    if orig_props['comment'] == self.LAST_STATION_GENERATED:
-                        # As we are storing stations instead of lines, we should ignore the last station of a line.
-                        rows.extend(self.END_OF_LINE_LIST)
-                        continue
-                except KeyError:
-                    pass
-
-
-                rows.append(self.STATUS_INPROGRESS)
-                rows.extend(self.to_uint16(station['azimuth_out'] * 10))  # status byte int8
-                rows.extend(self.to_uint16(stations[index+1]['azimuth_in'] * 10))  # status byte int8
-                rows.extend(self.to_uint16(station['length_out'] * 100))  # status byte int8
-                rows.extend(self.to_uint16(station['depth'] * 100))  # <- This should be a signed INT...
-                rows.extend(self.to_uint16(station['depth'] * 100))  # status byte int8
-                rows.extend(self.to_uint16(orig_props['pitch_in'] * 100))  # status byte int8
-                rows.extend(self.to_uint16(orig_props['pitch_out'] * 100))  # status byte int8
-                rows.append(self.DIRECTION_IN if line['direction'] == 'In' else self.DIRECTION_OUT)  # status byte int8
-
-        rows.extend(self.END_OF_LINE_LIST)
-        self.import_list = rows
+                direction
+            ]
+
+            station = next(stations, None)
+            while station is not None:
+                next_station = next(stations, None)
+                if station['is_generated']:
+                    # As we are storing stations instead of lines, we should ignore the last station of a line.
+                    yield self.END_OF_LINE_LIST
+                    station = next_station
+                    continue
+
+                if next_station is not None:
+                    azimuth_out = next_station['azimuth_in']
+                else:
+                    # the dump ended without an end-of-line, the average is all we have left of the last leg.
+                    azimuth_out = 2 * station['azimuth_out_avg'] - station['azimuth_out']
+                yield [
+                    self.STATUS_INPROGRESS,
+                    *self.to_uint16(station['azimuth_out'] * 10),
+                    *self.to_uint16(azimuth_out * 10),
+                    *self.to_uint16(station['length_out'] * 100),
+                    *self.to_uint16(station['depth'] * 100),  # <- This should be a signed INT...
+                    *self.to_uint16(station['depth'] * 100),
+                    *self.to_uint16((station['pitch_in'] or 0) * 100),
+                    *self.to_uint16((station['pitch_out'] or 0) * 100),
+                    direction
+                ]
+                station = next_station
+
+        yield self.END_OF_LINE_LIST
 
     def to_uint16(self, decimal):
         # Skip fancy bit-shifting, using a blunt axe today.
@@ -658,12 +1109,28 @@ class MnemoDumpWriter:
 
         return c, f
 
-    def write_file(self, path):
-        if not self.import_list:
+    def write_file(self, path, binary: bool = False, rows=None):
+        """
+            Writes the Ariane compatible text format, or with binary=True the raw bytes after MNEMO_BINARY_DUMP_MAGIC.
+            Both are read by parse_dump_file().
+
+            Writes the import_list, or the values of rows (an iterable of value lists, see _ariane_dmp_rows())
+            in chunks of MNEMO_EXPORT_CHUNK_SIZE values while they are produced.
+        """
+        values = iter(self.import_list or ()) if rows is None else itertools.chain.from_iterable(rows)
+        chunk = list(itertools.islice(values, MNEMO_EXPORT_CHUNK_SIZE))
+        if len(chunk) == 0:
             raise Exception('NO_DATA_FOUND')
-        text_file = open(path, "w")
-        text_file.write(f"{';'.join(str(x) for x in self.import_list)};")
-        text_file.close()
+
+        with open(path, "wb" if binary is True else "w") as out_file:
+            if binary is True:
+                out_file.write(MNEMO_BINARY_DUMP_MAGIC)
+            while len(chunk) > 0:
+                if binary is True:
+                    out_file.write(array.array('b', chunk).tobytes())
+                else:
+                    out_file.write(''.join(f'{x};' for x in chunk))
+                chunk = list(itertools.islice(values, MNEMO_EXPORT_CHUNK_SIZE))
 
 if __name__ == '__main__':
     #importer = MnemoImporter(thread_action=MnemoImporter.ACTION_READ_DUMP, in_file='/home/flip/Code/Stickmaps/data_files/tux.dmp')
@@ -0,0 +1,139 @@
+import logging
+import os
+import pathlib
+import random
+import select
+import sys
+import threading
+import time
+import tty
+
+from Config.Constants import MNEMO_BAUDRATE, MNEMO_DEVICE_ENV
+from Importers.Mnemo import parse_dump_file
+
+
+class MnemoEmulator:
+    """
+        Pretends to be a Mnemo on a pseudo-terminal, so the serial import can be used (and measured) without a device.
+
+        The emulator waits for the handshake the importer sends ("C" followed by the date), then replays the dump-file
+        at the given baudrate (8N1, so 10 bits per byte) in chunks of chunk_size bytes.
+        Every chunk is delayed by up to jitter seconds on top of that, like the MCP2221 adapter tends to do.
+
+        Point the importer at it with MnemoImporter(device=emulator.device) or the STICKMAPS_MNEMO_DEVICE environment
+        variable, which is what running this module does:
+
+            python -m Importers.MnemoEmulator data_files/tux.dmp --baudrate 9600
+    """
+
+    HANDSHAKE = b'C'
+    # the importer sends the date as 5 two-digit strings after the handshake.
+    HANDSHAKE_DATE_LENGTH = 10
+    HANDSHAKE_TIMEOUT = 1
+
+    def __init__(self, dump_file, baudrate: int = MNEMO_BAUDRATE, jitter: float = 0.0, chunk_size: int = 64, repeat: bool = False):
+        self.log = logging.getLogger(__name__)
+        self.dump_file = pathlib.Path(dump_file)
+        self.data = bytes(value & 0xff for value in parse_dump_file(self.dump_file))
+        self.baudrate = baudrate
+        self.jitter = jitter
+        self.chunk_size = chunk_size
+        self.repeat = repeat
+
+        self.device = None
+        self.bytes_sent = 0
+        self._master = None
+        self._slave = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self) -> str:
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        self.device = os.ttyname(self._slave)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='MnemoEmulator', daemon=True)
+        self._thread.start()
+        self.log.info(f'Mnemo emulator for {self.dump_file.name} listening on {self.device}')
+        return self.device
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = None
+        self._slave = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _run(self):
+        while self._stop.is_set() is False:
+            if self._wait_for_handshake() is False:
+                return
+            self._send()
+            if self.repeat is False:
+                return
+
+    def _wait_for_handshake(self) -> bool:
+        received = b''
+        while self.HANDSHAKE not in received:
+            if self._stop.is_set():
+                return False
+            received = self._read(0.05)
+        # the date might still be on its way, there is nothing in it we care about.
+        received = received[received.index(self.HANDSHAKE) + 1:]
+        deadline = time.monotonic() + self.HANDSHAKE_TIMEOUT
+        while len(received) < self.HANDSHAKE_DATE_LENGTH and time.monotonic() < deadline:
+            received += self._read(0.05)
+        return True
+
+    def _read(self, timeout: float) -> bytes:
+        readable, _, _ = select.select([self._master], [], [], timeout)
+        if len(readable) == 0:
+            return b''
+        return os.read(self._master, 1024)
+
+    def _send(self):
+        seconds_per_byte = 10 / self.baudrate
+        send_at = time.monotonic()
+        for index in range(0, len(self.data), self.chunk_size):
+            if self._stop.is_set():
+                return
+            chunk = self.data[index:index + self.chunk_size]
+            send_at += len(chunk) * seconds_per_byte + random.uniform(0, self.jitter)
+            delay = send_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            os.write(self._master, chunk)
+            self.bytes_sent += len(chunk)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Replay a Mnemo dump-file over a pseudo-terminal.')
+    parser.add_argument('dump_file')
+    parser.add_argument('--baudrate', type=int, default=MNEMO_BAUDRATE)
+    parser.add_argument('--jitter', type=float, default=0.0, help='Max extra delay per chunk, in seconds.')
+    parser.add_argument('--chunk-size', type=int, default=64)
+    arguments = parser.parse_args()
+
+    emulator = MnemoEmulator(arguments.dump_file, arguments.baudrate, arguments.jitter, arguments.chunk_size, repeat=True)
+    device = emulator.start()
+    print(f'export {MNEMO_DEVICE_ENV}={device}')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        emulator.stop()
+        sys.exit(0)
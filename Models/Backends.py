@@ -0,0 +1,274 @@
+"""
+    The storage backends QueryMixin runs its sql on.
+
+    QtSqlBackend runs on a QSqlDatabase connection, which is what the QSqlTableModel views need.
+    Sqlite3Backend uses the sqlite3 module, without QVariant conversions and without a QCoreApplication,
+    for the code that never shows a model (parsers, solvers, the CLI and tests).
+    Both open the same database file, so a view keeps reading what a Sqlite3Backend wrote.
+
+    A backend executes sql with positional (?) parameters and returns a result that has the column names,
+    the rows (as tuples), rowcount and lastrowid. Errors are returned in result.error, like QSqlQuery does.
+"""
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from PySide6.QtSql import QSqlQuery, QSqlDatabase
+
+from Config.Constants import SQL_STATEMENT_CACHE_SIZE, SQL_CONNECTION_PRAGMAS
+from Utils.Settings import Preferences
+
+
+class StatementCache:
+    """
+        Keeps the prepared QSqlQuery objects of every connection, keyed by their sql.
+
+        Most of the queries are a handful of statement shapes executed over and over (ea. inserting stations),
+        preparing them once per connection saves sqlite from parsing and planning them again.
+        The least recently used statements are dropped beyond SQL_STATEMENT_CACHE_SIZE per connection.
+        Statements that change the schema are never cached.
+
+        In debug mode the prepares and reuses are counted, see stats().
+    """
+    CACHEABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+    is_counting = None
+    prepares = 0
+    reuses = 0
+
+    _caches = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def prepare(cls, db: QSqlDatabase, sql: str) -> tuple:
+        """
+            Returns (query, is_prepared), a cached query is reused by the next call with the same sql,
+            so read its results before that.
+        """
+        if cls.is_counting is None:
+            cls.is_counting = Preferences.debug()
+
+        if sql.lstrip()[:6].upper() not in cls.CACHEABLE:
+            query = QSqlQuery(db)
+            return query, query.prepare(sql)
+
+        with cls._lock:
+            cache = cls._caches.setdefault(db.connectionName(), OrderedDict())
+        query = cache.get(sql)
+        if query is not None:
+            cache.move_to_end(sql)
+            if cls.is_counting:
+                cls.reuses += 1
+            return query, True
+
+        query = QSqlQuery(db)
+        # the rows are read once, in order (see QueryMixin), so Qt does not need to keep them.
+        query.setForwardOnly(True)
+        if query.prepare(sql) is False:
+            return query, False
+        if cls.is_counting:
+            cls.prepares += 1
+        cache[sql] = query
+        if len(cache) > SQL_STATEMENT_CACHE_SIZE:
+            cache.popitem(last=False)
+        return query, True
+
+    @classmethod
+    def clear(cls, connection_name: str):
+        """
+            Drops the statements of a connection, call it before the connection is closed.
+        """
+        with cls._lock:
+            cache = cls._caches.pop(connection_name, None)
+        if cache is not None:
+            cache.clear()
+        if cls.is_counting:
+            logging.getLogger(__name__).debug(f'Statement cache {connection_name}: {cls.stats()}')
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {'prepares': cls.prepares, 'reuses': cls.reuses}
+
+
+class QtSqlResult:
+
+    def __init__(self, query: QSqlQuery, error: str = ''):
+        self.query = query
+        self.error = error if error != '' else query.lastError().text()
+
+    @property
+    def rowcount(self) -> int:
+        return self.query.numRowsAffected()
+
+    @property
+    def lastrowid(self):
+        return self.query.lastInsertId()
+
+    @property
+    def columns(self) -> list:
+        record = self.query.record()
+        return [record.fieldName(index) for index in range(0, record.count())]
+
+    def rows(self):
+        value = self.query.value
+        indexes = range(0, self.query.record().count())
+        while self.query.next():
+            yield tuple([value(index) for index in indexes])
+
+    def close(self):
+        # the statement is kept (see StatementCache), but it should not keep the table locked.
+        self.query.finish()
+
+
+class QtSqlBackend:
+    """
+        Runs the queries through QSqlQuery, the prepared queries are kept in the StatementCache.
+    """
+    track_changes = True
+
+    def __init__(self, db: QSqlDatabase):
+        self.db = db
+
+    def connection_name(self) -> str:
+        return self.db.connectionName()
+
+    def qt_database(self) -> QSqlDatabase:
+        return self.db
+
+    def execute(self, sql: str, params=()) -> QtSqlResult:
+        query, status = StatementCache.prepare(self.db, sql)
+        if status is False:
+            return QtSqlResult(query, f'prepare failed: {query.lastError().text()}')
+        self._bind(query, params)
+        query.exec_()
+        return QtSqlResult(query)
+
+    def executemany(self, sql: str, rows) -> int:
+        query, status = StatementCache.prepare(self.db, sql)
+        if status is False:
+            raise SyntaxError(f'Sql prepare failed! {query.lastError().text()} for sql: {sql}')
+        row_count = 0
+        for row in rows:
+            self._bind(query, row)
+            if query.exec_() is False:
+                raise SyntaxError(f'Sql query failed! {query.lastError().text()} for sql: {sql}')
+            row_count += query.numRowsAffected()
+        query.finish()
+        return row_count
+
+    def transaction(self) -> bool:
+        return self.db.transaction()
+
+    def commit(self) -> bool:
+        return self.db.commit()
+
+    def rollback(self) -> bool:
+        return self.db.rollback()
+
+    @staticmethod
+    def _bind(query: QSqlQuery, values):
+        # by position, a reused query still holds the values of its previous execution.
+        for index, value in enumerate(values):
+            query.bindValue(index, value)
+
+
+class Sqlite3Result:
+
+    def __init__(self, cursor: sqlite3.Cursor = None, error: str = ''):
+        self.cursor = cursor
+        self.error = error
+
+    @property
+    def rowcount(self) -> int:
+        return self.cursor.rowcount if self.cursor is not None else -1
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid if self.cursor is not None else None
+
+    @property
+    def columns(self) -> list:
+        if self.cursor is None or self.cursor.description is None:
+            return []
+        return [column[0] for column in self.cursor.description]
+
+    def rows(self):
+        if self.cursor is not None:
+            yield from self.cursor
+
+    def close(self):
+        if self.cursor is not None:
+            self.cursor.close()
+
+
+class Sqlite3Backend:
+    """
+        Runs the queries on a sqlite3 connection (sqlite3 keeps its own cache of prepared statements).
+
+        Transactions are explicit, like they are with QtSql: transaction() starts one, without it every
+        statement commits on its own. The connection belongs to the thread that created the backend.
+        With track_changes the project is flagged as changed on every write (see QueryMixin),
+        leave it off for databases that are not the open project.
+    """
+
+    def __init__(self, db_location: str, track_changes: bool = True):
+        self.db_location = db_location
+        self.track_changes = track_changes
+        self.connection = sqlite3.connect(
+            db_location,
+            timeout=5,
+            isolation_level=None,
+            cached_statements=SQL_STATEMENT_CACHE_SIZE
+        )
+        for pragma in SQL_CONNECTION_PRAGMAS:
+            self.connection.execute(pragma)
+
+    def connection_name(self) -> str:
+        return self.db_location
+
+    def qt_database(self) -> QSqlDatabase:
+        # the QSqlTableModel part of a model stays unused (invalid), only the QueryMixin methods work.
+        return QSqlDatabase()
+
+    def execute(self, sql: str, params=()) -> Sqlite3Result:
+        try:
+            return Sqlite3Result(self.connection.execute(sql, tuple(params)))
+        except sqlite3.Error as error:
+            return Sqlite3Result(error=str(error))
+
+    def executemany(self, sql: str, rows) -> int:
+        try:
+            return self.connection.executemany(sql, rows).rowcount
+        except sqlite3.Error as error:
+            raise SyntaxError(f'Sql query failed! {error} for sql: {sql}')
+
+    def transaction(self) -> bool:
+        if self.connection.in_transaction:
+            return False
+        self.connection.execute('BEGIN')
+        return True
+
+    def commit(self) -> bool:
+        if self.connection.in_transaction is False:
+            return False
+        self.connection.execute('COMMIT')
+        return True
+
+    def rollback(self) -> bool:
+        if self.connection.in_transaction is False:
+            return False
+        self.connection.execute('ROLLBACK')
+        return True
+
+    def close(self):
+        self.connection.close()
+
+
+def backend_for(db):
+    """
+        The backend for what a model was created with, a QSqlDatabase or a backend.
+    """
+    if isinstance(db, QSqlDatabase):
+        return QtSqlBackend(db)
+    return db
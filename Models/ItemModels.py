@@ -1,10 +1,12 @@
-from PySide6.QtCore import Slot
+from PySide6.QtCore import Slot, QModelIndex
 from PySide6.QtGui import QStandardItemModel, QStandardItem, QIcon
 from PySide6.QtWidgets import QApplication
 
 from Config.Constants import TREE_DARK_ICON_SURVEY,\
     TREE_DARK_ICON_LINE, TREE_DARK_ICON_STATION, TREE_LIGHT_ICON_SURVEY, TREE_LIGHT_ICON_LINE, \
     TREE_LIGHT_ICON_STATION
+from .Journal import Journal
+from .SurveyStore import SurveyStore
 from .TableModels import ImportSurvey, ImportLine, ImportStation, SqlManager, MapLine, MapStation
 
 
@@ -12,12 +14,12 @@ class ItemMixin:
     MODEL_TYPE_IMPORT = 0
     MODEL_TYPE_MAP = 1
 
-    ITEM_TYPE_IMPORTS = QStandardItem.UserType + 5
-    ITEM_TYPE_MAPS = QStandardItem.UserType + 6
-    ITEM_TYPE_ROOT = QStandardItem.UserType + 10
-    ITEM_TYPE_STATION = QStandardItem.UserType + 20
-    ITEM_TYPE_LINE = QStandardItem.UserType + 30
-    ITEM_TYPE_SURVEY = QStandardItem.UserType + 40
+    ITEM_TYPE_IMPORTS = QStandardItem.ItemType.UserType.value + 5
+    ITEM_TYPE_MAPS = QStandardItem.ItemType.UserType.value + 6
+    ITEM_TYPE_ROOT = QStandardItem.ItemType.UserType.value + 10
+    ITEM_TYPE_STATION = QStandardItem.ItemType.UserType.value + 20
+    ITEM_TYPE_LINE = QStandardItem.ItemType.UserType.value + 30
+    ITEM_TYPE_SURVEY = QStandardItem.ItemType.UserType.value + 40
 
     DARK_ICONS = {
         ITEM_TYPE_STATION: TREE_DARK_ICON_STATION,
@@ -43,13 +45,48 @@ class ItemMixin:
             return QIcon(self.DARK_ICONS[item_type])
         return QIcon(self.LIGHT_ICONS[item_type])
 
+    def sync_children(self, children: dict, rows: list, id_name: str, text_name: str, create, touched: list = None) -> tuple:
+        """
+            Updates the child items (children, keyed by "id_<id>") to the rows, in their order.
+            Only the missing rows are inserted (create(row) makes the item), the children without a row are removed
+            and the changed names are set, the items that stay keep their expanded and selected state.
+            The items that stay but got another row are added to touched.
+
+            Returns the amount of (inserted, removed, changed) children.
+        """
+        keys = [f'id_{row[id_name]}' for row in rows]
+        wanted = set(keys)
+        removed = [key for key in children.keys() if key not in wanted]
+        for key in removed:
+            item = children.pop(key)
+            self.removeRow(item.row())
+
+        inserted = changed = 0
+        for position, (key, row) in enumerate(zip(keys, rows)):
+            item = children.get(key)
+            if item is None:
+                item = create(row)
+                children[key] = item
+                self.insertRow(position, item)
+                inserted += 1
+                continue
+
+            if touched is not None and item._item_data != row:
+                touched.append(item)
+            item._item_data = row
+            if item.text() != row[text_name]:
+                item.setText(row[text_name])
+                changed += 1
+            if item.row() != position:
+                self.insertRow(position, self.takeRow(item.row()))
+        return inserted, len(removed), changed
+
 
 class MapStationItem(QStandardItem, ItemMixin):
 
     def __init__(self, parent: QStandardItem, station_row: dict):
         super().__init__(self.get_icon(self.type()), station_row['station_name'])
         self._parent = parent
-        self._child_model = self._get_sql_manager().factor(MapStation)
         self._item_data = station_row
 
     def type(self) -> int:
@@ -68,7 +105,8 @@ class MapStationItem(QStandardItem, ItemMixin):
         self.parent().removeRow(self.row())
 
     def model(self):
-        return self._child_model
+        # the model of the line, one per station would be a QSqlTableModel for every row in the tree.
+        return self._parent.child_model()
 
     def _get_sql_manager(self) -> SqlManager:
         return self._parent._get_sql_manager()
@@ -82,6 +120,8 @@ class MapLineItem(QStandardItem, ItemMixin):
         self._child_model = self._get_sql_manager().factor(MapStation)
         self._item_data = line_row
         self._children = {}
+        # set by the tree view, the stations of a collapsed line are synced when it is expanded.
+        self.is_expanded = False
 
         self.append_children()
 
@@ -104,8 +144,8 @@ class MapLineItem(QStandardItem, ItemMixin):
         self.parent().removeRow(self.row())
 
     def update_children(self):
-        self.removeRows(0, self.rowCount())
-        self.append_children()
+        rows = self._child_model.get_all(self.line_id())
+        return self.sync_children(self._children, rows, 'station_id', 'station_name', lambda row: MapStationItem(self, row))
 
     def append_children(self):
         rows = self._child_model.get_all(self.line_id())
@@ -139,7 +179,6 @@ class ImportStationItem(QStandardItem, ItemMixin):
     def __init__(self, parent: QStandardItem, station_row: dict):
         super().__init__(self.get_icon(self.type()), station_row['station_name'])
         self._parent = parent
-        self._child_model = self._get_sql_manager().factor(ImportStation)
         self._item_data = station_row
 
     def type(self) -> int:
@@ -161,7 +200,7 @@ class ImportStationItem(QStandardItem, ItemMixin):
         self.parent().removeRow(self.row())
 
     def model(self):
-        return self._child_model
+        return self._parent.child_model()
 
     def _get_sql_manager(self) -> SqlManager:
         return self._parent._get_sql_manager()
@@ -175,6 +214,8 @@ class ImportLineItem(QStandardItem, ItemMixin):
         self._child_model = self._get_sql_manager().factor(ImportStation)
         self._item_data = line_row
         self._children = {}
+        # set by the tree view, the stations of a collapsed line are synced when it is expanded.
+        self.is_expanded = False
 
         self.append_children()
 
@@ -200,21 +241,26 @@ class ImportLineItem(QStandardItem, ItemMixin):
         self.parent().removeRow(self.row())
 
     def update_children(self):
-        self.removeRows(0, self.rowCount())
-        self.append_children()
+        rows = SurveyStore.instance().stations(self.line_id())
+        return self.sync_children(self._children, rows, 'station_id', 'station_name', lambda row: ImportStationItem(self, row))
 
     def append_children(self):
-        rows = self._child_model.get_all(self.line_id())
-        for row in rows:
-            self._add_child(self.CHILD_APPEND, row)
+        for record in SurveyStore.instance().stations(self.line_id()):
+            self._add_child(self.CHILD_APPEND, record)
 
     def prepend_child(self, station_id: int):
-        row = self._child_model.get(station_id)
-        self._add_child(self.CHILD_PREPEND, row)
+        self._add_child(self.CHILD_PREPEND, SurveyStore.instance().station(station_id))
 
     def append_child(self, station_id: int):
-        row = self._child_model.get(station_id)
-        self._add_child(self.CHILD_APPEND, row)
+        self._add_child(self.CHILD_APPEND, SurveyStore.instance().station(station_id))
+
+    def station_item(self, station_id: int):
+        return self._children.get(f'id_{station_id}')
+
+    def remove_child(self, station_id: int):
+        item = self._children.pop(f'id_{station_id}', None)
+        if item is not None:
+            self.removeRow(item.row())
 
     def model(self):
         return self._get_sql_manager().factor(ImportLine)
@@ -223,6 +269,8 @@ class ImportLineItem(QStandardItem, ItemMixin):
         return self._child_model
 
     def _add_child(self, mode: int, row: dict):
+        if f'id_{row["station_id"]}' in self._children:
+            return
         item = ImportStationItem(self, row)
         self._children[f'id_{row["station_id"]}'] = item
         if mode is self.CHILD_APPEND:
@@ -265,8 +313,16 @@ class ImportSurveyItem(QStandardItem, ItemMixin):
             self._add_child(self.CHILD_APPEND, row)
 
     def update_children(self):
-        self.removeRows(0, self.rowCount())
-        self.append_children()
+        """
+            Syncs the lines, the stations of a line follow the SurveyStore (see ProxyModel.c_line_loaded),
+            only the lines that got another row are synced here.
+        """
+        rows = self._child_model.get_all(self.survey_id())
+        touched = []
+        counts = self.sync_children(self._children, rows, 'line_id', 'line_name', lambda row: ImportLineItem(self, row), touched)
+        for item in touched:
+            item.update_children()
+        return counts
 
     def prepend_child(self, line_id: int):
         row = self._child_model.get(line_id)
@@ -276,6 +332,9 @@ class ImportSurveyItem(QStandardItem, ItemMixin):
         row = self._child_model.get(line_id)
         self._add_child(self.CHILD_APPEND, row)
 
+    def line_item(self, line_id: int):
+        return self._children.get(f'id_{line_id}')
+
     def model(self):
         return self._get_sql_manager().factor(ImportSurvey)
 
@@ -283,6 +342,8 @@ class ImportSurveyItem(QStandardItem, ItemMixin):
         return self._child_model
 
     def _add_child(self, mode: int, row: dict):
+        if f'id_{row["line_id"]}' in self._children:
+            return
         item = ImportLineItem(self, row)
         self._children[f'id_{row["line_id"]}'] = item
         if mode is self.CHILD_APPEND:
@@ -311,8 +372,16 @@ class ImportItem(QStandardItem, ItemMixin):
             self._add_child(self.CHILD_APPEND, survey_row)
 
     def update_children(self):
-        self.removeRows(0, self.rowCount())
-        self.append_children()
+        """
+            Syncs the surveys and their lines, the new surveys read their lines when they are created.
+        """
+        rows = self._child_model.get_all()
+        inserted = {f'id_{row["survey_id"]}' for row in rows} - set(self.surveys.keys())
+        counts = self.sync_children(self.surveys, rows, 'survey_id', 'survey_name', lambda row: ImportSurveyItem(self, row))
+        for key, item in self.surveys.items():
+            if key not in inserted:
+                item.update_children()
+        return counts
 
     def prepend_child(self, survey_id: int):
         survey_data = self._child_model.get(survey_id)
@@ -324,6 +393,20 @@ class ImportItem(QStandardItem, ItemMixin):
 
     def delete_children(self):
         self.removeRows(0, self.rowCount())
+        self.surveys = {}
+
+    def remove_child(self, survey_id: int):
+        item = self.surveys.pop(f'id_{survey_id}', None)
+        SurveyStore.instance().forget_survey(survey_id)
+        if item is not None:
+            self.removeRow(item.row())
+
+    def line_item(self, line_id: int):
+        for survey in self.surveys.values():
+            item = survey.line_item(line_id)
+            if item is not None:
+                return item
+        return None
 
     def model(self):
         return self.child_model()
@@ -366,8 +449,21 @@ class MapsItem(QStandardItem, ItemMixin):
         row = self._child_model.get(line_id)
         self._add_child(self.CHILD_PREPEND, row)
 
+    def update_children(self):
+        """
+            Syncs the lines, and the stations of the lines that got another row or are expanded.
+        """
+        rows = self._child_model.get_all()
+        touched = []
+        counts = self.sync_children(self._children, rows, 'line_id', 'line_name', lambda row: MapLineItem(self, row), touched)
+        for item in self._children.values():
+            if item.is_expanded is True or item in touched:
+                item.update_children()
+        return counts
+
     def delete_children(self):
         self.removeRows(0, self.rowCount())
+        self._children = {}
 
     def append_child(self, line_id: int):
         row = self._child_model.get(line_id)
@@ -401,6 +497,12 @@ class ProxyModel(QStandardItemModel, ItemMixin):
         self.appendRow(self._import_item)
         self.appendRow(self._map_item)
 
+        store = SurveyStore.instance()
+        store.s_station_changed.connect(self.c_station_changed)
+        store.s_station_removed.connect(self.c_station_removed)
+        store.s_line_loaded.connect(self.c_line_loaded)
+        Journal.instance().s_applied.connect(self.c_journal_applied)
+
     @Slot(dict)  # connected in MainApplicationWindow.__init__() as I don't have the parent here.
     def c_load_project(self):
         imp = self.import_item()
@@ -411,6 +513,47 @@ class ProxyModel(QStandardItemModel, ItemMixin):
         imp.append_children()
         mp.append_children()
 
+    @Slot(int, int)
+    def c_station_changed(self, line_id: int, station_id: int):
+        line_item = self.import_item().line_item(line_id)
+        if line_item is None or line_item.station_item(station_id) is None:
+            return
+        line_item.station_item(station_id).setText(SurveyStore.instance().station(station_id).station_name)
+
+    @Slot(int, int)
+    def c_station_removed(self, line_id: int, station_id: int):
+        line_item = self.import_item().line_item(line_id)
+        if line_item is not None:
+            line_item.remove_child(station_id)
+
+    @Slot(int)
+    def c_line_loaded(self, line_id: int):
+        line_item = self.import_item().line_item(line_id)
+        if line_item is not None and line_item.is_expanded is True:
+            line_item.update_children()
+
+    @Slot(QModelIndex)
+    def c_expanded(self, index: QModelIndex):
+        item = self.itemFromIndex(index)
+        if item is not None and item.type() == self.ITEM_TYPE_LINE:
+            item.is_expanded = True
+            item.update_children()
+
+    @Slot(QModelIndex)
+    def c_collapsed(self, index: QModelIndex):
+        item = self.itemFromIndex(index)
+        if item is not None and item.type() == self.ITEM_TYPE_LINE:
+            item.is_expanded = False
+
+    @Slot()
+    def c_journal_applied(self):
+        """
+            An undo or redo changed the database, the surveys, lines and stations are synced with it.
+        """
+        SurveyStore.instance().reload()
+        self.import_item().update_children()
+        self.map_item().update_children()
+
     def import_item(self) -> ImportItem:
         return self._import_item
 
@@ -0,0 +1,340 @@
+"""
+    The undo/redo history of the open project, kept as the inverse of the changed rows.
+
+    While an action (or an undo) runs, temporary triggers on the JOURNAL_TABLES log every changed row of the connection
+    in journal_log: the rows that were inserted, and a copy of the old row (in journal_<table>) of the rows that were
+    updated or deleted, also the rows a cascade deletes. The writes of one user action (see action()) are one undo step.
+    Undo applies the inverse of its rows in the database, newest first: the inserted rows are deleted, the old rows
+    are written back. Doing so logs the rows again, which makes up the redo step. Nothing is read from the project file.
+
+    Only the connection of the journal (the GUI connection) is followed, writes outside of an action are not logged
+    (the triggers check the flag in journal_state), they are not undoable and drop the redo steps.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from PySide6.QtCore import QObject, Signal
+
+from Config.Constants import JOURNAL_TABLES, JOURNAL_MAX_STEPS, JOURNAL_MAX_ENTRIES, JOURNAL_COALESCE_INTERVAL
+from Models.TableModels import SqlManager, ProjectSettings
+
+
+class JournalStep:
+    """
+        One undoable action, the journal_log entries first to last.
+    """
+    __slots__ = ('label', 'key', 'first', 'last', 'time')
+
+    def __init__(self, label: str, key: str, first: int, last: int):
+        self.label = label
+        self.key = key
+        self.first = first
+        self.last = last
+        self.time = time.monotonic()
+
+
+class Journal(QObject):
+    # the undo or redo steps changed (ea. to update the Edit menu).
+    s_changed = Signal()
+    # undo or redo changed the database, the views read it again.
+    s_applied = Signal()
+
+    # what happened to the row, the inverse is applied on undo.
+    INSERTED = 'I'
+    UPDATED = 'U'
+    DELETED = 'D'
+
+    _instance = None
+
+    def __init__(self, sql_manager: SqlManager = None, max_steps: int = JOURNAL_MAX_STEPS,
+                 max_entries: int = JOURNAL_MAX_ENTRIES, coalesce_interval: float = JOURNAL_COALESCE_INTERVAL):
+        super().__init__()
+        self.log = logging.getLogger(__name__)
+        self._sql_manager = sql_manager
+        self.max_steps = max_steps
+        self.max_entries = max_entries
+        self.coalesce_interval = coalesce_interval
+        self._undo = []
+        self._redo = []
+        # table -> (columns, primary key) of the journaled tables, empty until the triggers are created.
+        self._tables = {}
+        self._depth = 0
+        self._start = None
+        # total_changes() of the connection when the journal was done writing, more means writes outside an action.
+        self._changes_seen = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def sql_manager(self) -> SqlManager:
+        if self._sql_manager is None:
+            self._sql_manager = SqlManager()
+        return self._sql_manager
+
+    @contextmanager
+    def action(self, label: str, key: str = None):
+        """
+            The writes within are one undo step, labeled for the Edit menu. Nested actions are part of the outer one.
+            Steps with the same key, one right after the other within the coalesce interval, become one step.
+        """
+        if self._depth == 0:
+            self._begin()
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self._end(label, key)
+
+    def can_undo(self) -> bool:
+        return len(self._undo) > 0
+
+    def can_redo(self) -> bool:
+        return len(self._redo) > 0
+
+    def undo_label(self) -> str:
+        return self._undo[-1].label if self.can_undo() else None
+
+    def redo_label(self) -> str:
+        return self._redo[-1].label if self.can_redo() else None
+
+    def undo(self) -> str:
+        """
+            Returns the label of the undone step, None without one.
+        """
+        return self._apply(self._undo, self._redo)
+
+    def redo(self) -> str:
+        return self._apply(self._redo, self._undo)
+
+    def clear(self):
+        """
+            Drops the history and the triggers, for when another project is loaded in the database.
+        """
+        self._undo = []
+        self._redo = []
+        if len(self._tables) > 0:
+            model = self._model()
+            for table_name in self._tables:
+                for operation in ('insert', 'update', 'delete'):
+                    model.db_exec(f'DROP TRIGGER IF EXISTS temp.journal_{table_name}_{operation}')
+                model.db_exec(f'DROP TABLE IF EXISTS temp.journal_{table_name}')
+            model.db_exec('DROP TABLE IF EXISTS temp.journal_log')
+            model.db_exec('DROP TABLE IF EXISTS temp.journal_state')
+            self._tables = {}
+            self._changes_seen = None
+        self.s_changed.emit()
+
+    def entry_count(self) -> int:
+        if len(self._tables) == 0:
+            return 0
+        return self._model().db_fetch('SELECT COUNT(*) FROM temp.journal_log', row_type=ProjectSettings.ROW_TUPLE)[0][0]
+
+    def _model(self) -> ProjectSettings:
+        return self.sql_manager().factor(ProjectSettings)
+
+    def _attach(self):
+        """
+            Creates the log and the triggers on the connection, with the columns the tables have now.
+        """
+        model = self._model()
+        model.db_exec(
+            'CREATE TEMP TABLE IF NOT EXISTS journal_log (seq INTEGER PRIMARY KEY, table_name TEXT, operation TEXT, row_id INTEGER)'
+        )
+        model.db_exec('CREATE TEMP TABLE IF NOT EXISTS journal_state (recording INTEGER)')
+        model.db_exec('DELETE FROM temp.journal_state')
+        model.db_exec('INSERT INTO temp.journal_state VALUES (0)')
+        for table_name in JOURNAL_TABLES:
+            info = model.db_fetch(f'PRAGMA main.table_info({table_name})')
+            columns = [row['name'] for row in info]
+            primary_key = next(row['name'] for row in info if row['pk'] == 1)
+            self._tables[table_name] = (columns, primary_key)
+
+            # untyped columns, the old values are kept as they were.
+            model.db_exec(f'CREATE TEMP TABLE IF NOT EXISTS journal_{table_name} (journal_seq INTEGER PRIMARY KEY, {", ".join(columns)})')
+            old_values = ', '.join(f'old.{name}' for name in columns)
+            copy = f'INSERT INTO journal_{table_name} VALUES (last_insert_rowid(), {old_values});'
+            for operation, event, row, copy_row in (
+                (self.INSERTED, 'INSERT', 'new', ''),
+                (self.UPDATED, 'UPDATE', 'old', copy),
+                (self.DELETED, 'DELETE', 'old', copy),
+            ):
+                model.db_exec(f"""
+                    CREATE TEMP TRIGGER IF NOT EXISTS journal_{table_name}_{event.lower()} AFTER {event} ON main.{table_name}
+                    WHEN (SELECT recording FROM temp.journal_state)
+                    BEGIN
+                        INSERT INTO journal_log (table_name, operation, row_id) VALUES ('{table_name}', '{operation}', {row}.{primary_key});
+                        {copy_row}
+                    END
+                """)
+
+    def _record(self, recording: bool):
+        self._model().db_exec(f'UPDATE temp.journal_state SET recording = {int(recording)}')
+
+    def _changes(self) -> int:
+        return self._model().db_fetch('SELECT total_changes()', row_type=ProjectSettings.ROW_TUPLE)[0][0]
+
+    def _last_seq(self) -> int:
+        return self._model().db_fetch('SELECT COALESCE(MAX(seq), 0) FROM temp.journal_log', row_type=ProjectSettings.ROW_TUPLE)[0][0]
+
+    def _begin(self):
+        if len(self._tables) == 0:
+            self._attach()
+        self._drop_unowned()
+        self._start = self._last_seq() + 1
+        self._record(True)
+
+    def _end(self, label: str, key: str):
+        self._record(False)
+        try:
+            self._add_step(label, key)
+        finally:
+            self._changes_seen = self._changes()
+
+    def _add_step(self, label: str, key: str):
+        last = self._last_seq()
+        if last < self._start:
+            return
+        top = self._undo[-1] if self.can_undo() else None
+        if key is not None and top is not None and top.key == key and top.last == self._start - 1 \
+                and time.monotonic() - top.time < self.coalesce_interval:
+            top.last = last
+            top.time = time.monotonic()
+        else:
+            self._undo.append(JournalStep(label, key, self._start, last))
+        self._drop_steps(self._redo)
+        self._trim()
+        self.s_changed.emit()
+
+    def _drop_unowned(self):
+        """
+            Drops the redo steps when the connection wrote outside of an action since the journal did,
+            they no longer apply after that.
+        """
+        if self._changes_seen is not None and self._changes() != self._changes_seen:
+            self._drop_steps(self._redo)
+
+    def _drop_steps(self, steps: list):
+        for step in steps:
+            self._delete_entries(step.first, step.last)
+        steps.clear()
+
+    def _trim(self):
+        count = self.entry_count()
+        while len(self._undo) > self.max_steps or (count > self.max_entries and len(self._undo) > 1):
+            step = self._undo.pop(0)
+            self._delete_entries(step.first, step.last)
+            count -= step.last - step.first + 1
+
+    def _delete_entries(self, first: int, last: int = None):
+        model = self._model()
+        tables = [('journal_log', 'seq')] + [(f'journal_{table_name}', 'journal_seq') for table_name in self._tables]
+        # the seqs are our own integers, written in the sql: fewer values to bind on every step dropped.
+        where = f'>= {int(first)}' if last is None else f'BETWEEN {int(first)} AND {int(last)}'
+        for table, column in tables:
+            model.db_exec(f'DELETE FROM temp.{table} WHERE {column} {where}')
+
+    def _apply(self, steps: list, inverse_steps: list) -> str:
+        if len(steps) == 0:
+            return None
+        self._drop_unowned()
+        if len(steps) == 0:
+            return None
+        step = steps.pop()
+        model = self._model()
+        start = self._last_seq() + 1
+
+        is_transaction = model.backend.transaction()
+        # the rows are written back child first, the references are checked once all are back.
+        model.db_exec('PRAGMA defer_foreign_keys=ON')
+        # the inverse rows are logged, they make up the inverse step.
+        self._record(True)
+        try:
+            for first, last, groups in self._batches(step):
+                for table_name, operation in groups:
+                    result = model.db_exec(self._inverse_sql(table_name, operation), [first, last])
+                    if len(result.error) > 0:
+                        raise Exception('JOURNAL_APPLY_FAILED')
+            self._record(False)
+            self._delete_entries(step.first, step.last)
+        except Exception:
+            if is_transaction:
+                model.backend.rollback()
+            self._record(False)
+            self._changes_seen = self._changes()
+            steps.append(step)
+            raise
+        if is_transaction:
+            model.backend.commit()
+        self._changes_seen = self._changes()
+
+        last = self._last_seq()
+        if last >= start:
+            inverse_steps.append(JournalStep(step.label, None, start, last))
+        self.log.debug(f'Applied "{step.label}", {step.last - step.first + 1} rows')
+        self.s_applied.emit()
+        self.s_changed.emit()
+        return step.label
+
+    def _batches(self, step: JournalStep) -> list:
+        """
+            The entries of a step newest first, in batches (first, last, [(table, operation)]) that change a row once.
+            Within a batch the updates are undone first, then the deleted rows are written back and then the inserted
+            rows are deleted, one statement for every table and operation.
+        """
+        batches = []
+        rows = self._model().db_iter(
+            'SELECT seq, table_name, operation, row_id FROM temp.journal_log WHERE seq BETWEEN ? AND ? ORDER BY seq DESC',
+            [step.first, step.last],
+            row_type=ProjectSettings.ROW_TUPLE
+        )
+        last = None
+        changed = set()
+        groups = set()
+        for seq, table_name, operation, row_id in rows:
+            if (table_name, row_id) in changed:
+                batches.append((seq + 1, last, groups))
+                last = None
+                changed = set()
+                groups = set()
+            if last is None:
+                last = seq
+            changed.add((table_name, row_id))
+            groups.add((table_name, operation))
+        if last is not None:
+            batches.append((step.first, last, groups))
+
+        order = {self.UPDATED: 0, self.DELETED: 1, self.INSERTED: 2}
+        return [(first, last, sorted(groups, key=lambda group: order[group[1]])) for first, last, groups in batches]
+
+    def _inverse_sql(self, table_name: str, operation: str) -> str:
+        """
+            The statement that undoes the entries of a table and operation, between the seq parameters.
+        """
+        columns, primary_key = self._tables[table_name]
+        entries = f"""
+            SELECT seq FROM temp.journal_log WHERE seq BETWEEN ?1 AND ?2 AND table_name = '{table_name}' AND operation = '{operation}'
+        """
+        if operation == self.INSERTED:
+            return f"""
+                DELETE FROM main.{table_name} WHERE {primary_key} IN (
+                    SELECT row_id FROM temp.journal_log WHERE seq IN ({entries})
+                )
+            """
+        if operation == self.DELETED:
+            return f"""
+                INSERT INTO main.{table_name} ({', '.join(columns)})
+                    SELECT {', '.join(columns)} FROM temp.journal_{table_name} WHERE journal_seq IN ({entries})
+            """
+        values = ', '.join(f'{name}=j.{name}' for name in columns if name != primary_key)
+        return f"""
+            UPDATE main.{table_name} SET {values}
+              FROM temp.journal_{table_name} AS j
+             WHERE j.journal_seq IN ({entries})
+               AND {table_name}.{primary_key} = j.{primary_key}
+        """
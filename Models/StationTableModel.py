@@ -0,0 +1,231 @@
+"""
+    The stations of one line as a table, for the station editor.
+
+    The rows are the StationRecords of the SurveyStore, nothing is read from the database for the table itself.
+    The view is given the rows in batches (fetchMore), sorting happens on the records in memory and the column widths
+    are estimated from a sample of the rows, so a line of many thousands of stations opens at once.
+    Edits are kept in the model until submit_all() hands them to the store, revert_all() drops them.
+"""
+from operator import attrgetter
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PySide6.QtGui import QFontMetrics
+
+from Config.Constants import STATION_TABLE_FETCH_SIZE, STATION_TABLE_WIDTH_SAMPLE, STATION_TABLE_MAX_COLUMN_WIDTH
+from Models.SurveyStore import SurveyStore, StationRecord
+from Utils.Settings import Preferences
+
+
+class StationTableModel(QAbstractTableModel):
+    # name, header, the columns in the order of the import_stations table.
+    COLUMNS = (
+        ('station_id', 'Station id'),
+        ('line_id', 'Line id'),
+        ('survey_id', 'Survey id'),
+        ('station_reference_id', 'ID'),
+        ('line_reference_id', 'Device line reference id'),
+        ('station_name', 'Station name'),
+        ('length_in', 'Length in'),
+        ('azimuth_in', 'Azimuth in'),
+        ('depth', 'Depth'),
+        ('azimuth_out', 'Azimuth out'),
+        ('azimuth_out_avg', 'Azimuth corrected'),
+        ('length_out', 'Length out'),
+        ('station_comment', 'Station Comment'),
+        ('latitude', 'Latitude'),
+        ('longitude', 'Longitude'),
+        ('depth_in', 'Depth in'),
+        ('pitch_in', 'Pitch in'),
+        ('pitch_out', 'Pitch out'),
+        ('status_byte', 'Status byte'),
+        ('byte_start', 'Byte start'),
+        ('byte_end', 'Byte end'),
+        ('is_generated', 'Generated'),
+        ('device_properties', 'Device properties'),
+    )
+    READ_ONLY = (
+        'station_id', 'line_id', 'survey_id', 'line_reference_id', 'depth_in', 'pitch_in', 'pitch_out', 'status_byte',
+        'byte_start', 'byte_end', 'is_generated', 'device_properties'
+    )
+    HIDDEN = ('line_id', 'survey_id', 'line_reference_id')
+    # only shown in debug mode.
+    DEBUG = (
+        'station_id', 'depth_in', 'pitch_in', 'pitch_out', 'status_byte', 'byte_start', 'byte_end', 'is_generated',
+        'device_properties'
+    )
+
+    def __init__(self, line_id: int, store: SurveyStore = None, parent=None):
+        super().__init__(parent)
+        self.line_id = line_id
+        self.store = store if store is not None else SurveyStore.instance()
+        self.names = [name for name, header in self.COLUMNS]
+        # the records in the order shown, the first fetched of them are rows of the view.
+        self._records = []
+        self._fetched = 0
+        # station_id -> {name: value}, the edits not submitted yet.
+        self._pending = {}
+        # (column, order) the records are in, the store keeps them by station_id.
+        self._sorted = None
+        self.load()
+
+    def load(self):
+        self.beginResetModel()
+        self._records = list(self.store.stations(self.line_id))
+        self._fetched = min(STATION_TABLE_FETCH_SIZE, len(self._records))
+        self._pending = {}
+        self._sorted = (self.names.index('station_id'), Qt.AscendingOrder)
+        self.endResetModel()
+
+    def record(self, row: int) -> StationRecord:
+        return self._records[row]
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._fetched
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return parent.isValid() is False and self._fetched < len(self._records)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(STATION_TABLE_FETCH_SIZE, len(self._records) - self._fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section][1]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if index.isValid() is False or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        return self.value(index.row(), self.names[index.column()])
+
+    def value(self, row: int, name: str):
+        return self._value(self._records[row], name)
+
+    def _value(self, record: StationRecord, name: str):
+        pending = self._pending.get(record.station_id)
+        if pending is not None and name in pending:
+            return pending[name]
+        return record[name]
+
+    def flags(self, index: QModelIndex):
+        flags = super().flags(index)
+        if index.isValid() and self.names[index.column()] not in self.READ_ONLY:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index: QModelIndex, value, role=Qt.EditRole) -> bool:
+        if index.isValid() is False or role != Qt.EditRole or not (self.flags(index) & Qt.ItemIsEditable):
+            return False
+        record = self._records[index.row()]
+        self._pending.setdefault(record.station_id, {})[self.names[index.column()]] = value
+        self._sorted = None
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        if (column, order) == self._sorted:
+            return
+        name = self.names[column]
+        is_descending = order == Qt.DescendingOrder
+        get = attrgetter(name)
+        edited = {station_id: values[name] for station_id, values in self._pending.items() if name in values}
+
+        def key(record: StationRecord):
+            value = edited[record.station_id] if record.station_id in edited else get(record)
+            # the empty values last, whichever the order.
+            is_empty = value in (None, '')
+            return is_empty is not is_descending, 0 if is_empty else value
+
+        def text_key(record: StationRecord):
+            # mixed types in one column (ea. a number typed in a text column) are compared as text.
+            is_empty, value = key(record)
+            return is_empty, str(value)
+
+        self.layoutAboutToBeChanged.emit()
+        old_records = list(self._records)
+        try:
+            self._records.sort(key=key, reverse=is_descending)
+        except TypeError:
+            self._records.sort(key=text_key, reverse=is_descending)
+
+        new_rows = {record.station_id: row for row, record in enumerate(self._records)}
+        old_indexes = self.persistentIndexList()
+        new_indexes = []
+        for index in old_indexes:
+            row = new_rows[old_records[index.row()].station_id]
+            new_indexes.append(self.index(row, index.column()) if row < self._fetched else QModelIndex())
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self._sorted = (column, order)
+        self.layoutChanged.emit()
+
+    def is_dirty(self) -> bool:
+        return len(self._pending) > 0
+
+    def submit_all(self) -> int:
+        """
+            Hands the edits to the store (which writes them), returns the amount of stations changed.
+        """
+        count = 0
+        for station_id, values in self._pending.items():
+            record = self.store.station(station_id)
+            if record is None:
+                continue
+            changed = {name: value for name, value in values.items() if record[name] != value}
+            if len(changed) > 0:
+                self.store.update_station(station_id, changed)
+                count += 1
+        self._pending = {}
+        return count
+
+    def revert_all(self):
+        if self.is_dirty() is False:
+            return
+        self._pending = {}
+        self._sorted = None
+        if self._fetched > 0:
+            self.dataChanged.emit(self.index(0, 0), self.index(self._fetched - 1, len(self.COLUMNS) - 1))
+
+    def set_column_widths(self, view):
+        """
+            Hides the columns the user does not edit and sizes the others to the header and a sample of the rows,
+            measuring every row (resizeColumnsToContents) takes seconds on a long line.
+        """
+        is_debug = Preferences.debug()
+        for column, name in enumerate(self.names):
+            view.setColumnHidden(column, name in self.HIDDEN or (name in self.DEBUG and is_debug is False))
+
+        metrics = QFontMetrics(view.font())
+        header_metrics = QFontMetrics(view.horizontalHeader().font())
+        rows = self.sample_rows(STATION_TABLE_WIDTH_SAMPLE)
+        # the cell margins and the sort indicator.
+        padding = 2 * view.style().pixelMetric(view.style().PixelMetric.PM_FocusFrameHMargin) + 24
+        for column, name in enumerate(self.names):
+            if view.isColumnHidden(column):
+                continue
+            width = header_metrics.horizontalAdvance(self.COLUMNS[column][1])
+            for row in rows:
+                value = self.value(row, name)
+                if value not in (None, ''):
+                    width = max(width, metrics.horizontalAdvance(str(value)))
+            view.setColumnWidth(column, min(width + padding, STATION_TABLE_MAX_COLUMN_WIDTH))
+        view.horizontalHeader().setStretchLastSection(True)
+
+    def sample_rows(self, size: int) -> list:
+        """
+            At most size rows, spread evenly over all the records (also the ones not fetched yet).
+        """
+        count = len(self._records)
+        if count <= size:
+            return list(range(0, count))
+        step = count / size
+        return [int(index * step) for index in range(0, size)]
@@ -0,0 +1,211 @@
+"""
+    The import stations of the open project in memory, the one place the views (in the GUI thread) read and edit them.
+
+    A line is read from the database the first time it is asked for, after that the tree, the dialogs and the scene
+    share the same records. Edits change the records at once and notify the views of the one station that changed,
+    the database is written in a single transaction once the edits settle (SURVEY_STORE_FLUSH_DELAY) or on flush().
+    With a journal every flush is one undo step, the edits of one burst are undone together.
+"""
+import logging
+from contextlib import nullcontext
+
+from PySide6.QtCore import QObject, Signal, QTimer, Slot
+
+from Config.Constants import SURVEY_STORE_FLUSH_DELAY
+from Models.Journal import Journal
+from Models.TableModels import SqlManager, ImportStation
+
+
+class StationRecord:
+    """
+        One import station, read like a row (record['station_name']) so it can be used where the rows were.
+    """
+    __slots__ = (
+        'station_id', 'line_id', 'survey_id', 'line_reference_id', 'station_reference_id', 'station_name',
+        'length_in', 'azimuth_in', 'depth', 'azimuth_out', 'azimuth_out_avg', 'length_out', 'longitude', 'latitude',
+        'station_comment', 'depth_in', 'pitch_in', 'pitch_out', 'status_byte', 'byte_start', 'byte_end',
+        'is_generated', 'device_properties'
+    )
+
+    def __init__(self, row: dict):
+        for name in self.__slots__:
+            setattr(self, name, row.get(name))
+
+    def __getitem__(self, name: str):
+        return getattr(self, name)
+
+    def get(self, name: str, default=None):
+        return getattr(self, name, default)
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class SurveyStore(QObject):
+    # line_id, station_id
+    s_station_changed = Signal(int, int)
+    s_station_removed = Signal(int, int)
+    # line_id, the stations of the line were (re)read from the database.
+    s_line_loaded = Signal(int)
+    # the amount of stations written to the database.
+    s_flushed = Signal(int)
+    # the error key of a write the timer started, nobody else is there to catch it.
+    s_error = Signal(str)
+
+    _instance = None
+
+    def __init__(self, sql_manager: SqlManager = None, flush_delay: int = SURVEY_STORE_FLUSH_DELAY, journal: Journal = None):
+        super().__init__()
+        self.log = logging.getLogger(__name__)
+        self._sql_manager = sql_manager
+        self._journal = journal
+        # line_id -> [StationRecord] in station order, station_id -> StationRecord
+        self._lines = {}
+        self._stations = {}
+        # station_id -> the changed values, and the removed station_ids, not written yet.
+        self._pending = {}
+        self._removed = []
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(flush_delay)
+        self._timer.timeout.connect(self.c_flush_timeout)
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls(journal=Journal.instance())
+        return cls._instance
+
+    def sql_manager(self) -> SqlManager:
+        if self._sql_manager is None:
+            self._sql_manager = SqlManager()
+        return self._sql_manager
+
+    def stations(self, line_id: int) -> list:
+        if line_id not in self._lines:
+            return self.load_line(line_id)
+        return self._lines[line_id]
+
+    def station(self, station_id: int) -> StationRecord:
+        if station_id not in self._stations:
+            row = self.sql_manager().factor(ImportStation).get(station_id)
+            if row is None:
+                return None
+            # a station added after its line was read (ea. by an import).
+            self.load_line(row['line_id'])
+        return self._stations.get(station_id)
+
+    def load_line(self, line_id: int) -> list:
+        """
+            (Re)reads the stations of a line, call it when the line was changed in the database directly.
+        """
+        self.flush()
+        self._forget(line_id)
+        records = [StationRecord(row) for row in self.sql_manager().factor(ImportStation).get_all(line_id)]
+        self._lines[line_id] = records
+        for record in records:
+            self._stations[record.station_id] = record
+        self.s_line_loaded.emit(line_id)
+        return records
+
+    def update_station(self, station_id: int, values: dict) -> StationRecord:
+        """
+            Returns None when the station is gone (ea. by an undo), nothing is changed then.
+        """
+        record = self.station(station_id)
+        if record is None:
+            self.log.warning(f'Station {station_id} does not exist, the edit is dropped')
+            return None
+        for name, value in values.items():
+            setattr(record, name, value)
+        self._pending.setdefault(station_id, {}).update(values)
+        self._timer.start()
+        self.s_station_changed.emit(record.line_id, station_id)
+        return record
+
+    def remove_station(self, station_id: int):
+        record = self.station(station_id)
+        if record is None:
+            return
+        self._lines[record.line_id].remove(record)
+        del self._stations[station_id]
+        self._pending.pop(station_id, None)
+        self._removed.append(station_id)
+        self._timer.start()
+        self.s_station_removed.emit(record.line_id, station_id)
+
+    def forget_line(self, line_id: int):
+        """
+            Drops a line that was removed from the database, its unwritten edits are dropped as well.
+        """
+        for record in self._lines.get(line_id, []):
+            self._pending.pop(record.station_id, None)
+        self._forget(line_id)
+
+    def forget_survey(self, survey_id: int):
+        line_ids = {record.line_id for record in self._stations.values() if record.survey_id == survey_id}
+        for line_id in line_ids:
+            self.forget_line(line_id)
+
+    def reload(self):
+        """
+            Reads the loaded lines again, for when the database changed under the store (ea. an undo).
+        """
+        for line_id in list(self._lines.keys()):
+            self.load_line(line_id)
+
+    def clear(self):
+        """
+            Drops everything, without writing, for when another project is loaded in the database.
+        """
+        self._timer.stop()
+        self._lines = {}
+        self._stations = {}
+        self._pending = {}
+        self._removed = []
+
+    def is_dirty(self) -> bool:
+        return len(self._pending) > 0 or len(self._removed) > 0
+
+    def flush(self) -> int:
+        """
+            Writes the pending edits in one transaction, returns the amount of stations written.
+        """
+        self._timer.stop()
+        if self.is_dirty() is False:
+            return 0
+
+        model = self.sql_manager().factor(ImportStation)
+        action = self._journal.action('Edit stations', key='stations') if self._journal is not None else nullcontext()
+        with action:
+            is_transaction = model.backend.transaction()
+            try:
+                model.delete_many(self._removed)
+                for station_id, values in self._pending.items():
+                    model.update(values, station_id)
+            except Exception:
+                if is_transaction:
+                    model.backend.rollback()
+                raise
+            if is_transaction:
+                model.backend.commit()
+
+        count = len(self._removed) + len(self._pending)
+        self._pending = {}
+        self._removed = []
+        self.log.debug(f'Wrote {count} stations')
+        self.s_flushed.emit(count)
+        return count
+
+    @Slot()
+    def c_flush_timeout(self):
+        try:
+            self.flush()
+        except Exception as error:
+            self.log.error(f'Writing the stations failed: {error}')
+            self.s_error.emit(str(error))
+
+    def _forget(self, line_id: int):
+        for record in self._lines.pop(line_id, []):
+            self._stations.pop(record.station_id, None)
@@ -1,105 +1,144 @@
+import functools
+import itertools
 import json
 import logging
+import threading
+import math
+from collections import namedtuple
 from datetime import datetime
 
-from PySide6.QtCore import QModelIndex, Qt, QSettings, QDateTime
+from PySide6.QtCore import QModelIndex, Qt, QSettings, QDateTime, QThread, QCoreApplication
 from PySide6.QtSql import QSqlTableModel, QSqlQuery, QSqlRelationalTableModel, QSqlRelation, QSqlDatabase
 
 from Config.Constants import SQL_TABLE_IMPORT_STATIONS, SQL_TABLE_IMPORT_LINES, SQL_TABLE_IMPORT_SURVEYS, \
     SQL_TABLE_CONTACTS, \
     SQL_TABLE_EXPLORERS, SQL_TABLE_SURVEYORS, SQL_DB_LOCATION, SQL_CONNECTION_NAME, DEBUG, SQL_TABLE_MAP_LINES, \
-    SQL_TABLE_MAP_STATIONS, SQL_TABLE_PROJECT_SETTINGS, SURVEY_DIRECTION_IN, SURVEY_DIRECTION_OUT
+    SQL_TABLE_MAP_STATIONS, SQL_TABLE_PROJECT_SETTINGS, SURVEY_DIRECTION_IN, SURVEY_DIRECTION_OUT, \
+    SQL_STATEMENT_CACHE_SIZE, SQL_CONNECTION_PRAGMAS, SQL_MAX_VARIABLES
 from Gui.Delegates.FormElements import CommentEditor, DateTimeEditor, DropDown
+from Models.Backends import StatementCache, Sqlite3Backend, backend_for
+from Utils import ProjectFile
 from Utils.Settings import Preferences
 
 
 class QueryMixin:
+    """
+        The queries of the models, run on a storage backend (see Models.Backends).
+        Models are created with a QSqlDatabase (QtSqlBackend) or with a Sqlite3Backend.
+    """
+    # the shapes db_fetch() can return the rows in.
+    ROW_DICT = 'dict'
+    ROW_TUPLE = 'tuple'
+    ROW_NAMEDTUPLE = 'namedtuple'
+    ROW_COLUMNS = 'columns'
 
     def db_exec(self, sql: str, params: list = []):
-        settings = QSettings()
-        settings.setValue('SaveFile/is_changed', True)
-        obj = QSqlQuery(self.db)
-        status = obj.prepare(sql)
-        if status is False:
-            self._log.error(f'db_exec prepare failed: {obj.lastError()} for sql: {sql}')
-
-        for value in params:
-            obj.addBindValue(value)
-
-        obj.exec_()
-        err = obj.lastError().text()
-        if len(err) > 0:
-            self._log.error(f'db_exec exec error: {err} for sql: {sql}')
-        return obj
+        """
+            Returns the result (see Models.Backends), read it before the same sql is executed again.
+        """
+        self._set_changed()
+        result = self.backend.execute(sql, params)
+        if len(result.error) > 0:
+            self._log.error(f'db_exec error: {result.error} for sql: {sql}')
+        return result
 
     def db_insert(self, table_name: str, values: dict) -> int:
-        settings = QSettings()
-        settings.setValue('SaveFile/is_changed', True)
-        col_names = ', '.join(values.keys())
-        placeholders = ', '.join('?' for x in values.values())
-        query = 'INSERT INTO {} ({})VALUES({})'.format(table_name, col_names, placeholders)
-        obj = QSqlQuery(self.db)
-        obj.prepare(query)
-
-        for value in values.values():
-            obj.addBindValue(value)
-
-        if obj.exec_() is False:
+        self._set_changed()
+        query = self._insert_sql(table_name, tuple(values.keys()))
+        result = self.backend.execute(query, values.values())
+        if len(result.error) > 0:
             raise SyntaxError(f'Sql insert query failed! {query}')
-        insert_id = obj.lastInsertId()
-        obj.clear()
+        insert_id = result.lastrowid
+        result.close()
         return insert_id
 
-    def db_insert_bulk(self, table_name: str, values: list, max_batch_size: int=10, start_at: int=0) -> int:
-        settings = QSettings()
-        settings.setValue('SaveFile/is_changed', True)
-        col_names = ', '.join(values[0].keys())
-        new_start_at = 0
-        placeholders = []
-        params = []
-        for index, row in enumerate(values[start_at::]):
-            placeholders.append('({})'.format(', '.join('?' for x in row.values())))
-            params.extend(row.values())
-            if index == max_batch_size - 1:
-                new_start_at = start_at + index + 1
-                break
-
-        placeholder = ', '.join(placeholders)
-        query = f'INSERT INTO {table_name} ({col_names})VALUES {placeholder}'
-        obj = self.db_exec(query, params)
-
-        if obj is False:
-            self._log.error(f'Sql bulk insert query failed! {obj.lastError()}')
-            raise SyntaxError('Sql bulk insert query failed!')
-        row_count = obj.numRowsAffected()
-        if new_start_at > 0:
-            row_count = row_count + self.db_insert_bulk(table_name, values, max_batch_size, new_start_at)
+    @staticmethod
+    @functools.lru_cache(maxsize=SQL_STATEMENT_CACHE_SIZE)
+    def _insert_sql(table_name: str, col_names: tuple) -> str:
+        placeholders = ', '.join('?' for x in col_names)
+        return 'INSERT INTO {} ({})VALUES({})'.format(table_name, ', '.join(col_names), placeholders)
+
+    def db_insert_bulk(self, table_name: str, values: list) -> int:
+        """
+            Inserts all rows (with the columns of the first row) with one prepared statement in one transaction,
+            unless a transaction is running already.
+        """
+        self._set_changed()
+        col_names = tuple(values[0].keys())
+        query = self._insert_sql(table_name, col_names)
+        is_transaction = self.backend.transaction()
+        try:
+            row_count = self.backend.executemany(query, [tuple(row[name] for name in col_names) for row in values])
+        except Exception:
+            if is_transaction:
+                self.backend.rollback()
+            self._log.error(f'Sql bulk insert query failed! for sql: {query}')
+            raise
+        if is_transaction:
+            self.backend.commit()
         return row_count
 
     def db_update(self, table_name: str, values: dict, where_str: str, params: list = []) -> int:
-        settings = QSettings()
-        settings.setValue('SaveFile/is_changed', True)
+        self._set_changed()
         update_cols = ', '.join('{}=?'.format(x) for x in values.keys())
         query = 'UPDATE {} SET {} WHERE {}'.format(table_name, update_cols, where_str)
-        obj = QSqlQuery(self.db)
-        obj.prepare(query)
-
-        for value in values.values():
-            obj.addBindValue(value)
-        for value in params:
-            obj.addBindValue(value)
-
-        obj.exec_()
-        return obj.numRowsAffected()
+        result = self.db_exec(query, [*values.values(), *params])
+        return result.rowcount
 
     def db_delete(self, table_name: str, where_str: str = None, params: list = []) -> int:
-        settings = QSettings()
-        settings.setValue('SaveFile/is_changed', True)
+        self._set_changed()
         query = f'DELETE FROM {table_name}'
         if where_str is not None:
             query = f'{query} WHERE {where_str}'
-        obj = self.db_exec(query, params)
-        return obj.numRowsAffected()
+        result = self.db_exec(query, params)
+        return result.rowcount
+
+    def db_add_columns(self, table_name: str, columns: dict) -> list:
+        """
+            Adds the columns ({name: definition}) the table is missing, returns the names of the added columns.
+        """
+        existing = [row['name'] for row in self.db_fetch(f'PRAGMA table_info({table_name})')]
+        added = [name for name in columns.keys() if name not in existing]
+        for name in added:
+            self.db_exec(f'ALTER TABLE {table_name} ADD COLUMN {name} {columns[name]}')
+        return added
+
+    def db_delete_many(self, table_name: str, id_name: str, ids: list, cascaded: str = None) -> int:
+        """
+            Deletes the rows with the ids in one transaction (unless one is running), SQL_MAX_VARIABLES ids a statement.
+            Returns the amount of deleted rows, cascaded is the query that counts the rows a cascade deletes with them
+            ("{ids}" is replaced by the placeholders of the ids).
+            Raises Exception('SQL_DELETE_FAILED') when a statement fails, the transaction is rolled back then.
+        """
+        ids = list(ids)
+        if len(ids) == 0:
+            return 0
+        self._set_changed()
+        row_count = 0
+        is_transaction = self.backend.transaction()
+        try:
+            for start in range(0, len(ids), SQL_MAX_VARIABLES):
+                chunk = ids[start:start + SQL_MAX_VARIABLES]
+                placeholders = ', '.join('?' for x in chunk)
+                if cascaded is not None:
+                    params = chunk * cascaded.count('{ids}')
+                    result = self.db_exec(cascaded.format(ids=placeholders), params)
+                    row = next(result.rows(), None)
+                    result.close()
+                    if len(result.error) > 0 or row is None:
+                        raise Exception('SQL_DELETE_FAILED')
+                    row_count += row[0]
+                result = self.db_exec(f'DELETE FROM {table_name} WHERE {id_name} IN ({placeholders})', chunk)
+                if len(result.error) > 0:
+                    raise Exception('SQL_DELETE_FAILED')
+                row_count += result.rowcount
+        except Exception:
+            if is_transaction:
+                self.backend.rollback()
+            raise
+        if is_transaction:
+            self.backend.commit()
+        return row_count
 
     def db_get(self, table_name, where_str=None, params=[]) -> dict:
         if type(params) is not list:
@@ -109,45 +148,205 @@ class QueryMixin:
         if where_str is not None:
             query = f"{query} WHERE {where_str}"
 
-        obj = QSqlQuery(self.db)
-        obj.prepare(query)
+        result = self.backend.execute(query, params)
+        row = next(result.rows(), None)
+        columns = result.columns
+        result.close()
+        if row is None:
+            return None
+        return dict(zip(columns, row))
 
-        for param in params:
-            obj.addBindValue(param)
+    def db_fetch(self, sql, params=[], row_type: str = ROW_DICT):
+        """
+            Returns the rows as a list of dicts (default), tuples (ROW_TUPLE) or namedtuples (ROW_NAMEDTUPLE),
+            or as one dict with a list of values per column (ROW_COLUMNS).
+        """
+        if type(params) is not list:
+            params = [params]
 
-        obj.exec_()
-        if obj.first() is False:
-            return None
-        row = {}
-        for index in range(0, obj.record().count()):
-            row[obj.record().fieldName(index)] = obj.value(index)
+        result = self.db_exec(sql, params)
+        names = result.columns
+        rows = list(result.rows())
+        result.close()
+
+        if row_type == self.ROW_TUPLE:
+            return rows
+        if row_type == self.ROW_NAMEDTUPLE:
+            row_class = self._row_class(tuple(names))
+            return [row_class._make(row) for row in rows]
+        if row_type == self.ROW_COLUMNS:
+            if len(rows) == 0:
+                return {name: [] for name in names}
+            return {name: list(column) for name, column in zip(names, zip(*rows))}
+        return [dict(zip(names, row)) for row in rows]
+
+    def db_iter(self, sql, params=[], row_type: str = ROW_DICT):
+        """
+            Yields the rows (see db_fetch) while they are read, so a big result is never held in memory.
+            The statement stays busy until the generator is exhausted or closed.
+        """
+        if type(params) is not list:
+            params = [params]
 
-        return row
+        result = self.db_exec(sql, params)
+        names = result.columns
+        try:
+            if row_type == self.ROW_TUPLE:
+                yield from result.rows()
+            elif row_type == self.ROW_NAMEDTUPLE:
+                row_class = self._row_class(tuple(names))
+                yield from map(row_class._make, result.rows())
+            else:
+                for row in result.rows():
+                    yield dict(zip(names, row))
+        finally:
+            result.close()
+
+    def db_fetch_array(self, sql, params=[]):
+        """
+            Returns the rows as a numpy structured array with a float64 field per (numeric) column,
+            NULL and empty values become nan. The array is filled while the rows are read.
+        """
+        import numpy
 
-    def db_fetch(self, sql, params=[]):
         if type(params) is not list:
             params = [params]
 
-        obj = self.db_exec(sql, params)
-        rows = []
-        while obj.next():
-            row = {}
-            for index in range(0, obj.record().count()):
-                row[obj.record().fieldName(index)] = obj.value(index)
-            rows.append(row)
-        return rows
+        result = self.db_exec(sql, params)
+        to_float = self._to_float
+        array = numpy.fromiter(
+            (tuple([to_float(value) for value in row]) for row in result.rows()),
+            dtype=numpy.dtype([(name, numpy.float64) for name in result.columns])
+        )
+        result.close()
+        return array
+
+    @staticmethod
+    @functools.lru_cache(maxsize=SQL_STATEMENT_CACHE_SIZE)
+    def _row_class(names: tuple):
+        # rename: columns like "MAX(latitude)" are no valid attribute names.
+        return namedtuple('Row', names, rename=True)
+
+    @staticmethod
+    def _to_float(value) -> float:
+        if value is None or value == '':
+            return math.nan
+        return float(value)
+
+    def _set_changed(self):
+        if self.backend.track_changes:
+            settings = QSettings()
+            settings.setValue('SaveFile/is_changed', True)
 
     def __init__(self, db):
         self.db = db
+        self.backend = backend_for(db)
         self._log = logging.getLogger(__name__)
 
 
+class ConnectionPool:
+    """
+        Hands every thread its own (reused) connection per database file.
+
+        QtSql connections can only be used by the thread that opened them. Instead of opening (and configuring) a
+        connection for every worker or dialog, a thread asks the pool and gets the connection it opened before.
+        The connection of a QThread is closed when that thread finishes, others can be given back with release().
+        The threads of the JobScheduler run until it shuts down, so their connections serve one job after the other.
+    """
+    # readers (the GUI) no longer wait on a worker that is writing an import.
+    PRAGMAS = SQL_CONNECTION_PRAGMAS
+    CONNECT_OPTIONS = 'QSQLITE_BUSY_TIMEOUT=5000'
+
+    # thread ident -> {db_location: connection_name}, not a threading.local as QThread.finished
+    # runs its slots with a fresh python thread state.
+    _connections = {}
+    _counter = itertools.count()
+    _lock = threading.Lock()
+
+    @classmethod
+    def acquire(cls, db_location: str = None) -> str:
+        """
+            Returns the name of the connection for the calling thread, opening it the first time.
+        """
+        if db_location is None:
+            db_location = Preferences.get('sql_db_location', SQL_DB_LOCATION, str)
+        connections = cls._thread_connections()
+        if db_location in connections:
+            return connections[db_location]
+
+        with cls._lock:
+            connection_name = f'{SQL_CONNECTION_NAME}_pool_{next(cls._counter)}'
+        db = QSqlDatabase.addDatabase('QSQLITE', connection_name)
+        db.setDatabaseName(db_location)
+        db.setConnectOptions(cls.CONNECT_OPTIONS)
+        if not db.open():
+            raise ConnectionError(f"Database Error: {db.lastError()}")
+        cls.configure(db)
+        connections[db_location] = connection_name
+
+        thread = QThread.currentThread()
+        application = QCoreApplication.instance()
+        if len(connections) == 1 and application is not None and thread is not application.thread():
+            # finished is emitted by the thread itself, the only thread allowed to close it.
+            thread.finished.connect(lambda: cls.release(), Qt.DirectConnection)
+        return connection_name
+
+    @classmethod
+    def configure(cls, db: QSqlDatabase):
+        for pragma in cls.PRAGMAS:
+            QSqlQuery(pragma, db)
+
+    @classmethod
+    def release(cls):
+        """
+            Closes the connections of the calling thread.
+        """
+        with cls._lock:
+            connections = cls._connections.pop(threading.get_ident(), {})
+        for connection_name in connections.values():
+            StatementCache.clear(connection_name)
+            QSqlDatabase.database(connection_name, False).close()
+            QSqlDatabase.removeDatabase(connection_name)
+
+    @classmethod
+    def open_connections(cls) -> int:
+        with cls._lock:
+            return sum(len(connections) for connections in cls._connections.values())
+
+    @classmethod
+    def _thread_connections(cls) -> dict:
+        with cls._lock:
+            return cls._connections.setdefault(threading.get_ident(), {})
+
+
 class SqlManager:
 
+    @classmethod
+    def for_thread(cls, db_location: str = None):
+        """
+            A SqlManager on the pooled connection of the calling thread (see ConnectionPool).
+        """
+        manager = cls(ConnectionPool.acquire(db_location))
+        manager.is_pooled = True
+        return manager
+
+    @classmethod
+    def sqlite3(cls, db_location: str = None, track_changes: bool = True):
+        """
+            A SqlManager on the sqlite3 module instead of QtSql (see Models.Backends), for code without views.
+            It needs no QCoreApplication and the connection belongs to the calling thread.
+        """
+        if db_location is None:
+            db_location = Preferences.get('sql_db_location', SQL_DB_LOCATION, str)
+        manager = cls.__new__(cls)
+        manager.connection_name = db_location
+        manager.is_pooled = False
+        manager.db = Sqlite3Backend(db_location, track_changes)
+        return manager
+
     def drop_db(self):
         self.drop_tables()
         self.close_connection()
-        QSqlDatabase.removeDatabase(self.connection_name)
 
     def factor(self, object_name):
         return object_name(self.db)
@@ -164,12 +363,13 @@ class SqlManager:
         self.factor(Explorer).create_database_tables()
 
     def drop_tables(self):
+        # the referencing tables first, dropping a referenced table deletes (cascades) its rows first.
         self.factor(ProjectSettings).drop_database_tables()
-        self.factor(ImportSurvey).drop_database_tables()
-        self.factor(ImportLine).drop_database_tables()
         self.factor(ImportStation).drop_database_tables()
-        self.factor(MapLine).drop_database_tables()
+        self.factor(ImportLine).drop_database_tables()
+        self.factor(ImportSurvey).drop_database_tables()
         self.factor(MapStation).drop_database_tables()
+        self.factor(MapLine).drop_database_tables()
         self.factor(Contact).drop_database_tables()
         self.factor(Surveyor).drop_database_tables()
         self.factor(Explorer).drop_database_tables()
@@ -188,6 +388,17 @@ class SqlManager:
         }
 
     def load_table_data(self, data: dict) -> int:
+        """
+            Loads the rows as they were saved, the foreign keys are not checked (ea. older projects with orphans).
+        """
+        settings = self.factor(ProjectSettings)
+        settings.db_exec('PRAGMA foreign_keys=OFF')
+        try:
+            return self._load_table_data(data)
+        finally:
+            settings.db_exec('PRAGMA foreign_keys=ON')
+
+    def _load_table_data(self, data: dict) -> int:
         c = 0
         c = c + self.factor(ProjectSettings).load_table(data[SQL_TABLE_PROJECT_SETTINGS])
         c = c + self.factor(ImportSurvey).load_table(data[SQL_TABLE_IMPORT_SURVEYS])
@@ -201,22 +412,35 @@ class SqlManager:
         return c
 
     def close_connection(self):
+        if self.is_pooled:
+            # the pool closes it when the thread finishes.
+            return
+        if isinstance(self.db, Sqlite3Backend):
+            self.db.close()
+            self.db = None
         if self.db is not None:
+            StatementCache.clear(self.connection_name)
             self.db.close()
             self.db = None
             if QSqlDatabase.contains(self.connection_name):
                 QSqlDatabase.removeDatabase(self.connection_name)
 
-    def __init__(self, connection_name=SQL_CONNECTION_NAME):
+    def __init__(self, connection_name=SQL_CONNECTION_NAME, db_location: str = None):
         self.connection_name = connection_name
+        self.is_pooled = False
         if QSqlDatabase.contains(connection_name) is False:
+            if db_location is None:
+                db_location = Preferences.get('sql_db_location', SQL_DB_LOCATION, str)
             self.db = QSqlDatabase.addDatabase('QSQLITE', connection_name)
-            self.db.setDatabaseName(Preferences.get('sql_db_location', SQL_DB_LOCATION, str))
+            self.db.setDatabaseName(db_location)
         else:
             self.db = QSqlDatabase.database(connection_name)
 
-        if not self.db.open():
-            raise ConnectionError(f"Database Error: {self.db.lastError()}")
+        # open() on an already open connection reconnects, which would drop an in-memory database.
+        if self.db.isOpen() is False:
+            if not self.db.open():
+                raise ConnectionError(f"Database Error: {self.db.lastError()}")
+            ConnectionPool.configure(self.db)
 
     def flush_db(self):
         self.drop_tables()
@@ -314,16 +538,21 @@ class ImportSurvey(QueryMixin, QSqlTableModel):
         return self.db_update(SQL_TABLE_IMPORT_SURVEYS, values, 'survey_id=?', [survey_id])
 
     def flush(self):
-        a = self.db_delete(SQL_TABLE_IMPORT_STATIONS)
-        b = self.db_delete(SQL_TABLE_IMPORT_LINES)
-        c = self.db_delete(SQL_TABLE_IMPORT_SURVEYS)
-        return a + b + c
+        return self.delete_many([row['survey_id'] for row in self.db_fetch(f'SELECT survey_id FROM {SQL_TABLE_IMPORT_SURVEYS}')])
 
     def delete(self, survey_id: int) -> int:
-        a = self.db_delete(SQL_TABLE_IMPORT_STATIONS, 'survey_id=?', [survey_id])
-        b = self.db_delete(SQL_TABLE_IMPORT_LINES, 'survey_id=?', [survey_id])
-        c = self.db_delete(SQL_TABLE_IMPORT_SURVEYS, 'survey_id=?', [survey_id])
-        return a + b + c
+        """
+            Returns the amount of deleted rows, the lines and stations are deleted with it (ON DELETE CASCADE).
+        """
+        return self.delete_many([survey_id])
+
+    def delete_many(self, survey_ids: list) -> int:
+        return self.db_delete_many(SQL_TABLE_IMPORT_SURVEYS, 'survey_id', survey_ids, f"""
+            SELECT (SELECT COUNT(*) FROM {SQL_TABLE_IMPORT_LINES} WHERE survey_id IN ({{ids}}))
+                 + (SELECT COUNT(*) FROM {SQL_TABLE_IMPORT_STATIONS} WHERE line_id IN (
+                        SELECT line_id FROM {SQL_TABLE_IMPORT_LINES} WHERE survey_id IN ({{ids}})
+                   ))
+        """)
 
     def dump_table(self):
         return self.db_fetch(f"SELECT * FROM {SQL_TABLE_IMPORT_SURVEYS} ORDER BY survey_id ASC")
@@ -335,9 +564,9 @@ class ImportSurvey(QueryMixin, QSqlTableModel):
 
     def __init__(self, db):
         QueryMixin.__init__(self, db=db)
-        QSqlTableModel.__init__(self, db=db)
+        QSqlTableModel.__init__(self, db=self.backend.qt_database())
         self.setTable(SQL_TABLE_IMPORT_SURVEYS)
-        self.setEditStrategy(self.OnManualSubmit)
+        self.setEditStrategy(QSqlTableModel.OnManualSubmit)
 
         self.setHeaderData(0, Qt.Horizontal, "Survey id")
         self.setHeaderData(1, Qt.Horizontal, "Survey name")
@@ -384,15 +613,20 @@ class ImportLine(QueryMixin, QSqlTableModel):
         query = f"""
             CREATE TABLE IF NOT EXISTS {SQL_TABLE_IMPORT_LINES} (
                 line_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                survey_id INTEGER,
+                survey_id INTEGER REFERENCES {SQL_TABLE_IMPORT_SURVEYS} (survey_id) ON DELETE CASCADE,
                 line_reference_id INTEGER,
                 line_name TEXT,
                 direction TEXT,
                 line_comment TEXT,
-                device_properties TEXT
+                device_properties TEXT,
+                fingerprint TEXT
             )
         """
         self.db_exec(query)
+        self.db_exec(f'CREATE INDEX IF NOT EXISTS {SQL_TABLE_IMPORT_LINES}_survey_id ON {SQL_TABLE_IMPORT_LINES} (survey_id)')
+        # the tables of a database left by an older version.
+        self.db_add_columns(SQL_TABLE_IMPORT_LINES, {'fingerprint': 'TEXT'})
+        self.db_exec(f'CREATE INDEX IF NOT EXISTS {SQL_TABLE_IMPORT_LINES}_fingerprint ON {SQL_TABLE_IMPORT_LINES} (fingerprint)')
 
     def drop_database_tables(self):
         query = f"""
@@ -419,44 +653,58 @@ class ImportLine(QueryMixin, QSqlTableModel):
             select = 'line_id, line_name'
         return self.db_fetch(f'SELECT {select} FROM {SQL_TABLE_IMPORT_LINES} WHERE survey_id=? ORDER BY line_id ASC', [survey_id])
 
-    def insert(self, survey_id: int, line_reference_id: int, direction: str, device_properties: dict) -> int:
+    def insert(self, survey_id: int, line_reference_id: int, direction: str, device_properties: dict,
+               fingerprint: str = None) -> int:
+        """
+            fingerprint is the hash of the bytes the line was read from (see MnemoDmpReader), to recognize them again.
+        """
         data = {
             'survey_id': survey_id,
             'line_reference_id': line_reference_id,
             'direction': direction,
             'device_properties': json.dumps(device_properties),
             'line_name': f'Line {line_reference_id}',
-            'line_comment': ''
+            'line_comment': '',
+            'fingerprint': fingerprint
         }
         return self.db_insert(SQL_TABLE_IMPORT_LINES, data)
 
+    def has_fingerprint(self, fingerprint: str) -> bool:
+        """
+            Whether a line was imported from the same bytes before.
+        """
+        rows = self.db_fetch(
+            f'SELECT 1 FROM {SQL_TABLE_IMPORT_LINES} WHERE fingerprint=? LIMIT 1', [fingerprint], row_type=self.ROW_TUPLE
+        )
+        return len(rows) > 0
+
     def update(self, values: dict, line_id: int) -> int:
         return self.db_update(SQL_TABLE_IMPORT_LINES, values, 'line_id=?', [line_id])
 
     def delete(self, line_id: int) -> int:
-        a = self.db_delete(SQL_TABLE_IMPORT_STATIONS, 'line_id=?', [line_id])
-        b = self.db_delete(SQL_TABLE_IMPORT_LINES, 'line_id=?', [line_id])
-        return a + b
+        return self.delete_many([line_id])
+
+    def delete_many(self, line_ids: list) -> int:
+        return self.db_delete_many(
+            SQL_TABLE_IMPORT_LINES, 'line_id', line_ids,
+            f'SELECT COUNT(*) FROM {SQL_TABLE_IMPORT_STATIONS} WHERE line_id IN ({{ids}})'
+        )
 
     def flush_empty(self, survey_id):
         q = f"""
-            DELETE FROM {SQL_TABLE_IMPORT_LINES} WHERE line_id IN (
-                SELECT a.line_id
-                    FROM {SQL_TABLE_IMPORT_LINES} AS a
-                         LEFT JOIN {SQL_TABLE_IMPORT_STATIONS} AS b ON a.line_id = b.line_id
-                WHERE a.survey_id = ?
-                  AND station_id IS NULL
-            )
+            DELETE FROM {SQL_TABLE_IMPORT_LINES}
+            WHERE survey_id = ?
+              AND NOT EXISTS (SELECT 1 FROM {SQL_TABLE_IMPORT_STATIONS} AS s WHERE s.line_id = {SQL_TABLE_IMPORT_LINES}.line_id)
         """
         logging.getLogger(__name__).info(f'removing empty lines for survey_id={survey_id}')
         res = self.db_exec(q, [survey_id])
-        return res.numRowsAffected()
+        return res.rowcount
 
     def __init__(self, db):
         QueryMixin.__init__(self, db=db)
-        QSqlTableModel.__init__(self, db=db)
+        QSqlTableModel.__init__(self, db=self.backend.qt_database())
         self.setTable(SQL_TABLE_IMPORT_LINES)
-        self.setEditStrategy(self.OnManualSubmit)
+        self.setEditStrategy(QSqlTableModel.OnManualSubmit)
 
         self.setHeaderData(0, Qt.Horizontal, "Survey id")
         self.setHeaderData(1, Qt.Horizontal, "Line id")
@@ -465,12 +713,14 @@ class ImportLine(QueryMixin, QSqlTableModel):
         self.setHeaderData(4, Qt.Horizontal, "Direction")
         self.setHeaderData(5, Qt.Horizontal, "Comment")
         self.setHeaderData(6, Qt.Horizontal, "Device properties")
+        self.setHeaderData(7, Qt.Horizontal, "Fingerprint")
 
     def set_column_widths(self, view):
         if Preferences.debug() is False:
             view.setColumnHidden(0, True)
             view.setColumnHidden(1, True)
             view.setColumnHidden(6, True)
+            view.setColumnHidden(7, True)
 
         view.setColumnWidth(0, 20)
         view.setColumnWidth(1, 100)
@@ -487,7 +737,7 @@ class ImportLine(QueryMixin, QSqlTableModel):
         view.setItemDelegateForColumn(5, comment)
 
     def flags(self, index: QModelIndex):
-        if index.column() in (0,1, 6):
+        if index.column() in (0,1, 6, 7):
             return Qt.NoItemFlags
 
         return Qt.ItemIsEditable | Qt.ItemIsEnabled
@@ -503,6 +753,10 @@ class ImportLine(QueryMixin, QSqlTableModel):
 
 class ImportStation(QueryMixin, QSqlTableModel):
 
+    NUMERIC_COLUMNS = (
+        'station_id', 'line_id', 'survey_id', 'length_in', 'azimuth_in', 'depth', 'azimuth_out', 'azimuth_out_avg',
+        'length_out', 'longitude', 'latitude'
+    )
 
     def create_database_tables(self):
         # reference_id is the "id" as provider by the Mnemo.
@@ -510,7 +764,7 @@ class ImportStation(QueryMixin, QSqlTableModel):
         query = f"""
                     CREATE TABLE IF NOT EXISTS {SQL_TABLE_IMPORT_STATIONS} (
                         station_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        line_id INTEGER,
+                        line_id INTEGER REFERENCES {SQL_TABLE_IMPORT_LINES} (line_id) ON DELETE CASCADE,
                         survey_id INTEGER,
                         line_reference_id INTEGER,
                         station_reference_id INTEGER,
@@ -524,10 +778,28 @@ class ImportStation(QueryMixin, QSqlTableModel):
                         longitude REAL DEFAULT NULL,
                         latitude REAL DEFAULT NULL,
                         station_comment TEXT,
+                        depth_in REAL,
+                        pitch_in REAL,
+                        pitch_out REAL,
+                        status_byte INTEGER,
+                        byte_start INTEGER,
+                        byte_end INTEGER,
+                        is_generated INTEGER DEFAULT 0,
                         device_properties TEXT
                     )
                 """
         self.db_exec(query)
+        self.db_exec(f'CREATE INDEX IF NOT EXISTS {SQL_TABLE_IMPORT_STATIONS}_line_id ON {SQL_TABLE_IMPORT_STATIONS} (line_id)')
+        # the tables of a database left by an older version.
+        self.db_add_columns(SQL_TABLE_IMPORT_STATIONS, {
+            'depth_in': 'REAL',
+            'pitch_in': 'REAL',
+            'pitch_out': 'REAL',
+            'status_byte': 'INTEGER',
+            'byte_start': 'INTEGER',
+            'byte_end': 'INTEGER',
+            'is_generated': 'INTEGER DEFAULT 0'
+        })
 
     def drop_database_tables(self):
         query = f"""
@@ -555,10 +827,13 @@ class ImportStation(QueryMixin, QSqlTableModel):
                azimuth_out_avg: float,
                depth: float,
                station_properties: dict = {},
-               station_name: str = ''
+               station_name: str = '',
+               is_generated: bool = False
                ) -> int:
+        """
+            station_properties are the values read from the device, see ProjectFile.station_columns().
+        """
         data = {
-            'station_id': None,
             'line_id': line_id,
             'survey_id': survey_id,
             'line_reference_id': line_reference_id,
@@ -569,8 +844,8 @@ class ImportStation(QueryMixin, QSqlTableModel):
             'azimuth_out': azimuth_out,
             'azimuth_out_avg': azimuth_out_avg,
             'depth': depth,
-            'device_properties': json.dumps(station_properties),
-            'station_name': station_name
+            'station_name': station_name,
+            **ProjectFile.station_columns(station_properties, is_generated)
         }
 
         return self.db_insert(SQL_TABLE_IMPORT_STATIONS, data)
@@ -581,6 +856,8 @@ class ImportStation(QueryMixin, QSqlTableModel):
     def delete(self, station_id: int) -> int:
         return self.db_delete(SQL_TABLE_IMPORT_STATIONS, 'station_id=?', [station_id])
 
+    def delete_many(self, station_ids: list) -> int:
+        return self.db_delete_many(SQL_TABLE_IMPORT_STATIONS, 'station_id', station_ids)
 
 
     def get(self, station_id) -> dict:
@@ -589,11 +866,45 @@ class ImportStation(QueryMixin, QSqlTableModel):
     def get_all(self, line_id) -> dict:
         return self.db_fetch(f'SELECT * FROM {SQL_TABLE_IMPORT_STATIONS} WHERE line_id=? ORDER BY station_id ASC', [line_id])
 
+    def iter_survey(self, survey_id: int):
+        """
+            Yields the stations of all lines of a survey in one (ordered) query, with the line_name and direction of
+            their line. A line without stations is yielded once, without a station_id (NULL).
+        """
+        return self.db_iter(f'''
+            SELECT s.*, l.line_id AS line_id, l.line_name, l.direction
+            FROM {SQL_TABLE_IMPORT_LINES} AS l
+            LEFT JOIN {SQL_TABLE_IMPORT_STATIONS} AS s ON s.line_id = l.line_id
+            WHERE l.survey_id=?
+            ORDER BY l.line_id ASC, s.station_id ASC
+        ''', [survey_id])
+
+    def get_all_array(self, line_id):
+        """
+            The numeric columns of the stations of a line as numpy structured array (see SurveyLineItem.solve_points).
+        """
+        columns = ', '.join(self.NUMERIC_COLUMNS)
+        return self.db_fetch_array(f'SELECT {columns} FROM {SQL_TABLE_IMPORT_STATIONS} WHERE line_id=? ORDER BY station_id ASC', [line_id])
+
+    def get_extent(self) -> dict:
+        """
+            Returns the lat/lng bounding box (north, south, east, west) of all stations with a location,
+            or None when no station has been located yet.
+        """
+        row = self.db_fetch(f'''
+            SELECT MAX(latitude) AS north, MIN(latitude) AS south, MAX(longitude) AS east, MIN(longitude) AS west
+            FROM {SQL_TABLE_IMPORT_STATIONS}
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        ''')
+        if len(row) == 0 or row[0]['north'] is None or row[0]['north'] == '':
+            return None
+        return row[0]
+
     def __init__(self, db):
         QueryMixin.__init__(self, db=db)
-        QSqlTableModel.__init__(self, db=db)
+        QSqlTableModel.__init__(self, db=self.backend.qt_database())
         self.setTable(SQL_TABLE_IMPORT_STATIONS)
-        self.setEditStrategy(self.OnManualSubmit)
+        self.setEditStrategy(QSqlTableModel.OnManualSubmit)
 
         self.setHeaderData(0, Qt.Horizontal, "Station id")
         self.setHeaderData(1, Qt.Horizontal, "Line id")
@@ -703,9 +1014,9 @@ class MapLine(QueryMixin, QSqlTableModel):
         return self.db_update(SQL_TABLE_MAP_LINES, values, 'line_id=?', [line_id])
 
     def delete(self, line_id: int) -> int:
-        a = self.db_delete(SQL_TABLE_MAP_STATIONS, 'line_id=?', [line_id])
-        b = self.db_delete(SQL_TABLE_MAP_LINES, 'line_id=?', [line_id])
-        return a + b
+        return self.db_delete_many(
+            SQL_TABLE_MAP_LINES, 'line_id', [line_id], f'SELECT COUNT(*) FROM {SQL_TABLE_MAP_STATIONS} WHERE line_id IN ({{ids}})'
+        )
 
 
 class MapStation(QueryMixin, QSqlTableModel):
@@ -724,7 +1035,7 @@ class MapStation(QueryMixin, QSqlTableModel):
         query = f"""
             CREATE TABLE IF NOT EXISTS {SQL_TABLE_MAP_STATIONS} (
                 station_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                line_id INTEGER,
+                line_id INTEGER REFERENCES {SQL_TABLE_MAP_LINES} (line_id) ON DELETE CASCADE,
                 station_reference_id INTEGER,
                 line_reference_id INTEGER,
                 station_name TEXT,
@@ -739,6 +1050,7 @@ class MapStation(QueryMixin, QSqlTableModel):
             )
         """
         self.db_exec(query)
+        self.db_exec(f'CREATE INDEX IF NOT EXISTS {SQL_TABLE_MAP_STATIONS}_line_id ON {SQL_TABLE_MAP_STATIONS} (line_id)')
 
     def drop_database_tables(self):
         query = f"""
@@ -769,7 +1081,6 @@ class MapStation(QueryMixin, QSqlTableModel):
                station_name: str = ''
                ) -> int:
         data = {
-            'station_id': None,
             'line_id': line_id,
             'survey_id': survey_id,
             'line_reference_id': line_reference_id,
@@ -826,7 +1137,7 @@ class Contact(QueryMixin, QSqlTableModel):
 
     def __init__(self, db):
         QueryMixin.__init__(self, db=db)
-        QSqlTableModel.__init__(self, db=db)
+        QSqlTableModel.__init__(self, db=self.backend.qt_database())
         self.setTable(SQL_TABLE_CONTACTS)
 
 
@@ -859,7 +1170,7 @@ class Explorer(QueryMixin, QSqlTableModel):
 
     def __init__(self, db):
         QueryMixin.__init__(self, db=db)
-        QSqlTableModel.__init__(self, db=db)
+        QSqlTableModel.__init__(self, db=self.backend.qt_database())
         self.setTable(SQL_TABLE_EXPLORERS)
 
 
@@ -892,6 +1203,6 @@ class Surveyor(QueryMixin, QSqlRelationalTableModel):
 
     def __init__(self, db):
         QueryMixin.__init__(self, db=db)
-        QSqlRelationalTableModel.__init__(self, db=db)
+        QSqlRelationalTableModel.__init__(self, db=self.backend.qt_database())
         self.setRelation(1, QSqlRelation(SQL_TABLE_IMPORT_SURVEYS, 'survey_id', 'name'))
         self.setRelation(2, QSqlRelation(SQL_TABLE_CONTACTS, 'contact_id', 'name'))
@@ -0,0 +1,103 @@
+import pytest
+
+from PySide6.QtCore import QPointF, QSize, QRect, QBuffer, QByteArray
+from PySide6.QtGui import QPixmap, QColor
+
+from Gui.Scene.Providers.Bundle import TileBundle, TileBundleProvider
+from Gui.Scene.Providers.Mixins import TileGridMixin
+
+
+class TestTileBundle:
+
+    @pytest.mark.parametrize("zoom,x,y", [
+        (0, 0, 0),
+        (14, 4123, 7201),
+        (19, 131000, 230000),
+    ])
+    def test_put_get_tile(self, qt_application, tmp_path, zoom: int, x: int, y: int):
+        file = tmp_path / 'test.mbtiles'
+        data = bytes(range(256)) * 4
+
+        bundle = TileBundle(file, read_only=False, connection_name='test_bundle_write')
+        bundle.set_metadata({'name': 'test', 'minzoom': zoom})
+        bundle.begin()
+        bundle.put_tile(zoom, x, y, data)
+        bundle.commit()
+        bundle.close()
+
+        bundle = TileBundle(file, read_only=True, connection_name='test_bundle_read')
+        assert bundle.get_tile(zoom, x, y) == data
+        assert bundle.get_tile(zoom, x + 1, y) is None
+        assert bundle.tile_count() == 1
+        assert bundle.get_metadata() == {'name': 'test', 'minzoom': str(zoom)}
+        bundle.close()
+
+    @pytest.mark.parametrize("zoom,y,expected", [
+        (0, 0, 0),
+        (1, 0, 1),
+        (14, 7201, 9182),
+    ])
+    def test_tms_row(self, zoom: int, y: int, expected: int):
+        assert TileBundle.tms_row(zoom, y) == expected
+
+
+class TestTileBundleProvider:
+
+    def test_get_grid_tiles(self, qt_application, tmp_path):
+        file = tmp_path / 'grid.mbtiles'
+        bundle = TileBundle(file, read_only=False, connection_name='test_bundle_grid')
+        pixmap = QPixmap(256, 256)
+        pixmap.fill(QColor(10, 20, 30))
+        data = QByteArray()
+        buffer = QBuffer(data)
+        pixmap.save(buffer, 'PNG')
+        bundle.put_tile(1, 0, 0, bytes(data))
+        bundle.close()
+
+        provider = TileBundleProvider(None, str(file))
+        # lat/lng 0/0 is the corner of the four tiles at zoom 1, and the middle of the center tile of the grid.
+        tiles = dict((rect.getRect(), pixmap) for rect, pixmap in provider.get_grid_tiles(QPointF(0, 0), QSize(3, 3), 1))
+        provider.close()
+
+        assert sorted(tiles.keys()) == [(128, 128, 256, 256), (128, 384, 256, 256), (384, 128, 256, 256), (384, 384, 256, 256)]
+        assert tiles[(128, 128, 256, 256)].toImage().pixelColor(0, 0) == QColor(10, 20, 30)
+        # not in the bundle.
+        assert tiles[(384, 384, 256, 256)].isNull()
+
+    def test_grid_tiles_are_cut(self, qt_application, tmp_path):
+        file = tmp_path / 'empty.mbtiles'
+        TileBundle(file, read_only=False, connection_name='test_bundle_empty').close()
+
+        provider = TileBundleProvider(None, str(file))
+        tiles = provider.get_grid_tiles(QPointF(20.5, -87.3), QSize(3, 3), 14)
+        provider.close()
+
+        grid = QRect(0, 0, 3 * 256, 3 * 256)
+        assert all(grid.contains(rect) for rect, pixmap in tiles)
+        # the tiles cover the grid without overlapping.
+        assert sum(rect.width() * rect.height() for rect, pixmap in tiles) == grid.width() * grid.height()
+
+
+class TestTileGridMixin:
+
+    @pytest.mark.parametrize("north_west,south_east,zoom_min,zoom_max,expected", [
+        (
+            QPointF(20.5, -87.3),
+            QPointF(20.5, -87.3),
+            10,
+            12,
+            3
+        ), (
+            QPointF(20.50, -87.30),
+            QPointF(20.48, -87.25),
+            16,
+            16,
+            50
+        ),
+    ])
+    def test_get_tiles_for_extent(self, north_west: QPointF, south_east: QPointF, zoom_min: int, zoom_max: int, expected: int):
+        tiles = TileGridMixin().get_tiles_for_extent(north_west, south_east, zoom_min, zoom_max)
+        assert len(tiles) == expected
+        assert len(set(tiles)) == len(tiles)
+        assert min(t[0] for t in tiles) == zoom_min
+        assert max(t[0] for t in tiles) == zoom_max
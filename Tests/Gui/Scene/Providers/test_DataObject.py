@@ -0,0 +1,32 @@
+import threading
+
+from PySide6.QtCore import QPointF, QPoint, QSize, QThreadPool
+
+from Gui.Scene.Providers import DataObject
+from Gui.Scene.Providers.DataObject import GridTileObject, GridTileWorkerObject, TileRequests
+
+
+class TestTileRequests:
+
+    def test_pending(self, qt_application, monkeypatch):
+        release = threading.Event()
+
+        def cached_image(url, cache_file):
+            release.wait(5)
+            raise ConnectionError('offline')
+        monkeypatch.setattr(DataObject.Request, 'cached_image', cached_image)
+
+        thread_pool = QThreadPool()
+        thread_pool.setMaxThreadCount(1)
+        requests = TileRequests(thread_pool)
+        tile = GridTileObject(QPointF(0, 0), QPoint(1, 1), QSize(256, 256), 14)
+        workers = [GridTileWorkerObject(tile) for index in range(0, 3)]
+        for worker in workers:
+            requests.start(worker)
+        # the requests waiting for a thread are counted as well.
+        assert requests.pending() == 3
+
+        release.set()
+        thread_pool.waitForDone()
+        # the failed requests are done too.
+        assert requests.pending() == 0
@@ -0,0 +1,78 @@
+import numpy
+import pytest
+
+from PySide6.QtCore import QPointF
+
+from Config.Constants import SCENE_LOD_STATION_ZOOM, SCENE_LOD_LABEL_ZOOM
+from Gui.Scene.Items import LevelOfDetail, SurveyLineItem
+
+
+class TestLevelOfDetail:
+
+    @pytest.mark.parametrize("zoom_level,show_stations,show_labels", [
+        (10, False, False),
+        (SCENE_LOD_STATION_ZOOM, True, False),
+        (SCENE_LOD_LABEL_ZOOM, True, True),
+    ])
+    def test_thresholds(self, zoom_level: float, show_stations: bool, show_labels: bool):
+        lod = LevelOfDetail(zoom_level)
+        assert lod.show_stations is show_stations
+        assert lod.show_labels is show_labels
+
+    def test_tolerance_scales_with_zoom(self):
+        assert LevelOfDetail(10).tolerance == LevelOfDetail(11).tolerance * 2
+        assert LevelOfDetail(SCENE_LOD_STATION_ZOOM).tolerance == 0
+
+
+class TestSurveyLineItem:
+
+    @pytest.fixture
+    def item(self, qt_application) -> SurveyLineItem:
+        stations = [
+            {'station_name': str(i), 'station_reference_id': i, 'length_out': 10, 'azimuth_out_avg': 90 + (i % 2), 'depth': 5}
+            for i in range(0, 50)
+        ]
+        return SurveyLineItem({'line_id': 1, 'direction': 'In'}, stations, QPointF(100, 100))
+
+    def test_solve_points(self, item: SurveyLineItem):
+        assert item.points.shape == (51, 2)
+        assert tuple(item.points[0]) == (100, 100)
+        # heading east, so y stays (almost) the same and x grows.
+        assert item.points[-1][0] == pytest.approx(100 + 500 * item.coordinates.xy_per_m, rel=1e-3)
+        assert abs(item.points[-1][1] - 100) < 50
+
+    def test_solve_points_array(self, item: SurveyLineItem):
+        stations = numpy.array(
+            [(s['length_out'], s['azimuth_out_avg']) for s in item.stations] + [(numpy.nan, numpy.nan)],
+            dtype=[('length_out', numpy.float64), ('azimuth_out_avg', numpy.float64)]
+        )
+        points = item.solve_points(stations, QPointF(100, 100))
+        # a station without values (NULL) adds no length.
+        assert numpy.allclose(points[:-1], item.points)
+        assert numpy.allclose(points[-1], item.points[-1])
+
+    def test_level_of_detail(self, item: SurveyLineItem):
+        item.set_level_of_detail(LevelOfDetail(10))
+        assert item.childItems() == []
+        assert len(item.get_polygon(LevelOfDetail(10).tolerance)) == 2
+        assert len(item.get_polygon(0)) == 51
+
+        item.set_level_of_detail(LevelOfDetail(SCENE_LOD_LABEL_ZOOM))
+        # all stations are drawn by the item itself.
+        assert item.childItems() == []
+        assert item.boundingRect().contains(QPointF(*item.points[-1]))
+
+    def test_station_polygon(self, item: SurveyLineItem):
+        polygon = item.get_station_polygon()
+        assert len(polygon) == 50
+        assert (polygon[49].x(), polygon[49].y()) == tuple(item.points[49])
+        # built once, painted from the cache after that.
+        assert item.get_station_polygon() is polygon
+
+    @pytest.mark.parametrize("index", [0, 10, 49])
+    def test_station_at(self, item: SurveyLineItem, index: int):
+        item.set_level_of_detail(LevelOfDetail(SCENE_LOD_STATION_ZOOM))
+        point = QPointF(*item.points[index])
+        assert item.station_at(point) == index
+        assert item.station_at(point + QPointF(1, 1), radius=2) == index
+        assert item.station_at(point + QPointF(0, 40), radius=2) is None
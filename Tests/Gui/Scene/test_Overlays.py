@@ -0,0 +1,29 @@
+import pytest
+
+from PySide6.QtCore import QRectF
+
+from Gui.Scene.Overlays import GridOverlay
+
+
+class TestGridOverlay:
+
+    @pytest.mark.parametrize("rect,grid_size,expected_vertical,expected_horizontal", [
+        (QRectF(0, 0, 100, 50), 10, 10, 5),
+        (QRectF(5, 5, 100, 50), 10, 10, 5),
+        (QRectF(-25, -25, 50, 50), 20, 3, 3),
+        (QRectF(0, 0, 5, 5), 10, 1, 1),
+    ])
+    def test_grid_lines(self, rect: QRectF, grid_size: int, expected_vertical: int, expected_horizontal: int):
+        lines = GridOverlay.grid_lines(rect, grid_size)
+        vertical = [line for line in lines if line.x1() == line.x2()]
+        horizontal = [line for line in lines if line.y1() == line.y2()]
+
+        assert len(vertical) == expected_vertical
+        assert len(horizontal) == expected_horizontal
+        # lines are aligned on the scene origin, not on the rect.
+        for line in vertical:
+            assert line.x1() % grid_size == 0
+            assert rect.left() <= line.x1() < rect.right()
+        for line in horizontal:
+            assert line.y1() % grid_size == 0
+            assert rect.top() <= line.y1() < rect.bottom()
@@ -0,0 +1,16 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).parent.parent.parent
+
+
+@pytest.mark.parametrize('module', ['requests', 'pyIGRF', 'serial', 'numpy'])
+def test_heavy_imports_are_deferred(module):
+    # a fresh interpreter, the test-session already imported everything.
+    code = f'import sys, Gui.Actions; sys.exit(1 if {module!r} in sys.modules else 0)'
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=dict(os.environ, QT_QPA_PLATFORM='offscreen'), capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr or f'{module} is imported by the menu actions'
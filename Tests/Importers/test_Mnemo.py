@@ -0,0 +1,308 @@
+import os
+import pathlib
+import pty
+import threading
+import time
+import tty
+
+import pytest
+import serial
+
+from Config.Constants import MNEMO_BINARY_DUMP_MAGIC
+from Importers import Mnemo
+from Importers.Mnemo import MnemoSerialReader, MnemoDmpReader, MnemoImporter, MnemoDumpWriter, MnemoBatchImporter, \
+    DecodedSurvey, parse_dump_file, decode_dump_file
+from Models.TableModels import SqlManager, ImportSurvey, ImportLine, ImportStation
+
+
+@pytest.fixture
+def fake_mnemo():
+    """
+        A pty pair, the test writes to the master side (acting as the Mnemo),
+        the reader reads through pyserial from the slave side.
+    """
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    ser = serial.Serial(os.ttyname(slave), 9600, timeout=1)
+    yield master, ser
+    ser.close()
+    os.close(master)
+    os.close(slave)
+
+
+@pytest.fixture
+def sqlite3_manager(tmp_path) -> SqlManager:
+    manager = SqlManager.sqlite3(str(tmp_path / 'test.sqlite'), track_changes=False)
+    manager.create_tables()
+    yield manager
+    manager.close_connection()
+
+
+def write_in_chunks(master: int, data: bytes, chunk_size: int, delay: float):
+    for index in range(0, len(data), chunk_size):
+        os.write(master, data[index:index + chunk_size])
+        time.sleep(delay)
+
+
+class TestMnemoSerialReader:
+
+    @pytest.mark.parametrize("data,chunk_size", [
+        (bytes([2, 21, 3, 7, 13, 4, 66, 65, 83, 0]), 1),
+        (bytes(range(0, 256)) * 8, 64),
+    ], ids=['line_header', 'all_byte_values'])
+    def test_read(self, fake_mnemo, data: bytes, chunk_size: int):
+        master, ser = fake_mnemo
+        progress = []
+        writer = threading.Thread(target=write_in_chunks, args=(master, data, chunk_size, 0.01))
+        writer.start()
+
+        reader = MnemoSerialReader(ser, inactivity_timeout=0.5, on_progress=progress.append, progress_interval=0.1)
+        result = reader.read()
+        writer.join()
+
+        # signed int8 values, as written to the dump-files
+        assert result == [b - 256 if b > 127 else b for b in data]
+        assert progress[-1] == len(data)
+        # progress is throttled, not emitted per byte or per chunk
+        assert len(progress) < len(data) / chunk_size
+
+    def test_no_data(self, fake_mnemo):
+        master, ser = fake_mnemo
+        start = time.monotonic()
+        assert MnemoSerialReader(ser, inactivity_timeout=0.3).read() == []
+        assert 0.3 <= time.monotonic() - start < 1.5
+
+    def test_cancel(self, fake_mnemo):
+        master, ser = fake_mnemo
+        cancel = threading.Event()
+        reader = MnemoSerialReader(ser, inactivity_timeout=10, cancel_event=cancel)
+        threading.Timer(0.2, cancel.set).start()
+
+        start = time.monotonic()
+        with pytest.raises(Exception, match='IMPORT_CANCELLED'):
+            reader.read()
+        assert time.monotonic() - start < 1
+
+
+DUMP_FILES = pathlib.Path(__file__).parent.parent.parent / 'data_files'
+
+
+def read_dump(file_name: str) -> list:
+    importer = MnemoImporter()
+    importer.read_dump_file(str(DUMP_FILES / file_name))
+    return importer.import_list
+
+
+def survey_rows(sql_manager, survey_id: int) -> list:
+    rows = []
+    for line in sql_manager.factor(ImportLine).get_all(survey_id, True):
+        stations = sql_manager.factor(ImportStation).get_all(line['line_id'])
+        rows.append((
+            line['line_reference_id'],
+            line['direction'],
+            [(s['station_reference_id'], s['length_in'], s['length_out'], s['azimuth_out_avg'], s['depth']) for s in stations]
+        ))
+    return rows
+
+
+class TestMnemoDmpReader:
+
+    def test_feed_equals_read(self, sql_manager):
+        byte_list = read_dump('tux.dmp')
+        expected = survey_rows(sql_manager, MnemoDmpReader(byte_list, sql_manager).read())
+
+        added = []
+        reader = MnemoDmpReader(
+            sql_manager=sql_manager, on_line=lambda survey_id, line_id: added.append(line_id), skip_duplicates=False
+        )
+        for index in range(0, len(byte_list), 7):
+            reader.feed(byte_list[index:index + 7])
+        # all but the last line are complete before the device is done sending.
+        assert 0 < len(added) < len(expected)
+
+        survey_id = reader.close()
+        assert survey_rows(sql_manager, survey_id) == expected
+        assert added == [line['line_id'] for line in sql_manager.factor(ImportLine).get_all(survey_id)]
+
+    def test_station_columns(self, sql_manager):
+        survey_id = MnemoDmpReader(read_dump('tux.dmp'), sql_manager).read()
+        lines = sql_manager.factor(ImportLine).get_all(survey_id)
+        stations = max([sql_manager.factor(ImportStation).get_all(line['line_id']) for line in lines], key=len)
+        assert stations[0]['pitch_in'] is not None
+        assert stations[0]['byte_end'] - stations[0]['byte_start'] == MnemoDmpReader.LINE_LENGTH_STATION
+        assert stations[0]['device_properties'] in (None, '')
+        assert [station['is_generated'] for station in stations[-2:]] == [0, 1]
+
+
+class TestDumpFormats:
+
+    @pytest.mark.parametrize("binary", [False, True])
+    def test_write_and_parse(self, tmp_path, binary: bool):
+        values = read_dump('tux.dmp')
+        path = tmp_path / 'dump.dmp'
+        MnemoDumpWriter(values).write_file(path, binary=binary)
+
+        parsed = parse_dump_file(path)
+        assert isinstance(parsed, memoryview) is binary
+        assert list(parsed) == values
+
+    def test_binary_is_compact(self, tmp_path):
+        values = read_dump('tux.dmp')
+        MnemoDumpWriter(values).write_file(tmp_path / 'text.dmp')
+        MnemoDumpWriter(values).write_file(tmp_path / 'binary.dmp', binary=True)
+        assert (tmp_path / 'binary.dmp').stat().st_size == len(values) + len(MNEMO_BINARY_DUMP_MAGIC)
+        assert (tmp_path / 'binary.dmp').stat().st_size < (tmp_path / 'text.dmp').stat().st_size
+
+    @pytest.mark.parametrize("binary", [False, True])
+    def test_export_survey(self, sql_manager, tmp_path, monkeypatch, binary: bool):
+        survey_id = MnemoDmpReader(read_dump('tux.dmp'), sql_manager).read()
+        writer = MnemoDumpWriter(sql_manager=sql_manager)
+        writer._ariane_dmp_dump(survey_id)
+        expected = writer.import_list
+
+        # the survey is streamed over more than one chunk.
+        monkeypatch.setattr(Mnemo, 'MNEMO_EXPORT_CHUNK_SIZE', 100)
+        MnemoDumpWriter(sql_manager=sql_manager).save_survey_to_dmp(survey_id, tmp_path / 'survey.dmp', binary)
+        assert list(parse_dump_file(tmp_path / 'survey.dmp')) == expected
+
+        # one query returns every line, even those without stations.
+        lines = sql_manager.factor(ImportLine).get_all(survey_id)
+        stations = [s for line in lines for s in sql_manager.factor(ImportStation).get_all(line['line_id'])]
+        generated = len([station for station in stations if station['is_generated'] == 1])
+        assert len(expected) == len(lines) * MnemoDumpWriter.LINE_LENGTH_LINE + \
+            (len(stations) + 1) * MnemoDumpWriter.LINE_LENGTH_STATION
+        assert generated > 0
+
+    def test_decode_memoryview(self, sql_manager, tmp_path):
+        values = read_dump('tux.dmp')
+        MnemoDumpWriter(values).write_file(tmp_path / 'binary.dmp', binary=True)
+
+        from_list = MnemoDmpReader(values, sql_manager)
+        from_view = MnemoDmpReader(parse_dump_file(tmp_path / 'binary.dmp'), sql_manager)
+        assert from_view.parse_line_part() == from_list.parse_line_part()
+        for station in range(0, 5):
+            assert from_view.parse_station_part() == from_list.parse_station_part()
+
+
+class TestMnemoImporter:
+
+    def test_cancel_device_read(self, fake_mnemo, sqlite3_manager, monkeypatch):
+        """
+            A read cancelled while the dump streams in removes the survey it was storing.
+        """
+        master, ser = fake_mnemo
+        values = read_dump('tux.dmp')
+        importer = MnemoImporter(MnemoImporter.ACTION_READ_DEVICE, device=ser.port, inactivity_timeout=10)
+        monkeypatch.setattr(importer, 'set_sql_manager', lambda: setattr(importer, '_sql_manager', sqlite3_manager))
+        # the connection is checked once the importer is done.
+        monkeypatch.setattr(sqlite3_manager, 'close_connection', lambda: None)
+        added = []
+        reloaded = []
+        errors = []
+        importer.s_line_added.connect(lambda survey_id, line_id: added.append(line_id))
+        importer.s_reload_treeview.connect(reloaded.append)
+        importer.s_error.connect(lambda key, error: errors.append(key))
+
+        half = bytes(value & 0xff for value in values[:len(values) // 2])
+        # the device is sending once the importer has asked for the dump.
+        writer = threading.Timer(0.3, write_in_chunks, args=(master, half, 256, 0.001))
+        writer.start()
+        threading.Timer(1.5, importer.cancel).start()
+        importer.run()
+        writer.join()
+
+        assert len(added) > 0
+        assert errors == []
+        assert len(reloaded) == 1
+        for table in ('import_surveys', 'import_lines', 'import_stations'):
+            assert sqlite3_manager.factor(ImportSurvey).db_fetch(f'SELECT COUNT(*) AS c FROM {table}')[0]['c'] == 0
+
+
+class TestMnemoBatchImporter:
+
+    def test_decode_without_database(self):
+        survey = decode_dump_file(str(DUMP_FILES / 'tux.dmp'), 'Test')
+        assert survey.factor(ImportSurvey).rows[0]['device_name'] == 'Test'
+        assert len(survey.factor(ImportLine).rows) > 0
+        assert all(station['line_id'] <= len(survey.factor(ImportLine).rows) for station in survey.factor(ImportStation).rows)
+
+    def test_run(self, sql_manager, tmp_path):
+        # the first lines of a dump only, every stored station costs time.
+        values = read_dump('tux.dmp')[:120]
+        MnemoDumpWriter(values).write_file(tmp_path / 'a.dmp')
+        MnemoDumpWriter(values).write_file(tmp_path / 'b.dmp', binary=True)
+        (tmp_path / 'empty.dmp').write_bytes(MNEMO_BINARY_DUMP_MAGIC)
+
+        importer = MnemoBatchImporter(
+            tmp_path, max_workers=2, db_location=sql_manager.db.databaseName(), skip_duplicates=False
+        )
+        survey_ids = []
+        errors = []
+        importer.s_reload_treeview.connect(survey_ids.append)
+        importer.s_error.connect(lambda key, error: errors.append((key, str(error))))
+        importer.run()
+
+        assert len(survey_ids) == 2
+        assert errors == [('BATCH_IMPORT_ERRORS', 'empty.dmp: NO_DATA_FOUND')]
+        assert survey_rows(sql_manager, survey_ids[0]) == survey_rows(sql_manager, survey_ids[1])
+        assert len(survey_rows(sql_manager, survey_ids[0])) > 0
+
+
+class TestDuplicates:
+
+    def test_same_dump(self, sqlite3_manager, tmp_path):
+        values = read_dump('tux.dmp')
+        first = MnemoDmpReader(values, sqlite3_manager, skip_duplicates=True)
+        first.read()
+        # the binary backup of the same dump has the same lines.
+        MnemoDumpWriter(values).write_file(tmp_path / 'binary.dmp', binary=True)
+        second = MnemoDmpReader(parse_dump_file(tmp_path / 'binary.dmp'), sqlite3_manager, skip_duplicates=True)
+
+        assert second.read() is None
+        assert second.skipped_lines > 0
+        assert second.skipped_lines + second.line_count == first.line_count
+        assert len(sqlite3_manager.factor(ImportSurvey).db_fetch('SELECT survey_id FROM import_surveys')) == 1
+
+    def test_overlap(self, sqlite3_manager):
+        values = read_dump('tux.dmp')
+        expected = DecodedSurvey()
+        MnemoDmpReader(values, expected, device_name='Test', skip_duplicates=False).read()
+        lines = expected.factor(ImportLine).rows
+
+        # a download that ended within a line, the next one starts over from the first line.
+        MnemoDmpReader(values[:len(values) // 2], sqlite3_manager, skip_duplicates=True).read()
+        reader = MnemoDmpReader(values, sqlite3_manager, skip_duplicates=True)
+        survey_id = reader.read()
+        assert 0 < reader.skipped_lines < len(lines)
+        # the line references are those of the device, also after the skipped lines.
+        imported = sqlite3_manager.factor(ImportLine).get_all(survey_id, True)
+        assert [(line['line_reference_id'], line['fingerprint']) for line in imported] == \
+            [(line['line_reference_id'], line['fingerprint']) for line in lines[reader.skipped_lines:]]
+
+    def test_feed_fingerprints(self):
+        """
+            Fed a byte at a time, the scan for the end of a line goes on where the previous feed left it.
+        """
+        values = read_dump('tux.dmp')
+        expected = DecodedSurvey()
+        MnemoDmpReader(values, expected, device_name='Test', skip_duplicates=False).read()
+
+        survey = DecodedSurvey()
+        reader = MnemoDmpReader(sql_manager=survey, device_name='Test', skip_duplicates=False)
+        for index in range(0, len(values)):
+            reader.feed(values[index:index + 1])
+            if reader._span_scan is not None:
+                # it never starts over in front of the line it is scanning.
+                assert reader._span_scan[2] + reader.LINE_LENGTH_STATION > len(reader._bytes)
+        reader.close()
+        assert [line['fingerprint'] for line in survey.factor(ImportLine).rows] == \
+            [line['fingerprint'] for line in expected.factor(ImportLine).rows]
+
+    def test_decoded_survey(self, sqlite3_manager):
+        survey = decode_dump_file(str(DUMP_FILES / 'tux.dmp'))
+        assert all(line['fingerprint'] is not None for line in survey.factor(ImportLine).rows[:-1])
+        survey_id = survey.store(sqlite3_manager, skip_duplicates=True)
+        assert survey_id is not None
+        assert survey.store(sqlite3_manager, skip_duplicates=True) is None
+        assert survey.store(sqlite3_manager) != survey_id
@@ -0,0 +1,35 @@
+import pathlib
+import time
+
+import pytest
+
+from Config.Constants import MNEMO_DEVICE_ENV
+from Importers.Mnemo import MnemoImporter, parse_dump_file
+from Importers.MnemoEmulator import MnemoEmulator
+
+DUMP_FILE = pathlib.Path(__file__).parent.parent.parent / 'data_files' / 'tux.dmp'
+
+
+class TestMnemoEmulator:
+
+    @pytest.mark.parametrize("jitter", [0, 0.005])
+    def test_read_from_device(self, jitter: float):
+        with MnemoEmulator(DUMP_FILE, baudrate=115200, jitter=jitter) as emulator:
+            importer = MnemoImporter(device=emulator.device, baudrate=115200, inactivity_timeout=0.3)
+            importer.read_from_device()
+
+        assert importer.import_list == parse_dump_file(DUMP_FILE)
+
+    def test_baudrate(self):
+        with MnemoEmulator(DUMP_FILE, baudrate=19200) as emulator:
+            importer = MnemoImporter(device=emulator.device, baudrate=19200, inactivity_timeout=0.3)
+            start = time.monotonic()
+            importer.read_from_device()
+            duration = time.monotonic() - start - 0.3
+
+        # 10 bits per byte, the handshake takes another 100ms.
+        assert duration >= len(importer.import_list) * 10 / 19200
+
+    def test_device_from_environment(self, monkeypatch):
+        monkeypatch.setenv(MNEMO_DEVICE_ENV, '/dev/pts/emulated')
+        assert MnemoImporter().get_device_location() == '/dev/pts/emulated'
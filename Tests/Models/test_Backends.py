@@ -0,0 +1,68 @@
+import pytest
+
+from Models.Backends import Sqlite3Backend
+from Models.TableModels import SqlManager, ImportSurvey, ImportStation
+
+
+@pytest.fixture
+def sqlite3_manager(tmp_path):
+    manager = SqlManager.sqlite3(str(tmp_path / 'test.sqlite'), track_changes=False)
+    manager.create_tables()
+    yield manager
+    manager.close_connection()
+
+
+def insert_stations(stations: ImportStation, count: int) -> int:
+    # the survey and the line the stations belong to (see the foreign keys).
+    stations.db_insert('import_surveys', {'survey_id': 1, 'device_name': 'device'})
+    stations.db_insert('import_lines', {'line_id': 1, 'survey_id': 1})
+    return stations.db_insert_bulk('import_stations', [{
+        'survey_id': 1, 'line_id': 1, 'station_reference_id': index, 'length_out': index, 'station_name': f'Station {index}'
+    } for index in range(0, count)])
+
+
+class TestSqlite3Backend:
+
+    def test_crud(self, sqlite3_manager):
+        surveys = sqlite3_manager.factor(ImportSurvey)
+        assert isinstance(surveys.backend, Sqlite3Backend)
+
+        survey_id = surveys.insert(device_name='device')
+        assert surveys.get(survey_id)['device_name'] == 'device'
+        assert surveys.update({'survey_name': 'survey'}, survey_id) == 1
+        assert surveys.get(survey_id)['survey_name'] == 'survey'
+        assert surveys.db_delete('import_surveys', 'survey_id=?', [survey_id]) == 1
+        assert surveys.get(survey_id) is None
+
+    def test_bulk_insert(self, sqlite3_manager):
+        stations = sqlite3_manager.factor(ImportStation)
+        assert insert_stations(stations, 100) == 100
+        assert stations.db_fetch('SELECT COUNT(*) AS c FROM import_stations') == [{'c': 100}]
+        assert stations.db_fetch_array('SELECT length_out FROM import_stations')['length_out'].sum() == sum(range(0, 100))
+
+    def test_transaction(self, sqlite3_manager):
+        stations = sqlite3_manager.factor(ImportStation)
+        backend = sqlite3_manager.db
+        assert backend.transaction() is True
+        # the bulk insert joins the running transaction.
+        insert_stations(stations, 10)
+        assert backend.rollback() is True
+        assert stations.db_fetch('SELECT * FROM import_stations') == []
+
+    def test_errors(self, sqlite3_manager):
+        surveys = sqlite3_manager.factor(ImportSurvey)
+        assert surveys.db_exec('SELECT * FROM no_table').error != ''
+        with pytest.raises(SyntaxError):
+            surveys.db_insert('no_table', {'name': 'value'})
+
+    def test_shared_file(self, sql_manager):
+        """
+            The views (QtSql) read what the sqlite3 backend wrote in the same file.
+        """
+        db_location = sql_manager.db.databaseName()
+        writer = SqlManager.sqlite3(db_location, track_changes=False)
+        insert_stations(writer.factor(ImportStation), 3)
+        writer.close_connection()
+
+        rows = sql_manager.factor(ImportStation).db_fetch('SELECT station_name FROM import_stations ORDER BY station_id')
+        assert [row['station_name'] for row in rows] == ['Station 0', 'Station 1', 'Station 2']
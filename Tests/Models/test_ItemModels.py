@@ -0,0 +1,49 @@
+import pytest
+from PySide6.QtGui import QStandardItem, QStandardItemModel
+
+from Models.ItemModels import ItemMixin
+
+
+class ParentItem(QStandardItem, ItemMixin):
+    pass
+
+
+class ChildItem(QStandardItem):
+
+    def __init__(self, row: dict):
+        super().__init__(row['name'])
+        self._item_data = row
+
+
+class TestSyncChildren:
+
+    @pytest.fixture
+    def parent(self, qt_application) -> ParentItem:
+        parent = ParentItem('parent')
+        # the items need a model to be moved around in.
+        self.model = QStandardItemModel()
+        self.model.appendRow(parent)
+        return parent
+
+    @staticmethod
+    def sync(parent: ParentItem, children: dict, rows: list, touched: list = None) -> tuple:
+        return parent.sync_children(children, rows, 'id', 'name', ChildItem, touched)
+
+    def test_sync(self, parent: ParentItem):
+        children = {}
+        rows = [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}, {'id': 3, 'name': 'c'}]
+        assert self.sync(parent, children, rows) == (3, 0, 0)
+        kept = children['id_1']
+
+        touched = []
+        # 1 is untouched, 2 is removed, 3 is renamed and moved in front of the added 4.
+        rows = [{'id': 1, 'name': 'a'}, {'id': 3, 'name': 'd'}, {'id': 4, 'name': 'e'}]
+        assert self.sync(parent, children, rows, touched) == (1, 1, 1)
+        assert [parent.child(row).text() for row in range(0, parent.rowCount())] == ['a', 'd', 'e']
+        assert sorted(children.keys()) == ['id_1', 'id_3', 'id_4']
+        assert children['id_1'] is kept
+        assert touched == [children['id_3']]
+
+        touched = []
+        assert self.sync(parent, children, rows, touched) == (0, 0, 0)
+        assert touched == []
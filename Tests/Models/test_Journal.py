@@ -0,0 +1,125 @@
+import pytest
+
+from Models.Journal import Journal
+from Models.TableModels import SqlManager, ImportSurvey, ImportLine, ImportStation
+
+
+@pytest.fixture
+def sql_manager(tmp_path) -> SqlManager:
+    # the journal works on any backend, the sqlite3 one needs no application (QtSql, see test_SurveyStore).
+    manager = SqlManager.sqlite3(str(tmp_path / 'test.sqlite'), track_changes=False)
+    manager.create_tables()
+    yield manager
+    manager.close_connection()
+
+
+@pytest.fixture
+def journal(sql_manager) -> Journal:
+    return Journal(sql_manager, coalesce_interval=60)
+
+
+def add_survey(sql_manager, stations: int = 3) -> int:
+    survey_id = sql_manager.factor(ImportSurvey).insert('device')
+    line_id = sql_manager.factor(ImportLine).insert(survey_id, 1, 'In', {})
+    sql_manager.factor(ImportStation).db_insert_bulk('import_stations', [{
+        'survey_id': survey_id, 'line_id': line_id, 'station_reference_id': index, 'station_name': f'Station {index}',
+        'length_out': 1.0 / (index + 3)
+    } for index in range(0, stations)])
+    return survey_id
+
+
+def table_rows(sql_manager) -> list:
+    model = sql_manager.factor(ImportStation)
+    return [model.db_fetch(f'SELECT * FROM {table} ORDER BY 1') for table in ('import_surveys', 'import_lines', 'import_stations')]
+
+
+class TestJournal:
+
+    def test_undo_redo(self, sql_manager, journal: Journal):
+        stations = sql_manager.factor(ImportStation)
+        with journal.action('Import'):
+            survey_id = add_survey(sql_manager)
+        imported = table_rows(sql_manager)
+        station_id = stations.get_all(1)[0]['station_id']
+        with journal.action('Rename station'):
+            stations.update({'station_name': 'renamed', 'length_out': None}, station_id)
+        assert journal.undo_label() == 'Rename station'
+
+        assert journal.undo() == 'Rename station'
+        # the values as they were, floats to the last bit.
+        assert table_rows(sql_manager) == imported
+        assert journal.redo_label() == 'Rename station'
+        assert journal.redo() == 'Rename station'
+        assert stations.get(station_id)['station_name'] == 'renamed'
+
+        journal.undo()
+        assert journal.undo() == 'Import'
+        assert table_rows(sql_manager) == [[], [], []]
+        journal.redo()
+        assert table_rows(sql_manager) == imported
+        assert sql_manager.factor(ImportSurvey).get(survey_id)['device_name'] == 'device'
+
+    def test_cascade(self, sql_manager, journal: Journal):
+        survey_id = add_survey(sql_manager)
+        before = table_rows(sql_manager)
+        with journal.action('Delete survey'):
+            assert sql_manager.factor(ImportSurvey).delete(survey_id) == 5
+        assert journal.undo() == 'Delete survey'
+        assert table_rows(sql_manager) == before
+        journal.redo()
+        assert table_rows(sql_manager) == [[], [], []]
+
+    def test_coalesce(self, sql_manager, journal: Journal):
+        add_survey(sql_manager)
+        stations = sql_manager.factor(ImportStation)
+        station_id = stations.get_all(1)[0]['station_id']
+        for name in ('a', 'ab', 'abc'):
+            with journal.action('Edit station', key='station'):
+                stations.update({'station_name': name}, station_id)
+        with journal.action('Edit line'):
+            sql_manager.factor(ImportLine).update({'line_name': 'line'}, 1)
+        journal.undo()
+        journal.undo()
+        assert stations.get(station_id)['station_name'] == 'Station 0'
+        assert journal.can_undo() is False
+
+    def test_outside_action(self, sql_manager, journal: Journal):
+        add_survey(sql_manager)
+        stations = sql_manager.factor(ImportStation)
+        with journal.action('Edit station'):
+            stations.update({'station_name': 'edited'}, 1)
+        journal.undo()
+        assert journal.can_redo()
+        # a write the journal does not own, what is left to redo no longer applies.
+        stations.update({'station_name': 'other'}, 2)
+        with journal.action('Edit station'):
+            stations.update({'station_name': 'edited again'}, 1)
+        assert journal.can_redo() is False
+        journal.undo()
+        assert [row['station_name'] for row in stations.get_all(1)[:2]] == ['Station 0', 'other']
+
+    def test_large_write_outside_action(self, sql_manager, journal: Journal):
+        with journal.action('Import'):
+            add_survey(sql_manager)
+        count = journal.entry_count()
+        # the triggers are installed, but log nothing outside of an action.
+        add_survey(sql_manager, stations=2000)
+        sql_manager.factor(ImportStation).db_exec("UPDATE import_stations SET station_name = 'bulk'")
+        assert journal.entry_count() == count
+        assert journal.undo() == 'Import'
+        assert len(sql_manager.factor(ImportStation).db_fetch('SELECT station_id FROM import_stations')) == 2000
+
+    def test_memory_cap(self, sql_manager, journal: Journal):
+        journal.max_entries = 10
+        journal.max_steps = 3
+        with journal.action('Import'):
+            add_survey(sql_manager, stations=8)
+        for index in range(0, 4):
+            with journal.action(f'Edit {index}'):
+                sql_manager.factor(ImportStation).update({'station_name': str(index)}, 1)
+        # the oldest steps are dropped, within the caps.
+        assert journal.entry_count() <= 10
+        labels = []
+        while journal.can_undo():
+            labels.append(journal.undo())
+        assert labels == ['Edit 3', 'Edit 2', 'Edit 1']
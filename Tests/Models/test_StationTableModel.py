@@ -0,0 +1,81 @@
+import pytest
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QTableView
+
+from Models import StationTableModel as StationTableModule
+from Models.StationTableModel import StationTableModel
+from Models.SurveyStore import SurveyStore
+from Models.TableModels import ImportSurvey, ImportLine, ImportStation
+
+
+@pytest.fixture
+def store(sql_manager, monkeypatch) -> SurveyStore:
+    monkeypatch.setattr(StationTableModule, 'STATION_TABLE_FETCH_SIZE', 4)
+    survey_id = sql_manager.factor(ImportSurvey).insert('device')
+    line_id = sql_manager.factor(ImportLine).insert(survey_id, 1, 'In', {})
+    sql_manager.factor(ImportStation).db_insert_bulk('import_stations', [{
+        'survey_id': survey_id, 'line_id': line_id, 'station_reference_id': index, 'length_out': (index * 7) % 10,
+        'station_name': f'Station {index}' if index % 3 else None
+    } for index in range(0, 10)])
+    return SurveyStore(sql_manager)
+
+
+@pytest.fixture
+def model(store: SurveyStore) -> StationTableModel:
+    return StationTableModel(store.stations(1)[0].line_id, store=store)
+
+
+def column_values(model: StationTableModel, name: str, rows: int = None) -> list:
+    return [model.value(row, name) for row in range(0, model.rowCount() if rows is None else rows)]
+
+
+class TestStationTableModel:
+
+    def test_fetch(self, model: StationTableModel):
+        assert model.rowCount() == 4
+        while model.canFetchMore():
+            model.fetchMore()
+        assert model.rowCount() == 10
+        assert model.headerData(5, Qt.Horizontal) == 'Station name'
+
+    def test_sort(self, model: StationTableModel):
+        column = model.names.index('length_out')
+        model.sort(column, Qt.DescendingOrder)
+        # all the rows are sorted, not only the ones fetched.
+        assert model.rowCount() == 4
+        assert column_values(model, 'length_out', 10) == [9, 8, 7, 6, 5, 4, 3, 2, 1, 0]
+
+        model.sort(model.names.index('station_name'), Qt.AscendingOrder)
+        names = column_values(model, 'station_name', 10)
+        assert names[:6] == sorted(names[:6])
+        # the empty values last (QtSql reads NULL as '').
+        assert all(name in (None, '') for name in names[6:])
+
+    def test_edit(self, model: StationTableModel, store: SurveyStore):
+        changed = []
+        store.s_station_changed.connect(lambda line_id, station_id: changed.append(station_id))
+        index = model.index(1, model.names.index('station_name'))
+        station_id = model.record(1).station_id
+
+        assert model.setData(index, 'renamed') is True
+        assert model.data(index) == 'renamed'
+        assert model.setData(model.index(1, model.names.index('station_id')), 99) is False
+        # kept in the model until saved.
+        assert store.station(station_id).station_name == 'Station 1'
+        model.revert_all()
+        assert model.data(index) == 'Station 1'
+
+        model.setData(index, 'renamed')
+        # the same value as before is not an edit.
+        model.setData(model.index(2, model.names.index('station_name')), 'Station 2')
+        assert model.submit_all() == 1
+        assert changed == [station_id]
+        assert store.station(station_id).station_name == 'renamed'
+
+    def test_column_widths(self, qt_application, model: StationTableModel):
+        view = QTableView()
+        view.setModel(model)
+        model.set_column_widths(view)
+        assert view.isColumnHidden(model.names.index('line_id'))
+        assert view.columnWidth(model.names.index('station_name')) > view.fontMetrics().horizontalAdvance('Station name')
+        assert model.sample_rows(4) == [0, 2, 5, 7]
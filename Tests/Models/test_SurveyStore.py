@@ -0,0 +1,121 @@
+import pytest
+
+from Models.Journal import Journal
+from Models.SurveyStore import SurveyStore, StationRecord
+from Models.TableModels import ImportSurvey, ImportLine, ImportStation
+
+
+def insert_station(stations: ImportStation, line_id: int, index: int) -> int:
+    return stations.insert(
+        survey_id=1, line_id=line_id, line_reference_id=line_id, station_reference_id=index, length_in=0,
+        length_out=10, azimuth_in=0, azimuth_out=90, azimuth_out_avg=90, depth=5, station_name=f'Station {index}'
+    )
+
+
+@pytest.fixture
+def store(sql_manager) -> SurveyStore:
+    survey_id = sql_manager.factor(ImportSurvey).insert('device')
+    for line_reference_id in (1, 2):
+        sql_manager.factor(ImportLine).insert(survey_id, line_reference_id, 'In', {})
+    stations = sql_manager.factor(ImportStation)
+    for index in range(0, 3):
+        insert_station(stations, 1, index)
+    insert_station(stations, 2, 0)
+    return SurveyStore(sql_manager)
+
+
+class TestSurveyStore:
+
+    def test_stations(self, store: SurveyStore):
+        records = store.stations(1)
+        assert [record['station_name'] for record in records] == ['Station 0', 'Station 1', 'Station 2']
+        assert isinstance(records[0], StationRecord)
+        # read once, shared after that.
+        assert store.stations(1) is records
+        assert store.station(records[1].station_id) is records[1]
+
+    def test_update(self, store: SurveyStore):
+        changed = []
+        store.s_station_changed.connect(lambda line_id, station_id: changed.append((line_id, station_id)))
+        station_id = store.stations(1)[1].station_id
+        model = store.sql_manager().factor(ImportStation)
+
+        store.update_station(station_id, {'station_name': 'renamed', 'depth': 7.5})
+        store.update_station(station_id, {'length_out': 12})
+        assert changed == [(1, station_id), (1, station_id)]
+        assert store.station(station_id).station_name == 'renamed'
+        assert store.is_dirty()
+        assert model.get(station_id)['station_name'] == 'Station 1'
+
+        assert store.flush() == 1
+        assert store.is_dirty() is False
+        row = model.get(station_id)
+        assert (row['station_name'], row['depth'], row['length_out']) == ('renamed', 7.5, 12)
+
+    def test_update_missing(self, store: SurveyStore):
+        changed = []
+        store.s_station_changed.connect(lambda line_id, station_id: changed.append(station_id))
+        assert store.update_station(1000, {'station_name': 'missing'}) is None
+        assert changed == []
+        assert store.is_dirty() is False
+
+    def test_remove(self, store: SurveyStore):
+        removed = []
+        store.s_station_removed.connect(lambda line_id, station_id: removed.append(station_id))
+        station_id = store.stations(1)[0].station_id
+        store.update_station(station_id, {'station_name': 'removed'})
+        store.remove_station(station_id)
+        assert removed == [station_id]
+        assert [record.station_reference_id for record in store.stations(1)] == [1, 2]
+
+        store.flush()
+        assert store.sql_manager().factor(ImportStation).get(station_id) is None
+
+    def test_load_line(self, store: SurveyStore):
+        loaded = []
+        store.s_line_loaded.connect(loaded.append)
+        station_id = store.stations(2)[0].station_id
+        store.update_station(station_id, {'station_name': 'edited'})
+
+        # a station written to the database by someone else (ea. an import).
+        new_id = insert_station(store.sql_manager().factor(ImportStation), 2, 1)
+        assert store.station(new_id).station_name == 'Station 1'
+        # the line was read again, without losing the edit.
+        assert loaded == [2, 2]
+        assert [record.station_name for record in store.stations(2)] == ['edited', 'Station 1']
+
+    def test_forget(self, store: SurveyStore):
+        station_id = store.stations(1)[0].station_id
+        store.stations(2)
+        store.update_station(station_id, {'station_name': 'lost'})
+        store.forget_survey(1)
+        assert store.is_dirty() is False
+        assert store.stations(1)[0].station_name == 'Station 0'
+
+        store.clear()
+        assert store.station(station_id).station_name == 'Station 0'
+
+    def test_flush_timeout_error(self, store: SurveyStore, monkeypatch):
+        errors = []
+        store.s_error.connect(errors.append)
+
+        def flush():
+            raise Exception('SQL_DELETE_FAILED')
+        monkeypatch.setattr(store, 'flush', flush)
+        # the timer slot reports the error instead of raising it in the event loop.
+        store.c_flush_timeout()
+        assert errors == ['SQL_DELETE_FAILED']
+
+    def test_undo(self, store: SurveyStore, sql_manager):
+        journal = Journal(sql_manager)
+        store = SurveyStore(sql_manager, journal=journal)
+        station_id = store.stations(1)[0].station_id
+        store.update_station(station_id, {'station_name': 'edited'})
+        store.remove_station(store.stations(1)[-1].station_id)
+        store.flush()
+        assert journal.undo_label() == 'Edit stations'
+
+        journal.undo()
+        store.reload()
+        assert [record.station_name for record in store.stations(1)] == ['Station 0', 'Station 1', 'Station 2']
+        journal.clear()
@@ -0,0 +1,202 @@
+import numpy
+import pytest
+from PySide6.QtCore import QThread
+from PySide6.QtSql import QSqlDatabase, QSqlQuery
+
+from Models import Backends
+from Models.TableModels import ConnectionPool, SqlManager, StatementCache, ImportSurvey, ImportLine, ImportStation
+
+
+class PoolThread(QThread):
+
+    def __init__(self, db_location: str):
+        super().__init__()
+        self.db_location = db_location
+        self.connection_names = []
+        self.journal_mode = None
+
+    def run(self):
+        self.connection_names.append(ConnectionPool.acquire(self.db_location))
+        manager = SqlManager.for_thread(self.db_location)
+        self.connection_names.append(manager.connection_name)
+        query = QSqlQuery('PRAGMA journal_mode', manager.db)
+        query.next()
+        self.journal_mode = query.value(0)
+        # a worker calls this in finished(), the connection stays with the thread.
+        manager.close_connection()
+        self.connection_names.append(ConnectionPool.acquire(self.db_location))
+
+
+class TestConnectionPool:
+
+    def test_connection_per_thread(self, qt_application, tmp_path):
+        db_location = str(tmp_path / 'pool.sqlite')
+        threads = [PoolThread(db_location), PoolThread(db_location)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.wait()
+
+        for thread in threads:
+            assert len(set(thread.connection_names)) == 1
+            assert thread.journal_mode == 'wal'
+            # released when the thread finished.
+            assert QSqlDatabase.contains(thread.connection_names[0]) is False
+        assert threads[0].connection_names[0] != threads[1].connection_names[0]
+
+    def test_release(self, qt_application, tmp_path):
+        db_location = str(tmp_path / 'pool.sqlite')
+        # earlier tests might have used a worker in the main thread.
+        ConnectionPool.release()
+        open_connections = ConnectionPool.open_connections()
+        connection_name = ConnectionPool.acquire(db_location)
+        assert ConnectionPool.acquire(db_location) == connection_name
+        assert ConnectionPool.open_connections() == open_connections + 1
+
+        ConnectionPool.release()
+        assert QSqlDatabase.contains(connection_name) is False
+        assert ConnectionPool.open_connections() == open_connections
+
+
+class TestStatementCache:
+
+    def test_reuse(self, sql_manager, monkeypatch):
+        monkeypatch.setattr(StatementCache, 'is_counting', True)
+        surveys = sql_manager.factor(ImportSurvey)
+        stats = StatementCache.stats()
+        survey_ids = [surveys.insert(device_name=f'device {index}') for index in range(0, 3)]
+        assert StatementCache.stats()['prepares'] == stats['prepares'] + 1
+        assert StatementCache.stats()['reuses'] == stats['reuses'] + 2
+
+        # the values of the previous execution are not left bound.
+        assert [surveys.get(survey_id)['device_name'] for survey_id in survey_ids] == ['device 0', 'device 1', 'device 2']
+
+    def test_schema_changes(self, sql_manager):
+        surveys = sql_manager.factor(ImportSurvey)
+        survey_id = surveys.insert(device_name='device')
+        assert surveys.get(survey_id) is not None
+        # a cached (finished) statement does not lock the table, nor is it broken once the table is back.
+        sql_manager.flush_db()
+        assert surveys.get(survey_id) is None
+
+    def test_size(self, sql_manager, monkeypatch):
+        monkeypatch.setattr(Backends, 'SQL_STATEMENT_CACHE_SIZE', 2)
+        surveys = sql_manager.factor(ImportSurvey)
+        for column in ('survey_id', 'device_name', 'survey_name'):
+            surveys.db_fetch(f'SELECT {column} FROM import_surveys')
+        cache = StatementCache._caches[sql_manager.connection_name]
+        assert list(cache.keys()) == ['SELECT device_name FROM import_surveys', 'SELECT survey_name FROM import_surveys']
+
+        sql_manager.close_connection()
+        assert sql_manager.connection_name not in StatementCache._caches
+
+
+class TestFetch:
+
+    @pytest.fixture
+    def stations(self, sql_manager) -> ImportStation:
+        survey_id = sql_manager.factor(ImportSurvey).insert('device')
+        sql_manager.factor(ImportLine).insert(survey_id, 1, 'In', {})
+        stations = sql_manager.factor(ImportStation)
+        for index in range(0, 2):
+            stations.insert(
+                survey_id=1, line_id=1, line_reference_id=1, station_reference_id=index, length_in=0,
+                length_out=10 + index, azimuth_in=0, azimuth_out=90, azimuth_out_avg=90, depth=5,
+                station_name=f'Station {index}'
+            )
+        return stations
+
+    def test_row_types(self, stations: ImportStation):
+        sql = 'SELECT station_name, length_out FROM import_stations ORDER BY station_id'
+        assert stations.db_fetch(sql) == [
+            {'station_name': 'Station 0', 'length_out': 10},
+            {'station_name': 'Station 1', 'length_out': 11}
+        ]
+        assert stations.db_fetch(sql, row_type=ImportStation.ROW_TUPLE) == [('Station 0', 10), ('Station 1', 11)]
+        rows = stations.db_fetch(sql, row_type=ImportStation.ROW_NAMEDTUPLE)
+        assert rows[1].station_name == 'Station 1'
+        assert rows[1].length_out == 11
+        assert stations.db_fetch(sql, row_type=ImportStation.ROW_COLUMNS) == {
+            'station_name': ['Station 0', 'Station 1'],
+            'length_out': [10, 11]
+        }
+        assert stations.db_fetch(f'{sql} LIMIT 0', row_type=ImportStation.ROW_COLUMNS) == {'station_name': [], 'length_out': []}
+
+    def test_array(self, stations: ImportStation):
+        array = stations.get_all_array(1)
+        assert array.dtype.names == ImportStation.NUMERIC_COLUMNS
+        assert list(array['length_out']) == [10, 11]
+        # never located.
+        assert numpy.isnan(array['latitude']).all()
+
+
+class TestDelete:
+
+    @pytest.fixture
+    def surveys(self, sql_manager) -> list:
+        """
+            Two surveys of two lines of three stations, the second line of each survey is empty.
+        """
+        survey_ids = []
+        for survey_index in range(0, 2):
+            survey_id = sql_manager.factor(ImportSurvey).insert('device')
+            line_ids = [sql_manager.factor(ImportLine).insert(survey_id, index, 'In', {}) for index in (1, 2)]
+            sql_manager.factor(ImportStation).db_insert_bulk('import_stations', [{
+                'survey_id': survey_id, 'line_id': line_ids[0], 'station_reference_id': index
+            } for index in range(0, 3)])
+            survey_ids.append(survey_id)
+        return survey_ids
+
+    @staticmethod
+    def count(model, table_name: str) -> int:
+        return model.db_fetch(f'SELECT COUNT(*) AS c FROM {table_name}')[0]['c']
+
+    def test_cascade(self, sql_manager, surveys: list):
+        model = sql_manager.factor(ImportSurvey)
+        # the survey, its two lines and three stations.
+        assert model.delete(surveys[0]) == 6
+        assert (self.count(model, 'import_lines'), self.count(model, 'import_stations')) == (2, 3)
+
+        assert sql_manager.factor(ImportLine).flush_empty(surveys[1]) == 1
+        assert model.flush() == 5
+        assert (self.count(model, 'import_lines'), self.count(model, 'import_stations')) == (0, 0)
+
+    def test_delete_many(self, sql_manager, surveys: list, monkeypatch):
+        from Models import TableModels
+        monkeypatch.setattr(TableModels, 'SQL_MAX_VARIABLES', 2)
+        stations = sql_manager.factor(ImportStation)
+        station_ids = [row['station_id'] for row in stations.db_fetch('SELECT station_id FROM import_stations')]
+        assert stations.delete_many(station_ids[1:]) == 5
+        assert stations.delete_many([]) == 0
+        assert [row['station_id'] for row in stations.db_fetch('SELECT station_id FROM import_stations')] == station_ids[:1]
+
+    def test_delete_many_failed(self, tmp_path, monkeypatch):
+        """
+            A statement failing after the first chunk rolls back the rows the chunks before it deleted.
+        """
+        from Models import TableModels
+        monkeypatch.setattr(TableModels, 'SQL_MAX_VARIABLES', 2)
+        manager = SqlManager.sqlite3(str(tmp_path / 'test.sqlite'), track_changes=False)
+        manager.create_tables()
+        stations = manager.factor(ImportStation)
+        stations.db_insert_bulk('import_stations', [{'station_reference_id': index} for index in range(0, 5)])
+        station_ids = [row['station_id'] for row in stations.db_fetch('SELECT station_id FROM import_stations')]
+        stations.db_exec(f"""
+            CREATE TEMP TRIGGER fail_delete BEFORE DELETE ON import_stations WHEN old.station_id = {station_ids[3]}
+            BEGIN SELECT RAISE(ABORT, 'failed'); END
+        """)
+        with pytest.raises(Exception, match='SQL_DELETE_FAILED'):
+            stations.delete_many(station_ids)
+        assert self.count(stations, 'import_stations') == 5
+        manager.close_connection()
+
+    def test_load_orphans(self, sql_manager, surveys: list):
+        """
+            Projects saved before the foreign keys can hold stations of removed lines, they still load.
+        """
+        data = sql_manager.dump_tables()
+        data['import_lines'] = []
+        sql_manager.drop_tables()
+        sql_manager.create_tables()
+        sql_manager.load_table_data(data)
+        assert self.count(sql_manager.factor(ImportStation), 'import_stations') == 6
@@ -0,0 +1,64 @@
+import logging
+import time
+
+import pytest
+
+from Utils.Logging import RenderProfiler, Track
+
+
+class TestRenderProfiler:
+
+    def test_disabled_records_nothing(self):
+        profiler = RenderProfiler()
+        profiler.frame_start()
+        with profiler.measure('GridOverlay'):
+            pass
+        profiler.frame_end(item_count=10)
+        assert len(profiler.frames) == 0
+        assert profiler.summary() == {}
+
+    @pytest.mark.parametrize("size,frame_count", [
+        (5, 3),
+        (5, 12),
+    ])
+    def test_ring_buffer(self, size: int, frame_count: int):
+        profiler = RenderProfiler(size)
+        profiler.enable()
+        for index in range(0, frame_count):
+            profiler.frame_start()
+            with profiler.measure('GridOverlay'):
+                pass
+            profiler.record_paint('SurveyLineItem', 0.001)
+            profiler.record_paint('SurveyLineItem', 0.001)
+            profiler.frame_end(item_count=index, tile_queue=2)
+
+        summary = profiler.summary()
+        assert summary['frames'] == min(size, frame_count)
+        assert summary['item_count'] == frame_count - 1
+        assert summary['tile_queue'] == 2
+        assert summary['paint_avg_ms']['SurveyLineItem'] == pytest.approx(2)
+        assert 'GridOverlay' in summary['paint_avg_ms']
+        assert summary['frame_max_ms'] >= summary['frame_avg_ms']
+        assert len(profiler.summary_lines()) == 4
+
+
+class TestTrackStartup:
+
+    def test_startup_report(self, caplog):
+        with Track.startup_phase('imports'):
+            pass
+        with Track.startup_phase('main window'):
+            pass
+        with caplog.at_level(logging.INFO, logger='startup'):
+            total = Track.startup_report(budget=60)
+        assert total >= 0
+        assert 'Startup imports' in caplog.text
+        assert 'Startup main window' in caplog.text
+        assert Track.STARTUP_PHASES == []
+
+    def test_over_budget(self, caplog):
+        with Track.startup_phase('slow'):
+            time.sleep(0.01)
+        with caplog.at_level(logging.INFO, logger='startup'):
+            Track.startup_report(budget=0.001)
+        assert 'the budget is 1ms' in caplog.text
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from Config.Constants import APPLICATION_VERSION
+from Utils import ProjectFile
+
+
+def project(**tables) -> dict:
+    database = {table: [] for table in ProjectFile.TABLES}
+    database.update(tables)
+    return {'version': APPLICATION_VERSION, 'database': database}
+
+
+class TestProjectFile:
+
+    def test_encode_decode(self, tmp_path):
+        data = project(import_surveys=[{'survey_id': 1}])
+        ProjectFile.write(tmp_path / 'test.stk', data)
+        assert ProjectFile.read(tmp_path / 'test.stk') == data
+
+    def test_migrate(self):
+        properties = {
+            'status': True, 'missing_bytes': 0, 'byte_start': 10, 'status_byte': 2, 'azimuth_in': 1.0,
+            'azimuth_out': 1.0, 'length': 2.0, 'depth_in': 3.0, 'depth_out': 3.1, 'pitch_in': -4.0, 'pitch_out': 4.0,
+            'direction': 'In', 'byte_end': 26
+        }
+        data = project(import_stations=[
+            {'station_id': 1, 'device_properties': json.dumps(properties)},
+            {'station_id': 2, 'device_properties': json.dumps({'status_byte': 3, 'comment': 'Last station is generated'})},
+            {'station_id': 3, 'device_properties': json.dumps({'status': False, 'missing_bytes': 5, 'error': 'error'})},
+        ])
+        stations = ProjectFile.decode(ProjectFile.encode(data))['database']['import_stations']
+        assert stations[0] == {
+            'station_id': 1, 'depth_in': 3.0, 'pitch_in': -4.0, 'pitch_out': 4.0, 'status_byte': 2, 'byte_start': 10,
+            'byte_end': 26, 'is_generated': 0, 'device_properties': None
+        }
+        assert stations[1]['is_generated'] == 1
+        assert json.loads(stations[2]['device_properties']) == {'missing_bytes': 5, 'error': 'error'}
+
+    def test_valid(self):
+        data = project(
+            import_surveys=[{'survey_id': 1}],
+            import_lines=[{'line_id': 1, 'survey_id': 1}],
+            import_stations=[{'station_id': 1, 'line_id': 1, 'survey_id': 1}]
+        )
+        assert ProjectFile.validate(data) == []
+
+    @pytest.mark.parametrize('data, problem', [
+        ({}, 'Not a project file'),
+        ({'version': 'v0', 'database': project()['database']}, 'Version v0'),
+        ({'version': APPLICATION_VERSION, 'database': {}}, 'Table project_settings is missing'),
+        (project(import_lines=[{'line_id': 1, 'survey_id': 2}]), 'Import line 1 belongs to unknown survey 2'),
+        (project(import_stations=[{'station_id': 1, 'line_id': 3, 'survey_id': 1}]), 'Import station 1 belongs to unknown line 3'),
+        (project(map_stations=[{'station_id': 4, 'line_id': 1}]), 'Map station 4 belongs to unknown line 1'),
+    ], ids=['not_a_project', 'version', 'missing_table', 'line', 'station', 'map_station'])
+    def test_problems(self, data, problem):
+        problems = ProjectFile.validate(data)
+        assert len(problems) > 0
+        assert problems[0].startswith(problem)
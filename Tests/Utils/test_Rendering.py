@@ -0,0 +1,55 @@
+import math
+
+import pytest
+
+from PySide6.QtCore import QPointF
+
+from Utils.Rendering import simplify_path
+
+
+class TestSimplifyPath:
+
+    @pytest.mark.parametrize("points,tolerance,expected", [
+        (
+            [QPointF(0, 0), QPointF(1, 0.1), QPointF(2, -0.1), QPointF(3, 0)],
+            0.5,
+            [QPointF(0, 0), QPointF(3, 0)]
+        ), (
+            [QPointF(0, 0), QPointF(1, 0.1), QPointF(2, -0.1), QPointF(3, 0)],
+            0.01,
+            [QPointF(0, 0), QPointF(1, 0.1), QPointF(2, -0.1), QPointF(3, 0)]
+        ), (
+            [QPointF(0, 0), QPointF(5, 5), QPointF(10, 0)],
+            1,
+            [QPointF(0, 0), QPointF(5, 5), QPointF(10, 0)]
+        ), (
+            # closed loop, first and last point are the same
+            [QPointF(0, 0), QPointF(10, 0), QPointF(10, 10), QPointF(5, 5.1), QPointF(0, 0)],
+            1,
+            [QPointF(0, 0), QPointF(10, 0), QPointF(10, 10), QPointF(0, 0)]
+        ), (
+            [QPointF(0, 0), QPointF(1, 1)],
+            10,
+            [QPointF(0, 0), QPointF(1, 1)]
+        ),
+    ])
+    def test_simplify_path(self, points: list, tolerance: float, expected: list):
+        assert simplify_path(points, tolerance) == expected
+
+    def test_simplify_path_tolerance(self):
+        """
+            No dropped point may be further away from the simplified line than the tolerance.
+        """
+        points = [QPointF(x, math.sin(x / 10) * 20) for x in range(0, 500)]
+        simplified = simplify_path(points, 0.5)
+        assert len(simplified) < len(points) / 5
+
+        segment = 0
+        for point in points:
+            while point.x() > simplified[segment + 1].x():
+                segment += 1
+            start = simplified[segment]
+            end = simplified[segment + 1]
+            y = start.y() + (end.y() - start.y()) * (point.x() - start.x()) / (end.x() - start.x())
+            # vertical distance is an upper bound of the perpendicular distance
+            assert abs(point.y() - y) <= 0.5 * math.hypot(1, (end.y() - start.y()) / (end.x() - start.x())) + 1e-9
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+from Models.ItemModels import ProxyModel
+from Models.Journal import Journal
+from Models.SurveyStore import SurveyStore
+from Models.TableModels import SqlManager, ImportSurvey, ImportLine
+from Workers.Mixins import ThreadWithProgressBar
+from Workers.Scheduler import Job
+
+
+@pytest.fixture
+def sqlite3_manager(tmp_path) -> SqlManager:
+    manager = SqlManager.sqlite3(str(tmp_path / 'test.sqlite'), track_changes=False)
+    manager.create_tables()
+    yield manager
+    manager.close_connection()
+
+
+@pytest.fixture
+def tree_model(qt_application, sqlite3_manager, monkeypatch) -> ProxyModel:
+    monkeypatch.setattr(SurveyStore, '_instance', SurveyStore(sqlite3_manager))
+    monkeypatch.setattr(Journal, '_instance', Journal(sqlite3_manager))
+    return ProxyModel(sqlite3_manager)
+
+
+class TestThreadWithProgressBar:
+
+    def test_line_added_twice(self, sqlite3_manager, tree_model: ProxyModel):
+        survey_id = sqlite3_manager.factor(ImportSurvey).insert('device')
+        line_ids = [sqlite3_manager.factor(ImportLine).insert(survey_id, index, 'In', {}) for index in (1, 2)]
+        bar = ThreadWithProgressBar(SimpleNamespace(tree_view=SimpleNamespace(model=lambda: tree_model)))
+        job = Job('import', None, 0)
+        job.s_line_added.connect(bar.worker_treeview_line_added)
+
+        # the first signal shows the survey with the lines stored so far, the queued signals of those follow.
+        for line_id in line_ids:
+            job.s_line_added.emit(survey_id, line_id)
+        survey_item = tree_model.import_item().surveys[f'id_{survey_id}']
+        assert survey_item.rowCount() == 2
+
+        bar.worker_treeview_reload(survey_id)
+        assert [survey_item.child(row).line_id() for row in range(0, survey_item.rowCount())] == line_ids
+
+    def test_reload_removed_survey(self, sqlite3_manager, tree_model: ProxyModel):
+        survey_id = sqlite3_manager.factor(ImportSurvey).insert('device')
+        line_id = sqlite3_manager.factor(ImportLine).insert(survey_id, 1, 'In', {})
+        bar = ThreadWithProgressBar(SimpleNamespace(tree_view=SimpleNamespace(model=lambda: tree_model)))
+        bar.worker_treeview_line_added(survey_id, line_id)
+
+        # a cancelled import removes its survey, and asks for a reload of it.
+        sqlite3_manager.factor(ImportSurvey).delete(survey_id)
+        bar.worker_treeview_reload(survey_id)
+        assert tree_model.import_item().rowCount() == 0
+        assert tree_model.import_item().surveys == {}
@@ -0,0 +1,156 @@
+import threading
+import time
+
+import pytest
+import shiboken6
+from PySide6.QtCore import QCoreApplication
+
+from Models.TableModels import ConnectionPool
+from Workers.Mixins import WorkerMixin
+from Workers.Scheduler import JobScheduler, Job
+
+
+class BlockingWorker(WorkerMixin):
+    """
+        Runs until released (or cancelled), the order in which the workers started is kept in started.
+    """
+    def __init__(self, name: str, started: list):
+        super().__init__()
+        self.name = name
+        self.started = started
+        self.release = threading.Event()
+
+    def run(self):
+        self.started.append(self.name)
+        self.s_progress.emit(50)
+        while self.release.is_set() is False and self.is_cancelled() is False:
+            time.sleep(0.005)
+        self.finished()
+
+
+class ConnectionWorker(WorkerMixin):
+    """
+        Keeps the name of the (pooled) connection its thread gave it.
+    """
+    def __init__(self, db_location: str, connection_names: list):
+        super().__init__()
+        self.db_location = db_location
+        self.connection_names = connection_names
+
+    def run(self):
+        self.connection_names.append(self.set_sql_manager(db_location=self.db_location).connection_name)
+        self.finished()
+
+
+@pytest.fixture
+def scheduler_factory(qt_application):
+    """
+        The threads of a scheduler run until shutdown(), after the test.
+    """
+    schedulers = []
+
+    def create(max_workers: int) -> JobScheduler:
+        schedulers.append(JobScheduler(max_workers=max_workers))
+        return schedulers[-1]
+    yield create
+    for scheduler in schedulers:
+        scheduler.shutdown()
+
+
+def wait_until(predicate, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while predicate() is False:
+        assert time.monotonic() < deadline, 'timeout'
+        QCoreApplication.processEvents()
+        time.sleep(0.005)
+
+
+class TestJobScheduler:
+
+    def test_bounded_pool_and_priority(self, scheduler_factory):
+        scheduler = scheduler_factory(2)
+        started = []
+        workers = {name: BlockingWorker(name, started) for name in ('a', 'b', 'low', 'high')}
+        jobs = {
+            'a': scheduler.submit(workers['a'], 'a'),
+            'b': scheduler.submit(workers['b'], 'b'),
+            'low': scheduler.submit(workers['low'], 'low', JobScheduler.PRIORITY_LOW),
+            'high': scheduler.submit(workers['high'], 'high', JobScheduler.PRIORITY_HIGH),
+        }
+        wait_until(lambda: len(started) == 2)
+        assert scheduler.running_count() == 2
+        assert [job.name for job in scheduler.jobs()] == ['a', 'b', 'high', 'low']
+
+        workers['a'].release.set()
+        wait_until(lambda: len(started) == 3)
+        assert started[2] == 'high'
+        assert jobs['a'].state == Job.STATE_FINISHED
+        assert jobs['a'].progress == 50
+
+        for worker in workers.values():
+            worker.release.set()
+        wait_until(lambda: scheduler.running_count() == 0 and len(scheduler.jobs()) == 0)
+        assert started[3] == 'low'
+
+    def test_same_name_runs_serial(self, scheduler_factory):
+        scheduler = scheduler_factory(2)
+        started = []
+        first = BlockingWorker('first', started)
+        second = BlockingWorker('second', started)
+        scheduler.submit(first, 'mnemo')
+        job = scheduler.submit(second, 'mnemo')
+        wait_until(lambda: len(started) == 1)
+        assert job.state == Job.STATE_QUEUED
+
+        first.release.set()
+        second.release.set()
+        wait_until(lambda: job.is_active() is False)
+        assert started == ['first', 'second']
+
+    def test_cancel(self, scheduler_factory):
+        scheduler = scheduler_factory(1)
+        started = []
+        running = scheduler.submit(BlockingWorker('running', started), 'running')
+        queued = scheduler.submit(BlockingWorker('queued', started), 'queued')
+        finished = []
+        queued.s_finished.connect(lambda: finished.append(queued.name))
+
+        scheduler.cancel(queued)
+        assert queued.state == Job.STATE_CANCELLED
+        assert finished == ['queued']
+
+        wait_until(lambda: len(started) == 1)
+        scheduler.cancel(running)
+        wait_until(lambda: running.is_active() is False)
+        assert running.state == Job.STATE_CANCELLED
+        assert started == ['running']
+
+    def test_threads_are_reused(self, scheduler_factory):
+        scheduler = scheduler_factory(1)
+        started = []
+        workers = [BlockingWorker(str(index), started) for index in range(0, 3)]
+        for worker in workers:
+            worker.release.set()
+        jobs = [scheduler.submit(worker, 'import') for worker in workers]
+        wait_until(lambda: all(job.is_active() is False for job in jobs))
+
+        assert scheduler.thread_count() == 1
+        assert started == ['0', '1', '2']
+        # the finished workers are deleted, the jobs no longer hold them.
+        wait_until(lambda: not any(shiboken6.isValid(worker) for worker in workers))
+        assert all(job.worker is None and job.thread is None for job in jobs)
+
+    def test_connection_is_reused(self, scheduler_factory, tmp_path):
+        scheduler = scheduler_factory(1)
+        connection_names = []
+        jobs = [
+            scheduler.submit(ConnectionWorker(str(tmp_path / 'pool.sqlite'), connection_names), 'import')
+            for index in range(0, 3)
+        ]
+        wait_until(lambda: all(job.is_active() is False for job in jobs))
+        # the thread opened its connection for the first job only.
+        assert len(connection_names) == 3 and len(set(connection_names)) == 1
+
+        open_connections = ConnectionPool.open_connections()
+        scheduler.shutdown()
+        assert ConnectionPool.open_connections() == open_connections - 1
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtWidgets import QApplication
+
+
+@pytest.fixture(scope='session')
+def qt_application():
+    """
+        QtSql (and QPixmap) refuse to work without an application instance, one per test-session is enough.
+    """
+    application = QApplication.instance()
+    if application is None:
+        application = QApplication([])
+    return application
+
+
+@pytest.fixture
+def sql_manager(qt_application, tmp_path):
+    """
+        A SqlManager on a fresh database file, QSettings are redirected as well as the models flag every write in them.
+    """
+    from PySide6.QtCore import QSettings
+    from Models.TableModels import SqlManager
+
+    QSettings.setDefaultFormat(QSettings.IniFormat)
+    QSettings.setPath(QSettings.IniFormat, QSettings.UserScope, str(tmp_path))
+
+    manager = SqlManager('test_connection', db_location=str(tmp_path / 'test.sqlite'))
+    manager.create_tables()
+    yield manager
+    manager.close_connection()
@@ -0,0 +1,42 @@
+import pathlib
+import subprocess
+import sys
+
+from Importers.Mnemo import parse_dump_file
+
+ROOT = pathlib.Path(__file__).parent.parent
+
+
+def run(*arguments) -> subprocess.CompletedProcess:
+    # every command runs in its own process, like it would from a shell.
+    return subprocess.run(
+        [sys.executable, str(ROOT / 'cli.py'), *map(str, arguments)],
+        cwd=ROOT, capture_output=True, text=True, timeout=120
+    )
+
+
+class TestCli:
+
+    def test_conversions(self, tmp_path):
+        result = run('dmp2stk', ROOT / 'data_files' / 'tux.dmp', '--output-dir', tmp_path)
+        assert result.returncode == 0, result.stderr
+        assert (tmp_path / 'tux.stk').exists()
+
+        result = run('validate', tmp_path / 'tux.stk')
+        assert result.returncode == 0
+        assert 'OK' in result.stdout
+
+        result = run('stk2dmp', tmp_path / 'tux.stk', '--output-dir', tmp_path / 'export', '--binary')
+        assert result.returncode == 0, result.stderr
+        assert len(parse_dump_file(tmp_path / 'export' / 'tux.dmp')) > 0
+
+    def test_invalid_project(self, tmp_path):
+        (tmp_path / 'broken.stk').write_bytes(b'not a project')
+        result = run('validate', '-q', tmp_path / 'broken.stk')
+        assert result.returncode == 1
+        assert 'Could not be read' in result.stdout
+
+    def test_missing_dump_file(self, tmp_path):
+        result = run('dmp2stk', tmp_path / 'missing.dmp')
+        assert result.returncode == 1
+        assert 'missing.dmp' in result.stderr
@@ -1,7 +1,9 @@
 import logging
 import sys
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
-from time import sleep
+from time import sleep, perf_counter
 
 from PySide6.QtCore import QObject, Signal
 
@@ -25,6 +27,123 @@ class Track():
         del cls.TIME_START[name]
         return end - start
 
+    STARTUP_PHASES = []
+
+    @classmethod
+    @contextmanager
+    def startup_phase(cls, name: str):
+        """
+            Times one phase of the application startup, see startup_report().
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            cls.STARTUP_PHASES.append((name, perf_counter() - start))
+
+    @classmethod
+    def startup_report(cls, budget: float) -> float:
+        """
+            Logs the time spent per startup phase and returns the total,
+            a warning is logged when the total exceeds the budget (in seconds).
+        """
+        log = logging.getLogger('startup')
+        total = sum(seconds for name, seconds in cls.STARTUP_PHASES)
+        for name, seconds in cls.STARTUP_PHASES:
+            log.info(f'Startup {name}: {seconds * 1000:.0f}ms')
+        if total > budget:
+            log.warning(f'Startup took {total * 1000:.0f}ms, the budget is {budget * 1000:.0f}ms')
+        else:
+            log.info(f'Startup took {total * 1000:.0f}ms')
+        cls.STARTUP_PHASES = []
+        return total
+
+
+class RenderProfiler:
+    """
+        Keeps the render cost of the last N frames in a ring buffer.
+
+        Every frame holds its total paint time, the paint time per overlay/item (by name),
+        the amount of items in the scene and the amount of map-tiles still waiting to be fetched.
+        When disabled all calls return right away, so it can stay wired into the paint code.
+    """
+
+    def __init__(self, size: int = 120):
+        self.is_enabled = False
+        self.frames = deque(maxlen=size)
+        self._frame_start = None
+        self._paint_times = {}
+
+    def enable(self, is_enabled: bool = True):
+        self.is_enabled = is_enabled
+        self.frames.clear()
+
+    def frame_start(self):
+        if self.is_enabled is False:
+            return
+        self._frame_start = perf_counter()
+        self._paint_times = {}
+
+    def frame_end(self, item_count: int = 0, tile_queue: int = 0):
+        if self.is_enabled is False or self._frame_start is None:
+            return
+        self.frames.append({
+            'frame_time': perf_counter() - self._frame_start,
+            'paint_times': self._paint_times,
+            'item_count': item_count,
+            'tile_queue': tile_queue,
+        })
+        self._frame_start = None
+
+    def record_paint(self, name: str, seconds: float):
+        if self.is_enabled is False:
+            return
+        self._paint_times[name] = self._paint_times.get(name, 0) + seconds
+
+    @contextmanager
+    def measure(self, name: str):
+        if self.is_enabled is False:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record_paint(name, perf_counter() - start)
+
+    def summary(self) -> dict:
+        """
+            Returns avg/max (in ms) of the frame and paint times and the last item count/tile queue.
+        """
+        if len(self.frames) == 0:
+            return {}
+        frame_times = [frame['frame_time'] for frame in self.frames]
+        paint_times = {}
+        for frame in self.frames:
+            for name, seconds in frame['paint_times'].items():
+                paint_times.setdefault(name, []).append(seconds)
+
+        return {
+            'frames': len(self.frames),
+            'frame_avg_ms': sum(frame_times) / len(frame_times) * 1000,
+            'frame_max_ms': max(frame_times) * 1000,
+            'paint_avg_ms': {name: sum(times) / len(times) * 1000 for name, times in paint_times.items()},
+            'item_count': self.frames[-1]['item_count'],
+            'tile_queue': self.frames[-1]['tile_queue'],
+        }
+
+    def summary_lines(self) -> list:
+        summary = self.summary()
+        if len(summary) == 0:
+            return ['No frames recorded']
+        lines = [
+            f"frame avg {summary['frame_avg_ms']:.2f}ms / max {summary['frame_max_ms']:.2f}ms ({summary['frames']} frames)",
+            f"items {summary['item_count']} / tile queue {summary['tile_queue']}",
+        ]
+        for name, avg in summary['paint_avg_ms'].items():
+            lines.append(f'{name} {avg:.2f}ms')
+        return lines
+
 
 class LogStream(QObject):
 
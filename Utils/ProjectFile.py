@@ -0,0 +1,123 @@
+"""
+    The .stk project file: the zlib compressed json of {"version": ..., "database": {table_name: [rows]}}.
+
+    This module only uses the standard library, so it can be used without Qt (see cli.py).
+    SaveFile uses it to read and write the projects of the application.
+    Projects of older versions are migrated to the current tables while they are decoded.
+"""
+import json
+import zlib
+
+from Config.Constants import APPLICATION_VERSION, SQL_TABLE_PROJECT_SETTINGS, SQL_TABLE_IMPORT_SURVEYS, \
+    SQL_TABLE_IMPORT_LINES, SQL_TABLE_IMPORT_STATIONS, SQL_TABLE_MAP_LINES, SQL_TABLE_MAP_STATIONS, \
+    SQL_TABLE_CONTACTS, SQL_TABLE_EXPLORERS, SQL_TABLE_SURVEYORS, SQL_STATION_DEVICE_COLUMNS
+
+TABLES = (
+    SQL_TABLE_PROJECT_SETTINGS,
+    SQL_TABLE_IMPORT_SURVEYS,
+    SQL_TABLE_IMPORT_LINES,
+    SQL_TABLE_IMPORT_STATIONS,
+    SQL_TABLE_MAP_LINES,
+    SQL_TABLE_MAP_STATIONS,
+    SQL_TABLE_CONTACTS,
+    SQL_TABLE_EXPLORERS,
+    SQL_TABLE_SURVEYORS,
+)
+
+# the device properties of a station that are stored in a column of their own (or are not needed after importing).
+STATION_PARSED_PROPERTIES = (
+    'status', 'azimuth_in', 'azimuth_out', 'length', 'depth_out', 'direction', 'comment', 'skipped_bytes', 'missing_bytes'
+)
+# the comment older versions flagged the generated last station of a line with.
+GENERATED_STATION_COMMENT = 'Last station is generated'
+
+
+def encode(data: dict) -> bytes:
+    json_str = json.dumps(data)
+    return zlib.compress(bytes(json_str, 'utf8'))
+
+
+def decode(data: bytes) -> dict:
+    uncompressed = zlib.decompress(data)
+    return migrate(json.loads(uncompressed))
+
+
+def read(path) -> dict:
+    with open(path, 'rb') as fp:
+        return decode(fp.read())
+
+
+def write(path, data: dict):
+    with open(path, 'wb') as fp:
+        fp.write(encode(data))
+
+
+def station_columns(properties: dict, is_generated: bool = False) -> dict:
+    """
+        The columns of an import station for the properties read from the device.
+        Only what has no column of its own (ea. a read error) is kept as json in device_properties.
+    """
+    columns = {name: properties.get(name) for name in SQL_STATION_DEVICE_COLUMNS}
+    columns['is_generated'] = int(is_generated or properties.get('comment') == GENERATED_STATION_COMMENT)
+    remaining = {
+        name: value for name, value in properties.items()
+        if name not in SQL_STATION_DEVICE_COLUMNS and name not in STATION_PARSED_PROPERTIES
+    }
+    if properties.get('missing_bytes'):
+        remaining['missing_bytes'] = properties['missing_bytes']
+    columns['device_properties'] = json.dumps(remaining) if len(remaining) > 0 else None
+    return columns
+
+
+def migrate(data: dict) -> dict:
+    """
+        Moves the device properties of the import stations of older projects into their columns (in place).
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('database'), dict):
+        return data
+    stations = data['database'].get(SQL_TABLE_IMPORT_STATIONS)
+    if not isinstance(stations, list):
+        return data
+    for station in stations:
+        if 'is_generated' in station:
+            continue
+        properties = json.loads(station.get('device_properties') or '{}')
+        station.update(station_columns(properties))
+    return data
+
+
+def validate(data: dict) -> list:
+    """
+        Returns a list of problems with the (decoded) project, an empty list when it can be opened.
+    """
+    if not isinstance(data, dict) or 'version' not in data or 'database' not in data:
+        return ['Not a project file, "version" or "database" is missing']
+
+    problems = []
+    if data['version'] != APPLICATION_VERSION:
+        problems.append(f'Version {data["version"]} does not match the application version {APPLICATION_VERSION}')
+
+    database = data['database']
+    for table in TABLES:
+        if not isinstance(database.get(table), list):
+            problems.append(f'Table {table} is missing')
+    if len(problems) > 0:
+        return problems
+
+    survey_ids = {row['survey_id'] for row in database[SQL_TABLE_IMPORT_SURVEYS]}
+    lines = {row['line_id']: row for row in database[SQL_TABLE_IMPORT_LINES]}
+    for line in lines.values():
+        if line['survey_id'] not in survey_ids:
+            problems.append(f'Import line {line["line_id"]} belongs to unknown survey {line["survey_id"]}')
+    for station in database[SQL_TABLE_IMPORT_STATIONS]:
+        line = lines.get(station['line_id'])
+        if line is None:
+            problems.append(f'Import station {station["station_id"]} belongs to unknown line {station["line_id"]}')
+        elif line['survey_id'] != station['survey_id']:
+            problems.append(f'Import station {station["station_id"]} is not in the survey of line {station["line_id"]}')
+
+    map_line_ids = {row['line_id'] for row in database[SQL_TABLE_MAP_LINES]}
+    for station in database[SQL_TABLE_MAP_STATIONS]:
+        if station['line_id'] not in map_line_ids:
+            problems.append(f'Map station {station["station_id"]} belongs to unknown line {station["line_id"]}')
+    return problems
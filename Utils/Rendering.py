@@ -9,6 +9,53 @@ from Models.TableModels import ImportStation, SqlManager, ImportLine
 
 
 
+def simplify_path(points: list, tolerance: float) -> list:
+    """
+        Douglas-Peucker line simplification.
+
+        Returns the subset of points (always including the first and the last one) where no dropped point lies
+        further than the tolerance from the simplified line.
+        Implemented with a stack instead of recursion, cave lines can have thousands of stations.
+
+    :param points: list of QPointF
+    :param tolerance: float max distance in the same unit as the points
+    :return: list of QPointF
+    """
+    if len(points) < 3 or tolerance <= 0:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = True
+    keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        start = points[first]
+        end = points[last]
+        dx = end.x() - start.x()
+        dy = end.y() - start.y()
+        length = math.hypot(dx, dy)
+
+        max_distance = -1.0
+        max_index = first
+        for index in range(first + 1, last):
+            point = points[index]
+            if length == 0:
+                distance = math.hypot(point.x() - start.x(), point.y() - start.y())
+            else:
+                distance = abs(dy * point.x() - dx * point.y() + end.x() * start.y() - end.y() * start.x()) / length
+            if distance > max_distance:
+                max_distance = distance
+                max_index = index
+
+        if max_distance > tolerance:
+            keep[max_index] = True
+            stack.append((first, max_index))
+            stack.append((max_index, last))
+
+    return [point for index, point in enumerate(points) if keep[index]]
+
+
 class CalcMixin:
 
     def __init__(self):
@@ -100,8 +147,6 @@ class CalcMixin:
 
 
 class DragImage(CalcMixin):
-    SQL_MANAGER_CONNECTION_NAME = 'DrawImage'
-
     MAP_PADDING = 50
 
     MAP_LINE_WIDTH = 4
@@ -113,7 +158,10 @@ class DragImage(CalcMixin):
     def __init__(self, line_id: int, connection_name: str = None):
         super().__init__()
         self.cursor_location = QPointF(0, 0)
-        self.sql_manager = SqlManager(connection_name if connection_name is not None else self.SQL_MANAGER_CONNECTION_NAME)
+        if connection_name is None:
+            self.sql_manager = SqlManager.for_thread()
+        else:
+            self.sql_manager = SqlManager(connection_name)
         self.line = self.sql_manager.factor(ImportLine).get(line_id)
         self.stations = self.sql_manager.factor(ImportStation).get_all(line_id)
 
@@ -2,8 +2,6 @@ import logging
 import pathlib
 import shutil
 
-import requests
-
 from Config.Constants import APPLICATION_CACHE_DIR
 from Utils.Settings import Preferences
 
@@ -15,6 +13,8 @@ def cached_image(url: str, cache_file: str,  cache_dir: str = None) -> str:
     file = pathlib.Path(cache_dir) / cache_file
     if not file.exists():
         logging.getLogger('cached_image').debug(f'Requesting non-existing file: {url}')
+        # imported on first use, it is a heavy import for the startup.
+        import requests
         r = requests.get(url, stream=True)
         if r.status_code == 200:
             with open(file, 'wb') as f:
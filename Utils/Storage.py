@@ -1,14 +1,15 @@
 import codecs
 import mimetypes
 import os
-import zlib
 
 from PySide6.QtCore import QSettings
 from PySide6.QtWidgets import QMessageBox
 
 from Config.Constants import APPLICATION_VERSION, APPLICATION_NAME, MAIN_WINDOW_STATUSBAR_TIMEOUT, MAIN_WINDOW_TITLE
+from Models.Journal import Journal
+from Models.SurveyStore import SurveyStore
 from Models.TableModels import SqlManager, ProjectSettings
-import json
+from Utils import ProjectFile
 
 class SaveFile():
 
@@ -29,6 +30,7 @@ class SaveFile():
                 self.save_to_file()
 
     def save_to_file(self):
+        SurveyStore.instance().flush()
         save = {
             'version': APPLICATION_VERSION,
             'database':  self.sql_manager.dump_tables()
@@ -63,6 +65,8 @@ class SaveFile():
         settings.setValue('SaveFile/current_file_name', self.file_path)
         settings.setValue('SaveFile/last_path', os.path.dirname(self.file_path))
         settings.setValue('SaveFile/is_changed', False)
+        SurveyStore.instance().clear()
+        Journal.instance().clear()
         self.sql_manager.flush_db()
         sql = self.sql_manager.factor(ProjectSettings)
         sql.insert(project_name, latitude, longitude)
@@ -79,6 +83,8 @@ class SaveFile():
         return data
 
     def _load_to_db(self, table_data) -> bool:
+        SurveyStore.instance().clear()
+        Journal.instance().clear()
         self.sql_manager.flush_db()
         self.sql_manager.load_table_data(table_data)
         return True
@@ -93,9 +99,7 @@ class SaveFile():
         return data
 
     def _decode(self, data) -> dict:
-        uncompressed = zlib.decompress(data)
-        return json.loads(uncompressed)
+        return ProjectFile.decode(data)
 
     def _encode(self, data: dict) -> bytes:
-        json_str = json.dumps(data)
-        return zlib.compress(bytes(json_str, 'utf8'))
+        return ProjectFile.encode(data)
@@ -1,8 +1,11 @@
-from PySide6.QtCore import QObject, QThread, Signal
+import threading
+
+from PySide6.QtCore import QObject, Signal
 from PySide6.QtWidgets import QProgressDialog
 
 from Gui.Dialogs import ErrorDialog
 from Models.TableModels import SqlManager
+from Workers.Scheduler import JobScheduler, Job
 
 
 class WorkerMixin(QObject):
@@ -11,14 +14,30 @@ class WorkerMixin(QObject):
     s_progress = Signal(int)
     s_task_label = Signal(str)
     s_reload_treeview = Signal(int)
+    # survey_id, line_id: a line is imported while the worker is still running.
+    s_line_added = Signal(int, int)
 
     def __init__(self, thread_action: str = None):
         super().__init__()
         self._sql_manager = None
         self._tread_action = thread_action
-
-    def set_sql_manager(self, connection_name: str = None):
-        self._sql_manager = SqlManager(connection_name)
+        # set from the GUI thread when the user cancels, long running loops should check is_cancelled()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def set_sql_manager(self, connection_name: str = None, db_location: str = None):
+        """
+            Without a connection_name the worker uses the pooled connection of its thread (see ConnectionPool).
+        """
+        if connection_name is None:
+            self._sql_manager = SqlManager.for_thread(db_location)
+        else:
+            self._sql_manager = SqlManager(connection_name, db_location)
         return self._sql_manager
 
     def sql_manager(self):
@@ -43,22 +62,21 @@ class ThreadWithProgressBar:
 
         Your threaded object HAS TO USE the "set_sql_manager()", "sql_manager()" and "finished()" methods in order to use a database.
 
-        @todo multiple threads within the same parent object is not possible right now.
+        The workers run on the JobScheduler, so any amount of them can be started (each with its own progress dialog),
+        workers started with the same thread_name run one after the other.
     """
     def __init__(self, main_window):
         super().__init__()
         self.main_window = main_window
-        self.thread = None
+        self.scheduler = JobScheduler.instance()
         self.worker = None
-        self.progress = None
-        self.running_thread = None
+        self.job = None
+        self.progress_params = None
 
         self.on_finish = None
 
     def worker_is_running(self, thread_name: str) -> bool:
-        if self.running_thread == thread_name:
-            return True
-        return False
+        return self.scheduler.is_active(thread_name)
 
     def worker_create_thread(self,
                              thread_object: QObject,
@@ -66,68 +84,69 @@ class ThreadWithProgressBar:
                              progress_params: dict = {
                                  "title": "default title",
                                  "value": 0,
-                                 "min": 0,
-                                 "max": 0
+                                 "min_value": 0,
+                                 "max_value": 0
                              }):
-        if self.running_thread is not None:
-            ErrorDialog.show(f'{self.running_thread} is already running, we don\'t support multiple threads here')
-            return
-
-        self.on_finish = on_finish
-
-        self.worker_create_progress_dialog(**progress_params)
-
-        self.thread = QThread()
+        """
+            Prepares the worker, worker_start() queues it.
+            Without progress_params (None) the job runs in the background without a progress dialog.
+        """
         self.worker = thread_object
-        self.worker.moveToThread(self.thread)
-        self.thread.started.connect(self.worker.run)
-        self.worker.s_finished.connect(self.thread.quit)
-        self.worker.s_finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-        self.worker.s_finished.connect(self.worker_finished)
-        self.worker.s_progress.connect(self.worker_update_progress)
-        self.worker.s_task_label.connect(self.worker_update_task_label)
-        self.worker.s_error.connect(self.worker_error)
-        self.worker.s_reload_treeview.connect(self.worker_treeview_reload)
-
-    def worker_start(self, thread_name: str = 'default'):
-        self.running_thread = thread_name
-        self.thread.start()
-
-    def worker_create_progress_dialog(self, title: str, value: int = 0, min_value: int = 0, max_value: int = 0):
-        # wrap this in a thread, this is blocking...
-        self.progress = QProgressDialog(self.main_window)
-        self.progress.setWindowTitle(title)
-        self.progress.setValue(value)
-        self.progress.showNormal()
-        self.progress.setMinimum(min_value)
-        self.progress.setMaximum(max_value)
-        self.progress.show()
-
-        self.progress.canceled.connect(self.worker_progress_cancelled)
-
-    def worker_update_progress(self, value: int):
-        self.progress.setValue(value)
-
-    def worker_update_task_label(self, label: str):
-        self.progress.setLabelText(label)
-
-    def worker_finished(self):
-        self.progress.close()
-        self.thread.quit()
-        if self.on_finish is not None:
-            self.on_finish()
-
-        self.running_thread = None
+        self.on_finish = on_finish
+        self.progress_params = progress_params
+
+    def worker_start(self, thread_name: str = 'default', priority: int = JobScheduler.PRIORITY_NORMAL) -> Job:
+        job = self.scheduler.submit(self.worker, thread_name, priority, on_finish=self.on_finish)
+        job.s_error.connect(self.worker_error)
+        job.s_reload_treeview.connect(self.worker_treeview_reload)
+        job.s_line_added.connect(self.worker_treeview_line_added)
+        if self.progress_params is not None:
+            self.worker_create_progress_dialog(job, **self.progress_params)
+        self.job = job
+        self.worker = None
+        return job
+
+    def worker_create_progress_dialog(self, job: Job, title: str, value: int = 0, min_value: int = 0, max_value: int = 0) -> QProgressDialog:
+        progress = QProgressDialog(self.main_window)
+        progress.setWindowTitle(title)
+        progress.setMinimum(min_value)
+        progress.setMaximum(max_value)
+        progress.setValue(value)
+        if job.state == Job.STATE_QUEUED:
+            progress.setLabelText(f'Waiting for {job.name} to finish')
+        progress.show()
+
+        job.s_progress.connect(progress.setValue)
+        job.s_task_label.connect(progress.setLabelText)
+        progress.canceled.connect(lambda: self.scheduler.cancel(job))
+        job.s_finished.connect(lambda: self.worker_close_progress_dialog(progress))
+        return progress
+
+    def worker_close_progress_dialog(self, progress: QProgressDialog):
+        # closing the dialog emits canceled, which is not what happened.
+        progress.canceled.disconnect()
+        progress.close()
 
     def worker_error(self, error_key: str, error_exception: Exception = None):
         ErrorDialog.show_error_key(self.main_window, error_key, error_exception)
 
-    def worker_progress_cancelled(self):
-        self.thread.quit()
-        self.running_thread = None
-
     def worker_treeview_reload(self, survey_id):
         # I need to get the treeview somehow.
-        model = self.main_window.tree_view.model()
-        model.import_item().prepend_child(survey_id)
+        import_item = self.main_window.tree_view.model().import_item()
+        if import_item.child_model().get(survey_id) is None:
+            # the import did not finish, its survey was removed again.
+            import_item.remove_child(survey_id)
+            return
+        if f'id_{survey_id}' in import_item.surveys:
+            # the survey was already added line by line (see worker_treeview_line_added)
+            import_item.surveys[f'id_{survey_id}'].update_children()
+            return
+        import_item.prepend_child(survey_id)
+
+    def worker_treeview_line_added(self, survey_id: int, line_id: int):
+        import_item = self.main_window.tree_view.model().import_item()
+        if f'id_{survey_id}' not in import_item.surveys:
+            # adding the survey adds all of its lines as well.
+            import_item.prepend_child(survey_id)
+            return
+        import_item.surveys[f'id_{survey_id}'].append_child(line_id)
@@ -0,0 +1,209 @@
+import heapq
+import itertools
+import logging
+
+from PySide6.QtCore import QObject, QThread, QCoreApplication, Signal, Slot
+
+from Config.Constants import JOB_SCHEDULER_MAX_WORKERS
+
+
+class Job(QObject):
+    """
+        A worker (see WorkerMixin) queued on the JobScheduler.
+
+        The job lives in the GUI thread, the worker signals arrive here queued and are passed on by the job signals,
+        so the progress of every job can be followed on its own.
+    """
+    STATE_QUEUED = 'queued'
+    STATE_RUNNING = 'running'
+    STATE_FINISHED = 'finished'
+    STATE_CANCELLED = 'cancelled'
+
+    s_progress = Signal(int)
+    s_task_label = Signal(str)
+    s_finished = Signal()
+    s_error = Signal(str, Exception)
+    s_reload_treeview = Signal(int)
+    s_line_added = Signal(int, int)
+    # starts the run of the worker in its thread.
+    s_run = Signal()
+
+    def __init__(self, name: str, worker: QObject, priority: int, on_finish=None):
+        super().__init__()
+        self.name = name
+        self.worker = worker
+        self.priority = priority
+        self.on_finish = on_finish
+        self.state = self.STATE_QUEUED
+        self.progress = 0
+        self.thread = None
+        # set by the scheduler, called (in the GUI thread) when the worker finished.
+        self.on_worker_finished = None
+
+    def is_active(self) -> bool:
+        return self.state in (self.STATE_QUEUED, self.STATE_RUNNING)
+
+    @Slot(int)
+    def c_progress(self, value: int):
+        self.progress = value
+        self.s_progress.emit(value)
+
+    @Slot(str)
+    def c_task_label(self, label: str):
+        self.s_task_label.emit(label)
+
+    @Slot()
+    def c_worker_finished(self):
+        self.on_worker_finished(self)
+
+
+class JobScheduler(QObject):
+    """
+        Runs workers on a bounded amount of QThreads, the rest waits in a priority queue.
+
+        The threads are started once and run one job after the other until shutdown(), so a worker gets the
+        database connection the thread opened for an earlier job (see ConnectionPool).
+        A finished worker is deleted, the job only keeps its state and progress.
+
+        Jobs with a lower priority value start first, equal priorities keep their submit order.
+        Jobs with the same name never run at the same time (ea. there is only one Mnemo to read from),
+        the second one waits until the first finished.
+
+        There is one scheduler for the application, use JobScheduler.instance().
+    """
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 10
+    PRIORITY_LOW = 20
+
+    s_job_started = Signal(str)
+    s_job_finished = Signal(str)
+
+    _instance = None
+
+    def __init__(self, max_workers: int = JOB_SCHEDULER_MAX_WORKERS):
+        super().__init__()
+        self.log = logging.getLogger(__name__)
+        self.max_workers = max_workers
+        self._queue = []
+        self._running = []
+        self._threads = []
+        self._idle = []
+        self._counter = itertools.count()
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+            application = QCoreApplication.instance()
+            if application is not None:
+                application.aboutToQuit.connect(cls._instance.shutdown)
+        return cls._instance
+
+    def submit(self, worker: QObject, name: str = 'default', priority: int = PRIORITY_NORMAL, on_finish=None) -> Job:
+        job = Job(name, worker, priority, on_finish)
+        heapq.heappush(self._queue, (priority, next(self._counter), job))
+        self.log.debug(f'Job {name} queued with priority {priority}')
+        self._start_next()
+        return job
+
+    def cancel(self, job: Job):
+        if job.state == Job.STATE_QUEUED:
+            self._queue = [entry for entry in self._queue if entry[2] is not job]
+            heapq.heapify(self._queue)
+            job.state = Job.STATE_CANCELLED
+            job.s_finished.emit()
+            self.s_job_finished.emit(job.name)
+            return
+        if job.state == Job.STATE_RUNNING:
+            # the worker stops at its next is_cancelled() check, and finishes like it normally would.
+            job.worker.cancel()
+
+    def cancel_all(self):
+        for job in self.jobs():
+            self.cancel(job)
+
+    def jobs(self) -> list:
+        """
+            The running jobs followed by the queued jobs in the order they will start.
+        """
+        return self._running + [entry[2] for entry in sorted(self._queue)]
+
+    def is_active(self, name: str) -> bool:
+        return any(job.name == name for job in self.jobs())
+
+    def is_running(self, name: str) -> bool:
+        return any(job.name == name for job in self._running)
+
+    def running_count(self) -> int:
+        return len(self._running)
+
+    def thread_count(self) -> int:
+        return len(self._threads)
+
+    def shutdown(self):
+        """
+            Cancels the jobs and stops the threads (which closes their connections), once they are done.
+        """
+        self.cancel_all()
+        for thread in self._threads:
+            thread.quit()
+            thread.wait()
+        self._running = []
+        self._threads = []
+        self._idle = []
+
+    def _start_next(self):
+        waiting = []
+        while len(self._queue) > 0 and len(self._running) < self.max_workers:
+            entry = heapq.heappop(self._queue)
+            if self.is_running(entry[2].name):
+                waiting.append(entry)
+                continue
+            self._start(entry[2])
+        for entry in waiting:
+            heapq.heappush(self._queue, entry)
+
+    def _thread(self) -> QThread:
+        if len(self._idle) > 0:
+            return self._idle.pop()
+        thread = QThread()
+        thread.setObjectName(f'JobScheduler_{len(self._threads)}')
+        self._threads.append(thread)
+        thread.start()
+        return thread
+
+    def _start(self, job: Job):
+        job.state = Job.STATE_RUNNING
+        job.thread = self._thread()
+        job.worker.moveToThread(job.thread)
+        # queued, the worker runs in the event loop of its thread.
+        job.s_run.connect(job.worker.run)
+        job.worker.s_progress.connect(job.c_progress)
+        job.worker.s_task_label.connect(job.c_task_label)
+        job.worker.s_error.connect(job.s_error)
+        job.worker.s_reload_treeview.connect(job.s_reload_treeview)
+        job.worker.s_line_added.connect(job.s_line_added)
+        job.worker.s_finished.connect(job.c_worker_finished)
+        job.on_worker_finished = self._finished
+        self._running.append(job)
+        self.log.debug(f'Job {job.name} started')
+        job.s_run.emit()
+        self.s_job_started.emit(job.name)
+
+    def _finished(self, job: Job):
+        if job not in self._running:
+            return
+        self._running.remove(job)
+        job.state = Job.STATE_CANCELLED if job.worker.is_cancelled() else Job.STATE_FINISHED
+        job.s_run.disconnect()
+        # deleted by the event loop of its thread, after run() returned.
+        job.worker.deleteLater()
+        job.worker = None
+        self._idle.append(job.thread)
+        job.thread = None
+        self.log.debug(f'Job {job.name} {job.state}')
+        if job.on_finish is not None:
+            job.on_finish()
+        job.s_finished.emit()
+        self.s_job_finished.emit(job.name)
+        self._start_next()
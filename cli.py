@@ -0,0 +1,147 @@
+"""
+    StickMaps without the GUI, for scripting conversions over many files.
+
+        python cli.py dmp2stk data_files/*.dmp --output-dir projects/
+        python cli.py stk2dmp projects/tux.stk --survey 1
+        python cli.py validate projects/*.stk
+
+    Startup is kept short by importing the database models only for the commands that need them,
+    those run on the sqlite3 backend with an in-memory database (no QCoreApplication), your projects are never touched.
+    validate only uses the standard library.
+"""
+import argparse
+import logging
+import pathlib
+import sys
+
+
+def open_database():
+    """
+        An in-memory database on the sqlite3 backend, which leaves the unsaved changes flag of the GUI alone.
+    """
+    from PySide6.QtCore import QLoggingCategory
+    from Models.TableModels import SqlManager
+
+    # the (unused) QtSql side of the models warns about the missing QCoreApplication.
+    QLoggingCategory.setFilterRules('qt.sql.qsqldatabase.warning=false')
+    sql_manager = SqlManager.sqlite3(':memory:', track_changes=False)
+    sql_manager.create_tables()
+    return sql_manager
+
+
+def output_path(in_file: pathlib.Path, output_dir, suffix: str) -> pathlib.Path:
+    directory = pathlib.Path(output_dir) if output_dir is not None else in_file.parent
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f'{in_file.stem}{suffix}'
+
+
+def dmp_to_stk(arguments) -> int:
+    from Config.Constants import APPLICATION_VERSION, APPLICATION_FILE_EXTENSION
+    from Importers.Mnemo import MnemoDmpReader, parse_dump_file
+    from Models.TableModels import ProjectSettings
+    from Utils import ProjectFile
+
+    sql_manager = open_database()
+    failed = 0
+    for in_file in map(pathlib.Path, arguments.files):
+        try:
+            values = parse_dump_file(in_file)
+            if len(values) == 0:
+                raise Exception('NO_DATA_FOUND')
+            sql_manager.flush_db()
+            sql_manager.factor(ProjectSettings).insert(in_file.stem, '', '')
+            MnemoDmpReader(values, sql_manager).read()
+
+            out_file = output_path(in_file, arguments.output_dir, f'.{APPLICATION_FILE_EXTENSION}')
+            ProjectFile.write(out_file, {'version': APPLICATION_VERSION, 'database': sql_manager.dump_tables()})
+            print(f'{in_file} -> {out_file}')
+        except Exception as error:
+            failed += 1
+            print(f'{in_file}: {error}', file=sys.stderr)
+
+    sql_manager.close_connection()
+    return 1 if failed > 0 else 0
+
+
+def stk_to_dmp(arguments) -> int:
+    from Importers.Mnemo import MnemoDumpWriter
+    from Models.TableModels import ImportSurvey
+    from Utils import ProjectFile
+
+    sql_manager = open_database()
+    failed = 0
+    for in_file in map(pathlib.Path, arguments.files):
+        try:
+            data = ProjectFile.read(in_file)
+            problems = ProjectFile.validate(data)
+            if len(problems) > 0:
+                raise Exception(problems[0])
+            sql_manager.flush_db()
+            sql_manager.load_table_data(data['database'])
+
+            surveys = [row['survey_id'] for row in sql_manager.factor(ImportSurvey).get_all()]
+            if arguments.survey is not None:
+                surveys = [survey_id for survey_id in surveys if survey_id == arguments.survey]
+            if len(surveys) == 0:
+                raise Exception('NO_DATA_FOUND')
+
+            for survey_id in sorted(surveys):
+                suffix = '.dmp' if len(surveys) == 1 else f'_{survey_id}.dmp'
+                out_file = output_path(in_file, arguments.output_dir, suffix)
+                MnemoDumpWriter(sql_manager=sql_manager).save_survey_to_dmp(survey_id, out_file, binary=arguments.binary)
+                print(f'{in_file} -> {out_file}')
+        except Exception as error:
+            failed += 1
+            print(f'{in_file}: {error}', file=sys.stderr)
+
+    sql_manager.close_connection()
+    return 1 if failed > 0 else 0
+
+
+def validate(arguments) -> int:
+    from Utils import ProjectFile
+
+    failed = 0
+    for in_file in arguments.files:
+        try:
+            problems = ProjectFile.validate(ProjectFile.read(in_file))
+        except Exception as error:
+            problems = [f'Could not be read: {error}']
+        if len(problems) > 0:
+            failed += 1
+            for problem in problems:
+                print(f'{in_file}: {problem}')
+        elif arguments.quiet is False:
+            print(f'{in_file}: OK')
+    return 1 if failed > 0 else 0
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog='stickmaps', description='StickMaps without the GUI.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show the application log.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('dmp2stk', help='Convert Mnemo dump-files to projects, one per file.')
+    command.add_argument('files', nargs='+')
+    command.add_argument('--output-dir', help='Defaults to the directory of each dump-file.')
+    command.set_defaults(run=dmp_to_stk)
+
+    command = commands.add_parser('stk2dmp', help='Export the surveys of projects as (Ariane) dump-files.')
+    command.add_argument('files', nargs='+')
+    command.add_argument('--survey', type=int, help='Only export this survey_id.')
+    command.add_argument('--output-dir', help='Defaults to the directory of each project.')
+    command.add_argument('--binary', action='store_true', help='Write the compact binary dump format.')
+    command.set_defaults(run=stk_to_dmp)
+
+    command = commands.add_parser('validate', help='Check that projects can be opened.')
+    command.add_argument('files', nargs='+')
+    command.add_argument('-q', '--quiet', action='store_true', help='Only report the files with problems.')
+    command.set_defaults(run=validate)
+
+    arguments = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if arguments.verbose else logging.ERROR)
+    return arguments.run(arguments)
+
+
+if __name__ == '__main__':
+    sys.exit(main())